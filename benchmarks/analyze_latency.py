@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark for the /analyze endpoint against the mock LLM.
+
+Starts src/mock_llm_server.py with the given latency profile and error rate,
+points the adapter at it (LLM_BACKEND=mock), serves src/main.py with uvicorn and
+sends requests from `--concurrency` client threads over HTTP. Reports p50, p95
+and p99 latency, throughput, fallbacks to the default analysis and the LLM calls
+the mock received. Requests open the emails of a mailbox of `--distinct` emails
+in turn, each sent with the next `--recent` emails, so emails are often analyzed
+as part of an earlier batch; a mailbox smaller than the number of requests also
+repeats requests, which exercises the analysis cache.
+
+With `--stream` the requests go to /analyze/stream instead. Latency is then
+measured when the complete analysis arrives, and the report adds the time to
+the first event (the local observer results) and to the first LLM fields
+(primary_intent, priority and urgency).
+
+The app runs in a temporary copy of data/, so the repository's data files are
+left untouched; pass `--llm-cache` a path to keep the LLM response cache between
+runs and measure a warm restart.
+
+    python benchmarks/analyze_latency.py --requests 200 --concurrency 16 --profile typical
+    python benchmarks/analyze_latency.py --requests 50 --profile typical --stream
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.mock_llm_server import MockLLMServer, PROFILES
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FIRST_FIELDS = ("primary_intent", "priority", "urgency")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_email(j: int) -> dict:
+    return {
+        "subject": f"Project {j}: budget review",
+        "sender": f"colleague{j % 17}@example.com",
+        "recipients": ["me@example.com"],
+        "body": f"Hi, please review the budget for project {j} before the meeting on Friday.",
+        "snippet": f"Please review the budget for project {j}",
+        "timestamp": f"2025-05-{1 + j % 28:02d}T10:00:00Z",
+        "thread_id": f"thread{j}"
+    }
+
+
+def make_request(i: int, recent: int, mailbox: int) -> dict:
+    """Open email i of the mailbox; the next emails in the inbox are sent as recent emails."""
+    return {
+        "current_email": make_email(i % mailbox),
+        "recent_emails": [make_email((i + k) % mailbox) for k in range(1, recent + 1)],
+        "user_id": "user0"
+    }
+
+
+def post(url: str, body: dict, timeout: float):
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'),
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.load(response)
+            status = response.status
+    except (urllib.error.URLError, OSError, ValueError):
+        result, status = None, 0
+    return status, result, time.perf_counter() - start
+
+
+def post_stream(url: str, body: dict, timeout: float):
+    """POST to a Server-Sent Events endpoint; returns (status, complete analysis, latency, first event, first fields)."""
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'),
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    first_event = first_fields = None
+    pending = set(FIRST_FIELDS)
+    result, event = None, None
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+            for line in response:
+                line = line.decode('utf-8').rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if first_event is None:
+                        first_event = time.perf_counter() - start
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "field":
+                        pending.discard(data["name"])
+                    elif event == "complete":
+                        result = data
+                        pending.clear()
+                    if not pending and first_fields is None:
+                        first_fields = time.perf_counter() - start
+    except (urllib.error.URLError, OSError, ValueError):
+        result, status = None, 0
+    if result is None:
+        status = 0
+    return status, result, time.perf_counter() - start, first_event, first_fields
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--distinct', type=int, default=0, help="emails in the mailbox (default: one per request)")
+    parser.add_argument('--recent', type=int, default=3, help="recent emails sent with each request")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--llm-cache', default='', help="LLM response cache file to reuse across runs")
+    parser.add_argument('--stream', action='store_true', help="use the Server-Sent Events endpoint")
+    args = parser.parse_args()
+
+    mock = MockLLMServer(port=0, profile=args.profile, error_rate=args.error_rate).start()
+    os.environ.update({
+        'LLM_BACKEND': 'mock',
+        'MOCK_LLM_URL': mock.url,
+        'LLM_MAX_CONCURRENCY': str(args.llm_concurrency),
+        'OBSERVER_MEMORY_BACKEND': 'json'
+    })
+    if args.llm_cache:
+        os.environ['LLM_CACHE_PATH'] = os.path.abspath(args.llm_cache)
+
+    workdir = tempfile.mkdtemp()
+    shutil.copytree(os.path.join(REPO_ROOT, 'data'), os.path.join(workdir, 'data'))
+    os.chdir(workdir)
+    import uvicorn
+    from src.main import app, observer_agent
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{port}/analyze" + ("/stream" if args.stream else "")
+    send = post_stream if args.stream else post
+    distinct = args.distinct or args.requests
+    bodies = [make_request(i, args.recent, distinct) for i in range(args.requests)]
+    report = sys.stdout
+    try:
+        # The API logs every step; keep the report readable
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                results = list(pool.map(lambda body: send(url, body, args.timeout), bodies))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+        thread.join()
+        observer_agent.flush()
+        mock.stop()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir)
+
+    latencies = [latency for status, _, latency, *_ in results if status == 200]
+    failed = sum(1 for status, *_ in results if status != 200)
+    fallbacks = sum(1 for status, result, *_ in results
+                    if status == 200 and result.get("primary_intent") in ("unknown", "Unknown intent"))
+    stats = mock.stats()
+    print(f"{args.requests} requests ({distinct} distinct), {args.concurrency} clients, "
+          f"profile {args.profile}, error rate {args.error_rate}, LLM concurrency {args.llm_concurrency}", file=report)
+    if latencies:
+        ms = 1000
+        print(f"latency    p50 {percentile(latencies, 0.5) * ms:8.1f}ms  p95 {percentile(latencies, 0.95) * ms:8.1f}ms"
+              f"  p99 {percentile(latencies, 0.99) * ms:8.1f}ms  max {max(latencies) * ms:8.1f}ms", file=report)
+        if args.stream:
+            for label, column in (("first event", 3), ("first fields", 4)):
+                times = [result[column] for result in results if result[0] == 200 and result[column] is not None]
+                print(f"{label:<13}p50 {percentile(times, 0.5) * ms:8.1f}ms  p95 {percentile(times, 0.95) * ms:8.1f}ms",
+                      file=report)
+    print(f"throughput {args.requests / elapsed:8.1f} req/s over {elapsed:.2f}s", file=report)
+    print(f"failed     {failed}  default-analysis fallbacks {fallbacks}", file=report)
+    print(f"mock LLM   {stats['requests']} calls, {stats['errors']} injected errors, "
+          f"{stats['input_tokens']} input / {stats['output_tokens']} output tokens", file=report)
+
+
+if __name__ == "__main__":
+    main()
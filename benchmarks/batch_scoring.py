@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark for whole-mailbox re-classification with ObserverAgent.score_batch.
+
+Compares per-thread scoring (_analyze_buckets, _assign_thread_to_bucket for every
+thread and _analyze_user_traits) with the NumPy batch scorer on the same corpus,
+checking that buckets, every assignment and the user traits are identical.
+
+    python benchmarks/batch_scoring.py --threads 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.observer_scoring import generate_threads
+from src.batch_scoring import numpy_available
+from src.observerAgent import ObserverAgent
+
+
+def per_thread(observer, threads):
+    buckets = observer._analyze_buckets(threads)
+    assignments = {thread['thread_id']: observer._assign_thread_to_bucket(thread, buckets) for thread in threads}
+    return buckets, assignments, observer._analyze_user_traits(threads)
+
+
+def batched(observer, threads):
+    scores = observer.score_batch(threads)
+    buckets = scores.suggested_buckets()
+    return buckets, scores.assignments(buckets), scores.user_traits()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=1000000)
+    args = parser.parse_args()
+    if not numpy_available():
+        sys.exit("numpy is not installed; score_batch would fall back to analyze_batch")
+
+    threads = generate_threads(args.threads)
+    observer = ObserverAgent(session_data_path=os.devnull, long_term_data_path=os.devnull)
+
+    start = time.perf_counter()
+    expected = per_thread(observer, threads)
+    per_thread_time = time.perf_counter() - start
+    start = time.perf_counter()
+    result = batched(observer, threads)
+    batch_time = time.perf_counter() - start
+
+    assert result == expected
+    print(f"Threads: {args.threads}  (buckets, assignments and traits identical)")
+    print(f"per-thread scoring  {per_thread_time:8.2f}s")
+    print(f"score_batch         {batch_time:8.2f}s  {per_thread_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for src/date_parsing.py over real Gmail/RFC 2822 Date: header shapes.
+
+Compares the previous main.parse_date strategy (dateutil first, when installed),
+the uncached fast path, and the memoized parse_datetime on a stream where every
+timestamp recurs, as recent emails are re-sent across /analyze requests.
+
+    python benchmarks/date_parsing.py --values 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.date_parsing import parse_datetime
+
+try:
+    import dateutil.parser
+except ImportError:
+    dateutil = None
+
+# strftime patterns for Date: headers as seen from Gmail and common clients
+SHAPES = [
+    "%a, %d %b %Y %H:%M:%S +0000",           # Gmail
+    "%a, %d %b %Y %H:%M:%S -0700 (PDT)",     # Apple Mail / Outlook with zone comment
+    "%a, %d %b %Y %H:%M:%S +0000 (UTC)",
+    "%d %b %Y %H:%M:%S GMT",                 # No weekday, obsolete zone name
+    "%a, %-d %b %Y %H:%M:%S +0530",          # Unpadded day
+    "%Y-%m-%dT%H:%M:%SZ",                    # Gmail API / extension ISO timestamps
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%S+00:00",
+]
+
+
+def generate(count: int, distinct_count: int):
+    rng = random.Random(5)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    distinct = [
+        (start + timedelta(seconds=rng.randrange(10 ** 7))).strftime(rng.choice(SHAPES))
+        for _ in range(distinct_count)
+    ]
+    values = [rng.choice(distinct) for _ in range(count)]
+    return distinct, values
+
+
+def measure(name, parse, values):
+    start = time.perf_counter()
+    for value in values:
+        parse(value)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<34} {elapsed * 1000:>9.1f} ms  {elapsed / len(values) * 1e6:>7.2f} us/value")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--values', type=int, default=200000)
+    parser.add_argument('--distinct', type=int, default=5000, help="number of distinct timestamps")
+    args = parser.parse_args()
+    distinct, values = generate(args.values, args.distinct)
+
+    for value in distinct[:len(SHAPES)]:
+        parse_datetime(value)  # Every shape must be understood without dateutil
+    if dateutil is not None:
+        measure("dateutil first (previous)", dateutil.parser.parse, values)
+    else:
+        print("dateutil first (previous)          skipped, python-dateutil not installed")
+    measure("fast path, no memo", parse_datetime.__wrapped__, values)
+    parse_datetime.cache_clear()
+    measure("parse_datetime (memoized)", parse_datetime, values)
+    print(f"memo: {parse_datetime.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
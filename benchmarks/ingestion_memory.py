@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the ingestion data model.
+
+Builds a generated corpus of threads with both the original dict-backed model
+(reproduced below) and the current compact model in src/ingestionAgent.py, and
+reports the bytes retained per thread for each.
+
+    python benchmarks/ingestion_memory.py --threads 100000
+"""
+
+import argparse
+import datetime
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from typing import Any, Dict, List
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestionAgent import IngestionAgent
+
+
+class LegacyEmailMessage:
+    """The EmailMessage model before the compact representation was introduced."""
+    def __init__(self, id, from_address, to_addresses, date, subject, snippet, body, cc_addresses=None):
+        self.id = id
+        self.from_address = from_address
+        self.to_addresses = to_addresses
+        self.cc_addresses = cc_addresses or []
+        self.date = date
+        self.subject = subject
+        self.snippet = snippet
+        self.body = body
+
+
+class LegacyIngestedThread:
+    """The IngestedThread model before the compact representation was introduced."""
+    def __init__(self, thread_id, latest_snippet, participants, received_at, full_messages, subject):
+        self.thread_id = thread_id
+        self.latest_snippet = latest_snippet
+        self.participants = participants
+        self.received_at = received_at
+        self.full_messages = full_messages
+        self.subject = subject
+
+
+def legacy_normalize(raw_threads: List[Dict[str, Any]]) -> List[LegacyIngestedThread]:
+    """Normalize threads exactly as the original IngestionAgent did."""
+    normalized = []
+    for raw_thread in raw_threads:
+        messages = []
+        for data in raw_thread['messages']:
+            messages.append(LegacyEmailMessage(
+                id=data['id'],
+                from_address=data['from'],
+                to_addresses=data['to'],
+                cc_addresses=data.get('cc', []),
+                date=datetime.datetime.fromisoformat(data['date'].replace('Z', '+00:00')),
+                subject=data['subject'],
+                snippet=data['snippet'],
+                body=data['body']
+            ))
+        messages.sort(key=lambda m: m.date)
+        participants = set()
+        for message in messages:
+            participants.add(message.from_address)
+            participants.update(message.to_addresses)
+            participants.update(message.cc_addresses)
+        normalized.append(LegacyIngestedThread(
+            thread_id=raw_thread['threadId'],
+            latest_snippet=messages[-1].snippet,
+            participants=list(participants),
+            received_at=messages[-1].date,
+            full_messages=messages,
+            subject=messages[0].subject
+        ))
+    normalized.sort(key=lambda t: t.received_at, reverse=True)
+    return normalized
+
+
+def generate_raw_threads(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Generate raw threads shaped like data/syntheticEmails.json."""
+    rng = random.Random(seed)
+    addresses = [f"person{i}@company{i % 50}.com" for i in range(2000)]
+    start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    threads = []
+    for t in range(count):
+        people = rng.sample(addresses, 4)
+        received = start + datetime.timedelta(seconds=rng.randrange(90 * 24 * 3600))
+        messages = []
+        for m in range(rng.randint(1, 4)):
+            sender = people[m % 2]
+            # Build fresh strings, as json.load would, so duplicates are not shared
+            messages.append({
+                "id": f"msg{t}-{m}",
+                "from": ''.join(sender),
+                "to": [''.join(people[(m + 1) % 2])],
+                "cc": [''.join(a) for a in people[2:]],
+                "date": (received + datetime.timedelta(minutes=m * 7)).isoformat().replace('+00:00', 'Z'),
+                "subject": f"Re: Topic {t % 997}",
+                "snippet": f"Snippet for message {m} of thread {t}",
+                "body": f"Body for message {m} of thread {t}. " * 3
+            })
+        threads.append({"threadId": f"thread{t}", "messages": messages})
+    return threads
+
+
+def retained_bytes(build) -> int:
+    """Return the bytes still allocated after build() returns (its result is kept alive)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=100000)
+    args = parser.parse_args()
+    
+    agent = IngestionAgent()
+    legacy = retained_bytes(lambda: legacy_normalize(generate_raw_threads(args.threads)))
+    compact = retained_bytes(lambda: agent.normalize_threads(generate_raw_threads(args.threads)))
+    
+    print(f"Threads:        {args.threads}")
+    print(f"Legacy model:   {legacy / args.threads:,.0f} bytes/thread")
+    print(f"Compact model:  {compact / args.threads:,.0f} bytes/thread")
+    print(f"Reduction:      {(1 - compact / legacy) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Load test for concurrent CognitiveEmailAdapter.process_email calls.
+
+Sends N concurrent requests through the adapter against a fake LLM with a fixed
+latency and reports the wall time. The "blocking" run reproduces the previous
+behaviour, a synchronous call on the event loop, which takes about N latencies;
+the async and thread-offloaded runs should take about ceil(N / concurrency).
+
+    python benchmarks/llm_concurrency.py --requests 32 --latency 0.5 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import os
+import sys
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The adapter builds its default model at import; this benchmark never calls it
+os.environ.setdefault('ANTHROPIC_API_KEY', 'benchmark-key')
+
+from src.cognitive_email_adapter import CognitiveEmailAdapter, Email
+
+
+class FakeResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+RESPONSE = FakeResponse("```json\n" + json.dumps({
+    "primary_intent": "Request review",
+    "priority": "medium",
+    "social_context": ["Colleague"],
+    "suggested_actions": ["Reply"],
+    "related_emails": [],
+    "sentiment": "neutral",
+    "urgency": "normal",
+    "follow_up_needed": True,
+    "suggested_response": "Thanks, I will take a look.",
+    "bucket": "Work",
+    "user_traits": {},
+    "thread_summary": None,
+    "participants_analysis": None
+}) + "\n```")
+
+
+class AsyncFakeLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return RESPONSE
+
+
+class SyncFakeLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return RESPONSE
+
+
+class BlockingFakeLLM(AsyncFakeLLM):
+    """A synchronous call made directly on the event loop, as before."""
+    async def ainvoke(self, messages):
+        time.sleep(self.latency)
+        return RESPONSE
+
+
+def make_email(i: int) -> Email:
+    return Email(
+        sender=f"sender{i}@example.com",
+        recipients=["user@example.com"],
+        subject=f"Quarterly report {i}",
+        body=f"Please review section {i} of the report before Friday.",
+        timestamp=datetime.datetime(2025, 5, 1, 10, 0),
+        thread_id=f"thread{i}"
+    )
+
+
+async def run(adapter: CognitiveEmailAdapter, requests: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(adapter.process_email(make_email(i)) for i in range(requests)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    expected = math.ceil(args.requests / args.concurrency) * args.latency
+    print(f"{args.requests} concurrent requests, {args.latency:.2f}s LLM latency, "
+          f"concurrency limit {args.concurrency} (ideal {expected:.2f}s)")
+    for name, llm in [("blocking (before)", BlockingFakeLLM(args.latency)),
+                      ("ainvoke", AsyncFakeLLM(args.latency)),
+                      ("thread offload", SyncFakeLLM(args.latency))]:
+        adapter = CognitiveEmailAdapter(llm=llm, max_concurrency=args.concurrency)
+        # The adapter logs every step; keep the report readable
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            elapsed = asyncio.run(run(adapter, args.requests))
+        print(f"{name:<20}{elapsed:>8.2f}s  ({elapsed / args.latency:.1f} latencies)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for long-term memory storage backends.
+
+Replays trait updates, as produced by ObserverAgent.update_user_memory, for many
+users from several threads and reports updates per second. The JSON backend is
+run write-through (every update rewrites the file, as before write-behind) and
+write-behind; SQLite is run with one transaction per update and with batches.
+
+    python benchmarks/memory_storage.py --updates 20000 --users 1000 --threads 4
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.memory_storage import JSONMemoryStorage, SQLiteMemoryStorage
+from src.observerAgent import TRAIT_PATTERNS
+
+
+def generate_updates(count: int, users: int):
+    rng = random.Random(5)
+    traits = list(TRAIT_PATTERNS)
+    updates = []
+    for i in range(count):
+        user_traits = {trait: rng.random() < 0.3 for trait in traits}
+        timestamp = f"2025-05-{1 + i % 28:02d}T10:00:00Z"
+        timestamps = {trait: timestamp for trait, active in user_traits.items() if active}
+        updates.append((f"user{rng.randrange(users)}", user_traits, timestamps))
+    return updates
+
+
+def run(storage, updates, threads: int, batch: int) -> float:
+    """Apply `updates` split over `threads` writers; return updates per second."""
+    shards = [updates[i::threads] for i in range(threads)]
+
+    def write(shard):
+        if batch > 1:
+            for start in range(0, len(shard), batch):
+                storage.update_many(shard[start:start + batch])
+        else:
+            for user_id, user_traits, timestamps in shard:
+                storage.update(user_id, user_traits, timestamps)
+
+    workers = [threading.Thread(target=write, args=(shard,)) for shard in shards]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    storage.close()
+    return len(updates) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--updates', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+    updates = generate_updates(args.updates, args.users)
+    directory = tempfile.mkdtemp()
+    try:
+        results = [
+            ("json, write-through", run(JSONMemoryStorage(os.path.join(directory, 'a.json'), flush_interval=0),
+                                        updates[:args.updates // 10], args.threads, 1)),
+            ("json, write-behind", run(JSONMemoryStorage(os.path.join(directory, 'b.json')),
+                                       updates, args.threads, 1)),
+            ("sqlite, per update", run(SQLiteMemoryStorage(os.path.join(directory, 'c.db')),
+                                       updates, args.threads, 1)),
+            (f"sqlite, batches of {args.batch}", run(SQLiteMemoryStorage(os.path.join(directory, 'd.db')),
+                                                     updates, args.threads, args.batch)),
+        ]
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"{args.updates} updates, {args.users} users, {args.threads} threads")
+    for name, rate in results:
+        print(f"{name:<26}{rate:>12,.0f} updates/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the header-based threading engine (src/message_threader.py).
+
+Runs MessageThreader over adversarial reply structures and reports messages per
+second, so super-linear behaviour shows up as a falling rate when --messages grows:
+
+- deep chain: one reply chain, In-Reply-To only, delivered in reverse or random order
+- deep chain, full refs: each reply carries up to --max-refs ancestors in References
+- wide fan-out: every message replies to the same root
+- subject only: header-less replies threaded through the subject fallback
+
+    python benchmarks/message_threading.py --messages 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestionAgent import EmailMessage
+from src.message_threader import MessageThreader
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class HeaderMessage(EmailMessage):
+    __slots__ = ('message_id', 'in_reply_to', 'references')
+
+    def __init__(self, message_id, subject, index, in_reply_to=None, references=None):
+        super().__init__(id=message_id, from_address='a@example.com', to_addresses=['b@example.com'],
+                         date=START + timedelta(seconds=index), subject=subject, snippet='', body='')
+        self.message_id = message_id
+        self.in_reply_to = in_reply_to
+        self.references = references or []
+
+
+def deep_chain(count, order, max_refs=0):
+    messages = []
+    for i in range(count):
+        parent = f'm{i - 1}' if i else None
+        references = [f'm{j}' for j in range(max(0, i - max_refs), i)] if max_refs else None
+        messages.append(HeaderMessage(f'm{i}', 'Re: chain', i, in_reply_to=parent, references=references))
+    if order == 'reverse':
+        messages.reverse()
+    elif order == 'random':
+        random.Random(1).shuffle(messages)
+    return messages
+
+
+def wide_fan_out(count):
+    return [HeaderMessage('root', 'Announcement', 0)] + [
+        HeaderMessage(f'r{i}', 'Re: Announcement', i + 1, in_reply_to='root', references=['root'])
+        for i in range(count - 1)
+    ]
+
+
+def subject_only(count, subjects=1000):
+    return [HeaderMessage(f's{i}', ('Re: ' if i >= subjects else '') + f'Topic {i % subjects}', i)
+            for i in range(count)]
+
+
+def run(name, messages):
+    start = time.perf_counter()
+    threads = MessageThreader().thread(messages)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {len(messages):>9} msgs  {len(threads):>7} threads  "
+          f"{elapsed * 1000:>9.1f} ms  {len(messages) / elapsed:>12,.0f} msgs/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--max-refs', type=int, default=20)
+    args = parser.parse_args()
+
+    run("deep chain (in order)", deep_chain(args.messages, 'forward'))
+    run("deep chain (reverse order)", deep_chain(args.messages, 'reverse'))
+    run("deep chain (random order)", deep_chain(args.messages, 'random'))
+    run(f"deep chain, {args.max_refs} refs (random)", deep_chain(args.messages, 'random', args.max_refs))
+    run("wide fan-out", wide_fan_out(args.messages))
+    run("subject fallback only", subject_only(args.messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark for ObserverAgent bucket scoring.
+
+Generates a corpus of threads and compares the original per-bucket, per-keyword
+loops (reproduced below) with the compiled KeywordMatcher used by ObserverAgent,
+checking that suggested buckets and every assignment are identical. A combined
+overlapping-regex matcher is timed as well for reference.
+
+The full /analyze observer pass (buckets, assignments, user traits, and sentiment
+and urgency per thread) is then timed: once as separate rescans, as before, and
+once derived from a single ObserverAgent.analyze_batch. A second analyze_batch
+over the same threads shows the warm per-thread result cache.
+
+    python benchmarks/observer_scoring.py --threads 100000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.observerAgent import ObserverAgent, BUCKET_PATTERNS, TRAIT_PATTERNS, SENTIMENT_PATTERNS, URGENCY_PATTERNS
+
+KEYWORD_WORDS = ("project meeting review budget report team deadline client weekly newsletter update digest "
+                 "bill payment due reminder invoice account statement dinner plans party coffee lunch "
+                 "order purchase shipped delivery flight hotel booking trip interview job career role "
+                 "bank credit savings notification alert system status family friend personal happy").split()
+KEYWORD_RATE = 0.15  # Share of words drawn from the keyword vocabulary
+
+
+def generate_threads(count: int):
+    rng = random.Random(11)
+    # Filler vocabulary: common words plus generated words, some of which contain keywords by chance
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    filler = "the a your for with and to of is on this we please new thanks hi regards".split()
+    filler += [''.join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(5000)]
+
+    def words(n):
+        return ' '.join(rng.choice(KEYWORD_WORDS) if rng.random() < KEYWORD_RATE else rng.choice(filler)
+                        for _ in range(n))
+
+    return [
+        {
+            'thread_id': f'thread{i}',
+            'subject': words(rng.randint(3, 8)).title(),
+            'latest_snippet': words(rng.randint(10, 25)),
+            'received_at': f'2025-05-{1 + i % 28:02d}T10:00:00Z',
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_analyze_buckets(threads):
+    """Bucket suggestion as implemented before the compiled matcher."""
+    bucket_scores = Counter()
+    for thread in threads:
+        combined = f"{thread['subject']} {thread['latest_snippet']}".lower()
+        for bucket, keywords in BUCKET_PATTERNS.items():
+            for keyword in keywords:
+                if keyword in combined:
+                    bucket_scores[bucket] += 1
+    return [bucket for bucket, _ in bucket_scores.most_common(5)]
+
+
+def legacy_assign(thread, buckets):
+    """Bucket assignment as implemented before the compiled matcher."""
+    bucket_scores = {bucket: 0 for bucket in buckets}
+    combined = f"{thread['subject']} {thread.get('latest_snippet', '')}".lower()
+    for bucket in buckets:
+        if bucket in BUCKET_PATTERNS:
+            for keyword in BUCKET_PATTERNS[bucket]:
+                if keyword in combined:
+                    bucket_scores[bucket] += 1
+    if not bucket_scores or max(bucket_scores.values()) == 0:
+        return "Uncategorized"
+    max_score = max(bucket_scores.values())
+    return next(bucket for bucket, score in bucket_scores.items() if score == max_score)
+
+
+def legacy_user_traits(threads):
+    """Trait detection as implemented before analyze_batch: one rescan per thread."""
+    result = {"userTraits": {trait: False for trait in TRAIT_PATTERNS}, "timestamps": {}}
+    for thread in threads:
+        combined = f"{thread['subject']} {thread['latest_snippet']}".lower()
+        for trait, words in TRAIT_PATTERNS.items():
+            if any(word in combined for word in words):
+                result["userTraits"][trait] = True
+        for trait, is_active in result["userTraits"].items():
+            if is_active:
+                result["timestamps"][trait] = thread['received_at']
+    return result
+
+
+def legacy_sentiment_and_urgency(thread):
+    """Sentiment and urgency as implemented before analyze_batch."""
+    combined = f"{thread['subject']} {thread['latest_snippet']}".lower()
+    sentiment = "neutral"
+    if any(word in combined for word in SENTIMENT_PATTERNS["positive"]):
+        sentiment = "positive"
+    elif any(word in combined for word in SENTIMENT_PATTERNS["negative"]):
+        sentiment = "negative"
+    urgency = "high" if any(word in combined for word in URGENCY_PATTERNS["high"]) else "normal"
+    return {"sentiment": sentiment, "urgency": urgency}
+
+
+def legacy_pipeline(threads):
+    buckets = legacy_analyze_buckets(threads)
+    assignments = {t['thread_id']: legacy_assign(t, buckets) for t in threads}
+    traits = legacy_user_traits(threads)
+    tones = [legacy_sentiment_and_urgency(t) for t in threads]
+    return buckets, assignments, traits, tones
+
+
+def batch_pipeline(observer, threads):
+    analysis = observer.analyze_batch(threads)
+    buckets = analysis.suggested_buckets()
+    tones = [{"sentiment": a.sentiment, "urgency": a.urgency} for a in analysis.threads]
+    return buckets, analysis.assignments(buckets), analysis.user_traits(), tones
+
+
+def regex_scores(threads):
+    """Reference: one overlapping-lookahead regex over all keywords per text."""
+    keywords = sorted({k for ks in BUCKET_PATTERNS.values() for k in ks}, key=len, reverse=True)
+    pattern = re.compile('(?=(' + '|'.join(map(re.escape, keywords)) + '))')
+    contained = {k: [other for other in keywords if other in k] for k in keywords}
+    for thread in threads:
+        combined = f"{thread['subject']} {thread['latest_snippet']}".lower()
+        found = set()
+        for match in pattern.finditer(combined):
+            found.update(contained[match.group(1)])
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=100000)
+    args = parser.parse_args()
+    threads = generate_threads(args.threads)
+    observer = ObserverAgent(session_data_path=os.devnull, long_term_data_path=os.devnull)
+
+    legacy_buckets, legacy_suggest_time = timed(legacy_analyze_buckets, threads)
+    buckets, suggest_time = timed(observer._analyze_buckets, threads)
+    legacy_assignments, legacy_assign_time = timed(lambda: [legacy_assign(t, legacy_buckets) for t in threads])
+    assignments, assign_time = timed(lambda: [observer._assign_thread_to_bucket(t, buckets) for t in threads])
+    _, regex_time = timed(regex_scores, threads)
+
+    assert buckets == legacy_buckets, (buckets, legacy_buckets)
+    assert assignments == legacy_assignments
+    print(f"Threads: {args.threads}  (buckets and all assignments identical)")
+    print(f"{'':<22}{'legacy':>10}{'compiled':>10}{'speedup':>9}")
+    print(f"{'suggest buckets':<22}{legacy_suggest_time:>9.2f}s{suggest_time:>9.2f}s{legacy_suggest_time / suggest_time:>8.1f}x")
+    print(f"{'assign threads':<22}{legacy_assign_time:>9.2f}s{assign_time:>9.2f}s{legacy_assign_time / assign_time:>8.1f}x")
+    print(f"overlapping regex matcher (matching only): {regex_time:.2f}s")
+
+    legacy_result, legacy_pipeline_time = timed(legacy_pipeline, threads)
+    batch_result, batch_time = timed(batch_pipeline, observer, threads)
+    assert batch_result == legacy_result
+    print(f"{'full observer pass':<22}{legacy_pipeline_time:>9.2f}s{batch_time:>9.2f}s"
+          f"{legacy_pipeline_time / batch_time:>8.1f}x  (analyze_batch, results identical)")
+
+    cached = ObserverAgent(session_data_path=os.devnull, long_term_data_path=os.devnull,
+                           result_cache_size=len(threads))
+    _, cold_time = timed(batch_pipeline, cached, threads)
+    cached_result, warm_time = timed(batch_pipeline, cached, threads)
+    assert cached_result == legacy_result
+    stats = cached.result_cache_stats()
+    print(f"{'result cache':<22}{cold_time:>9.2f}s{warm_time:>9.2f}s{cold_time / warm_time:>8.1f}x"
+          f"  (cold vs warm pass; {stats['hits']} hits, {stats['misses']} misses)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Recall and latency benchmark for the MinHash/LSH related-thread index.
+
+Generates a mailbox of conversations (each with its own subject, vocabulary and
+correspondents, mixed with common filler words and the owner's address), builds
+RelatedThreadIndex incrementally, and compares top-k queries against an exact
+brute-force Jaccard scan over every thread.
+
+Recall@k counts an index result as correct when its similarity reaches the k-th
+best brute-force similarity, so ties are not penalized.
+
+    python benchmarks/related_threads.py --threads 1000000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.related_index import RelatedThreadIndex, thread_features
+
+OWNER = "me@example.com"
+
+
+def generate_threads(count: int, topics: int):
+    """Threads belong to conversations that share a subject, vocabulary and correspondents."""
+    rng = random.Random(7)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+
+    def word():
+        return ''.join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+
+    filler = [word() for _ in range(5000)]
+    topic_subjects = [[word() for _ in range(rng.randint(2, 5))] for _ in range(topics)]
+    topic_words = [[word() for _ in range(12)] for _ in range(topics)]
+    topic_people = [[f"{word()}@{word()}.com" for _ in range(3)] for _ in range(topics)]
+    threads = []
+    for i in range(count):
+        topic = rng.randrange(topics)
+        subject = ' '.join(topic_subjects[topic])
+        if rng.random() < 0.5:
+            subject = 'Re: ' + subject
+        words = rng.sample(topic_words[topic], rng.randint(2, 6)) + [rng.choice(filler) for _ in range(rng.randint(3, 10))]
+        rng.shuffle(words)
+        threads.append({
+            'thread_id': f'thread{i}',
+            'subject': subject,
+            'latest_snippet': ' '.join(words),
+            'participants': [OWNER] + rng.sample(topic_people[topic], rng.randint(1, 2)),
+        })
+    return threads
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=100000)
+    parser.add_argument('--topics', type=int, default=None, help='default: one conversation per 20 threads')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--max-bucket', type=int, default=RelatedThreadIndex().max_bucket)
+    args = parser.parse_args()
+
+    threads = generate_threads(args.threads, args.topics or max(1, args.threads // 20))
+    index = RelatedThreadIndex(max_bucket=args.max_bucket)
+    start = time.perf_counter()
+    index.add_many(threads)
+    build_time = time.perf_counter() - start
+
+    features = [thread_features(thread) for thread in threads]
+    rng = random.Random(1)
+    recalls, index_times, brute_times = [], [], []
+    for query_position in rng.sample(range(len(threads)), args.queries):
+        query = threads[query_position]
+
+        start = time.perf_counter()
+        results = index.similar(query, args.k)
+        index_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        query_features = features[query_position]
+        exact = sorted(
+            (len(query_features & other) / len(query_features | other)
+             for position, other in enumerate(features) if position != query_position),
+            reverse=True
+        )[:args.k]
+        brute_times.append(time.perf_counter() - start)
+
+        threshold = exact[-1] if exact else 0
+        recalls.append(sum(1 for similarity, _ in results if similarity >= threshold) / max(1, len(exact)))
+
+    ms = 1000
+    print(f"Threads: {args.threads}  queries: {args.queries}  k: {args.k}  max bucket: {args.max_bucket}")
+    print(f"index build            {build_time:8.2f}s  ({build_time / args.threads * 1e6:.0f} us/thread)")
+    print(f"index query   p50 {percentile(index_times, 0.5) * ms:8.3f}ms  p99 {percentile(index_times, 0.99) * ms:8.3f}ms")
+    print(f"brute force   p50 {percentile(brute_times, 0.5) * ms:8.3f}ms  p99 {percentile(brute_times, 0.99) * ms:8.3f}ms")
+    print(f"recall@{args.k}      {sum(recalls) / len(recalls):8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -278,6 +278,18 @@ function parseGmailDate(dateStr) {
 // Cache for email analysis results
 const analysisCache = new Map();
 
+// Random ID of this installation, sent as user_id so the backend keeps this
+// mailbox's threads apart from other clients'
+async function getInstallId() {
+    const { install_id } = await chrome.storage.local.get('install_id');
+    if (install_id) {
+        return install_id;
+    }
+    const installId = crypto.randomUUID();
+    await chrome.storage.local.set({ 'install_id': installId });
+    return installId;
+}
+
 async function analyzeEmail(emailId) {
     try {
         // Check cache first
@@ -307,7 +319,8 @@ async function analyzeEmail(emailId) {
             recent_emails: recentEmails.map(email => ({
                 ...email,
                 timestamp: parseGmailDate(email.timestamp)
-            }))
+            })),
+            user_id: await getInstallId()
         };
 
         console.log('Sending request to backend:', requestData);
@@ -11,7 +11,6 @@ This script demonstrates the core capabilities of the Observer Agent:
 import sys
 import os
 import json
-from datetime import datetime
 from typing import Dict, List, Any
 
 # Add the src directory to the Python path
@@ -19,6 +18,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 
 # Import the Observer Agent
 from src.observerAgent import ObserverAgent
+from src.date_parsing import parse_datetime
 
 def print_section_header(title: str) -> None:
     """Print a formatted section header."""
@@ -93,7 +93,7 @@ def create_timeline_view(threads: List[Dict[str, Any]], assignments: Dict[str, s
     current_date = None
     for thread in sorted_threads:
         # Parse the date
-        received_at = datetime.fromisoformat(thread['received_at'].replace('Z', '+00:00'))
+        received_at = parse_datetime(thread['received_at'])
         thread_date = received_at.strftime('%Y-%m-%d')
         
         # Print date header if it changed
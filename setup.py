@@ -81,6 +81,10 @@ setup(
         "jinja2==3.1.2",
         "werkzeug==2.3.7"
     ],
+    extras_require={
+        # Vectorized mailbox scoring (ObserverAgent.score_batch)
+        "batch": ["numpy"]
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -0,0 +1,35 @@
+import hmac
+import ipaddress
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def _is_loopback(host: Optional[str]) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except (TypeError, ValueError):
+        return False
+
+
+def admin_guard(token: str = "") -> Callable[[Request], None]:
+    """
+    Build a FastAPI dependency that protects admin endpoints.
+
+    With a token, requests must send it in the X-Admin-Token header (401
+    otherwise). Without one, only clients connecting from a loopback address are
+    allowed (403 otherwise); note that behind a local reverse proxy every client
+    looks local, so configure a token there.
+    """
+    def require_admin(request: Request) -> None:
+        if token:
+            supplied = request.headers.get(ADMIN_TOKEN_HEADER, "")
+            if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+                raise HTTPException(status_code=401, detail="Admin token required")
+        elif not _is_loopback(request.client.host if request.client else None):
+            raise HTTPException(status_code=403, detail="Admin endpoints are only available from localhost")
+    return require_admin
@@ -5,6 +5,7 @@ from typing import List, Optional
 import datetime
 import anthropic
 from src.cognitive_email_adapter import CognitiveEmailAdapter
+from src.date_parsing import parse_datetime
 from config import ANTHROPIC_API_KEY, CORS_ORIGINS, BACKEND_PORT
 import json
 
@@ -59,7 +60,7 @@ async def analyze_email(request: EmailAnalysisRequest):
             thread_id=email_data["id"],
             latest_snippet=email_data["snippet"],
             participants=[email_data["from"]] + email_data["to"] + email_data["cc"],
-            received_at=datetime.datetime.fromisoformat(email_data["date"].replace('Z', '+00:00')),
+            received_at=parse_datetime(email_data["date"]),
             full_messages=[email_message],
             subject=email_data["subject"]
         )
@@ -0,0 +1,138 @@
+import os
+import sys
+from typing import Dict, List, Any, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; ObserverAgent falls back to analyze_batch
+    np = None
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.keyword_matcher import KeywordMatcher
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class BatchScorer:
+    """
+    Vectorized bucket and trait scoring for whole mailboxes.
+
+    Every thread is tokenized once to build a sparse thread x keyword hit matrix,
+    kept as (row, column) index arrays. Bucket scores are its product with a
+    keyword x bucket weight matrix and trait hits its product with a keyword x trait
+    matrix; both are computed with one bincount per bucket or trait. Results match
+    ObserverAgent's per-thread scoring exactly.
+    """
+
+    def __init__(self, bucket_patterns: Dict[str, List[str]], trait_patterns: Dict[str, List[str]]):
+        if np is None:
+            raise ImportError("BatchScorer requires numpy")
+        buckets = KeywordMatcher(bucket_patterns)
+        traits = KeywordMatcher(trait_patterns)
+        self.bucket_names = buckets.labels
+        self.trait_names = traits.labels
+        self.matcher = KeywordMatcher({"all": buckets.keywords + traits.keywords})
+        self.keyword_ids = {keyword: i for i, keyword in enumerate(self.matcher.keywords)}
+
+        self.bucket_weights = np.zeros((len(self.keyword_ids), len(self.bucket_names)), dtype=np.int32)
+        for keyword, label_counts in buckets.weights.items():
+            for label, count in label_counts:
+                self.bucket_weights[self.keyword_ids[keyword], self.bucket_names.index(label)] = count
+        self.trait_weights = np.zeros((len(self.keyword_ids), len(self.trait_names)), dtype=np.int32)
+        for keyword, label_counts in traits.weights.items():
+            for label, count in label_counts:
+                self.trait_weights[self.keyword_ids[keyword], self.trait_names.index(label)] = count
+
+    def hit_matrix(self, texts: Sequence[str]):
+        """Return the (rows, columns) of the sparse thread x keyword hit matrix."""
+        rows: List[int] = []
+        columns: List[int] = []
+        find = self.matcher.find
+        keyword_ids = self.keyword_ids
+        for row, text in enumerate(texts):
+            hits = find(text)
+            if hits:
+                rows.extend([row] * len(hits))
+                columns.extend(map(keyword_ids.__getitem__, hits))
+        return np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)
+
+    def _product(self, rows, columns, weights, count: int):
+        """Multiply the sparse hit matrix by a dense keyword x label matrix."""
+        result = np.zeros((count, weights.shape[1]), dtype=np.int64)
+        for label in range(weights.shape[1]):
+            column_weights = weights[columns, label]
+            if column_weights.any():
+                result[:, label] = np.bincount(rows, weights=column_weights, minlength=count)
+        return result
+
+    def score(self, threads: Sequence[Dict[str, Any]]) -> 'BatchScores':
+        """Score a batch of thread dictionaries."""
+        texts = [f"{thread['subject']} {thread.get('latest_snippet', '')}".lower() for thread in threads]
+        rows, columns = self.hit_matrix(texts)
+        return BatchScores(
+            self,
+            [thread.get('thread_id') for thread in threads],
+            threads[-1].get('received_at') if len(threads) else None,
+            self._product(rows, columns, self.bucket_weights, len(texts)),
+            self._product(rows, columns, self.trait_weights, len(texts)) > 0
+        )
+
+
+class BatchScores:
+    """
+    Scores of a batch; offers the same derivations as BatchAnalysis, so it can be
+    passed to ObserverAgent.suggest_buckets, assign_threads_to_buckets and
+    update_user_memory as `analysis`.
+    """
+
+    def __init__(self, scorer: BatchScorer, thread_ids: List[str], last_received_at,
+                 bucket_scores, trait_hits):
+        self.scorer = scorer
+        self.thread_ids = thread_ids
+        self.last_received_at = last_received_at
+        self.bucket_scores = bucket_scores  # threads x buckets, in BUCKET_PATTERNS order
+        self.trait_hits = trait_hits        # threads x traits, boolean
+
+    def suggested_buckets(self, limit: int = 5) -> List[str]:
+        """Return the top buckets by total score, ties in order of first appearance."""
+        totals = self.bucket_scores.sum(axis=0)
+        scored = np.flatnonzero(totals)
+        if not len(scored):
+            return []
+        first_rows = (self.bucket_scores[:, scored] > 0).argmax(axis=0)
+        # Counter.most_common keeps insertion order on ties: first thread, then table order
+        order = sorted(zip(first_rows.tolist(), scored.tolist()))
+        ranked = sorted(order, key=lambda item: -totals[item[1]])
+        return [self.scorer.bucket_names[bucket] for _, bucket in ranked[:limit]]
+
+    def assignment_array(self, buckets: List[str]):
+        """Return each thread's best bucket among `buckets` as an array of names."""
+        names = list(buckets) + ["Uncategorized"]
+        if not buckets or not self.thread_ids:
+            return np.full(len(self.thread_ids), "Uncategorized", dtype=object)
+        zeros = np.zeros(len(self.thread_ids), dtype=self.bucket_scores.dtype)
+        columns = [self.bucket_scores[:, self.scorer.bucket_names.index(bucket)]
+                   if bucket in self.scorer.bucket_names else zeros for bucket in buckets]
+        candidate_scores = np.stack(columns, axis=1)
+        # argmax returns the first maximum, i.e. the first-listed bucket wins ties
+        best = candidate_scores.argmax(axis=1)
+        best_scores = candidate_scores[np.arange(len(best)), best]
+        best[best_scores == 0] = len(buckets)
+        return np.array(names, dtype=object)[best]
+
+    def assignments(self, buckets: List[str]) -> Dict[str, str]:
+        """Map each thread ID to its best bucket among `buckets`."""
+        return dict(zip(self.thread_ids, self.assignment_array(buckets).tolist()))
+
+    def user_traits(self) -> Dict[str, Any]:
+        """Return traits seen anywhere in the batch, stamped with the last thread's time."""
+        active = self.trait_hits.any(axis=0).tolist()
+        user_traits = dict(zip(self.scorer.trait_names, active))
+        timestamps = {}
+        if self.thread_ids:
+            timestamps = {trait: self.last_received_at for trait, is_active in user_traits.items() if is_active}
+        return {"userTraits": user_traits, "timestamps": timestamps}
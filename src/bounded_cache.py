@@ -0,0 +1,165 @@
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a cached value by its JSON length."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'created_at', 'expires_at')
+
+    def __init__(self, value: Any, size: int, created_at: float, expires_at: Optional[float]):
+        self.value = value
+        self.size = size
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+
+class BoundedCache:
+    """
+    LRU cache bounded by entry count and by total size, with a per-entry TTL.
+
+    Sizes are estimated once per entry with `sizeof` (JSON length by default).
+    Inserting past either bound evicts least recently used entries; an expired
+    entry is dropped when it is next looked up, or by purge_expired(). A value
+    larger than max_bytes on its own is not cached. All methods are thread-safe.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024,
+                 ttl: Optional[float] = 3600.0, sizeof: Callable[[Any], int] = estimate_size,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bytes = 0
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry, self.clock())
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return entry.expires_at is not None and now >= entry.expires_at
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value and mark it recently used, or `default`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, self.clock()):
+                self._discard(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Cache a value, replacing any entry under the same key.
+
+        `ttl` overrides the cache's default TTL for this entry. Returns False if
+        the value alone exceeds max_bytes and was not cached.
+        """
+        size = self.sizeof(value)
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            if size > self.max_bytes or self.max_entries <= 0:
+                return False
+            now = self.clock()
+            self._entries[key] = _Entry(value, size, now, now + ttl if ttl is not None else None)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value, or `default`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._discard(key)
+            return entry.value
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns how many were dropped."""
+        with self._lock:
+            now = self.clock()
+            expired = [key for key, entry in self._entries.items() if self._expired(entry, now)]
+            for key in expired:
+                self._discard(key)
+            self.expirations += len(expired)
+            return len(expired)
+
+    def clear(self) -> int:
+        """Drop every entry, keeping the counters; returns how many were dropped."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self.bytes = 0
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Return occupancy, bounds and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Describe cached entries, most recently used first, without touching their recency."""
+        with self._lock:
+            now = self.clock()
+            described = []
+            for key in reversed(self._entries):
+                if limit is not None and len(described) >= limit:
+                    break
+                entry = self._entries[key]
+                described.append({
+                    "key": key,
+                    "bytes": entry.size,
+                    "age": now - entry.created_at,
+                    "expires_in": entry.expires_at - now if entry.expires_at is not None else None
+                })
+            return described
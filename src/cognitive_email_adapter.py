@@ -1,22 +1,71 @@
+import asyncio
+import contextlib
 import datetime
+import hashlib
 import sys
 import os
 import json
-from typing import Dict, List, Any, Optional
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+import anthropic
 from langchain_anthropic import ChatAnthropic
+from langchain_core.pydantic_v1 import root_validator
 from langchain.output_parsers import ResponseSchema, StructuredOutputParser
 from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
-from src.config import ANTHROPIC_API_KEY
+from langchain_core.output_parsers.json import parse_json_markdown
+from langchain_core.outputs import ChatResult
+from src.config import (
+    ANTHROPIC_API_KEY, LLM_MAX_CONCURRENCY, LLM_BACKEND, MOCK_LLM_URL,
+    EMAIL_RESULT_CACHE_MAX_ENTRIES, EMAIL_RESULT_CACHE_TTL, PROCESSED_EMAIL_INDEX_MAX_ENTRIES,
+    LLM_BATCH_TOKEN_BUDGET, LLM_BATCH_MAX_EMAILS, LLM_MAX_BODY_TOKENS
+)
+from src.token_budget import condense_body, estimate_tokens, pack_batches
+from src.json_stream import JSONFieldStream
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Initialize LangChain with Anthropic
-llm = ChatAnthropic(
-    model="claude-3-opus-20240229",
-    anthropic_api_key=ANTHROPIC_API_KEY,
-    temperature=0
-)
+class ChatAnthropicWithStopReason(ChatAnthropic):
+    """
+    ChatAnthropic whose answers carry the API's stop_reason in response_metadata.
+    
+    langchain-anthropic 0.1.x drops it, so an answer cut off at max_tokens could
+    not be told from a complete one.
+    """
+    def _format_output(self, data: Any, **kwargs: Any) -> ChatResult:
+        result = super()._format_output(data, **kwargs)
+        result.generations[0].message.response_metadata["stop_reason"] = data.stop_reason
+        return result
+
+class ChatAnthropicAtURL(ChatAnthropicWithStopReason):
+    """
+    ChatAnthropic whose clients send requests to anthropic_api_url.
+    
+    langchain-anthropic 0.1.x accepts anthropic_api_url but builds its clients
+    without it, so they would use ANTHROPIC_BASE_URL or the public API instead.
+    """
+    @root_validator()
+    def clients_at_api_url(cls, values: Dict) -> Dict:
+        api_key = values["anthropic_api_key"].get_secret_value()
+        values["_client"] = anthropic.Client(api_key=api_key, base_url=values["anthropic_api_url"])
+        values["_async_client"] = anthropic.AsyncClient(api_key=api_key, base_url=values["anthropic_api_url"])
+        return values
+
+# Initialize LangChain with Anthropic; adapters use this model unless given another
+if LLM_BACKEND == 'mock':
+    default_llm = ChatAnthropicAtURL(
+        model="claude-3-opus-20240229",
+        anthropic_api_key=ANTHROPIC_API_KEY,
+        anthropic_api_url=MOCK_LLM_URL,
+        temperature=0
+    )
+else:
+    default_llm = ChatAnthropicWithStopReason(
+        model="claude-3-opus-20240229",
+        anthropic_api_key=ANTHROPIC_API_KEY,
+        temperature=0
+    )
 
 # Define the output schema
 response_schemas = [
@@ -35,6 +84,24 @@ response_schemas = [
     ResponseSchema(name="participants_analysis", description="Analysis of email participants and their roles")
 ]
 output_parser = StructuredOutputParser.from_response_schemas(response_schemas)
+ANALYSIS_FIELDS = tuple(schema.name for schema in response_schemas)
+
+# Batch answers hold one analysis in the schema above per email, keyed by its Email ID
+BATCH_FORMAT_INSTRUCTIONS = (
+    'The output should be a markdown code snippet formatted in the following schema, including the leading '
+    'and trailing "```json" and "```". It has one entry per email, keyed by the Email ID given above:\n\n'
+    '```json\n{\n\t"<Email ID>": {\n'
+    + "\n".join(f'\t\t"{schema.name}": {schema.type}  // {schema.description}' for schema in response_schemas)
+    + '\n\t}\n}\n```'
+)
+
+# Streamed analyses ask for the fields the popup shows first at the start of the answer
+STREAM_FIELD_ORDER = ("primary_intent", "priority", "urgency") + tuple(
+    schema.name for schema in response_schemas if schema.name not in ("primary_intent", "priority", "urgency")
+)
+STREAM_FORMAT_INSTRUCTIONS = StructuredOutputParser.from_response_schemas(
+    sorted(response_schemas, key=lambda schema: STREAM_FIELD_ORDER.index(schema.name))
+).get_format_instructions()
 
 # Create the prompt template
 PROMPT_TEMPLATE = """
@@ -131,8 +198,21 @@ prompt = ChatPromptTemplate.from_messages([
     HumanMessagePromptTemplate.from_template(PROMPT_TEMPLATE)
 ])
 
+# Estimated tokens of a batch prompt without its emails, and of one email's analysis in the answer
+BATCH_PROMPT_TOKENS = estimate_tokens(PROMPT_TEMPLATE + BATCH_FORMAT_INSTRUCTIONS + "Emails to Analyze:\n")
+ANALYSIS_OUTPUT_TOKENS = 300
+
+# Identifies the prompts and output formats; cached responses are only reused for the same version
+PROMPT_VERSION = hashlib.sha1("\x1f".join([
+    PROMPT_TEMPLATE, output_parser.get_format_instructions(), BATCH_FORMAT_INSTRUCTIONS,
+    STREAM_FORMAT_INSTRUCTIONS
+]).encode('utf-8')).hexdigest()[:12]
+
 # Now import the modules
 from src.ingestionAgent import IngestionAgent, EmailMessage, IngestedThread
+from src.bounded_cache import BoundedCache
+from src.llm_cache import LLMResponseCache
+from src.processed_index import ProcessedEmailIndex
 
 class Email:
     """Basic email class for cognitive processing."""
@@ -146,19 +226,97 @@ class Email:
         self.thread_id = thread_id
         self.metadata = {}
 
+    @property
+    def email_id(self) -> str:
+        """
+        Stable ID of the email's normalized content: sender, recipients, subject,
+        body and thread.
+        
+        Addresses are compared case-insensitively and recipients in any order;
+        whitespace runs in the subject and body count as one space. The timestamp
+        is left out because the API defaults a missing one to the current time.
+        """
+        key = "\x1f".join([
+            self.sender.strip().lower(),
+            ",".join(sorted(recipient.strip().lower() for recipient in self.recipients)),
+            " ".join(self.subject.split()),
+            " ".join(self.body.split()),
+            self.thread_id or ""
+        ])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def _is_complete_analysis(analysis: Any) -> bool:
+    """Whether a batch entry has every field of the schema, as output_parser.parse requires of single answers."""
+    return isinstance(analysis, dict) and all(field in analysis for field in ANALYSIS_FIELDS)
+
 class CognitiveEmailAdapter:
     """
     Adapter that connects the Ingestion Agent with the Cognitive Email System.
     This allows the hierarchical agent architecture to work with ingested email data.
+    
+    LLM calls never block the event loop: models are awaited through their async
+    interface (ainvoke), or run in a thread pool of `max_concurrency` workers if
+    they only offer invoke. At most `max_concurrency` calls are in flight at once; further
+    requests wait for a slot. An answer cut off at the model's max_tokens counts
+    as a failed call.
+    Reads and writes of the response_cache run in worker threads as well.
     """
-    def __init__(self, data_path: str = 'data/syntheticEmails.json'):
+    def __init__(self, data_path: str = 'data/syntheticEmails.json', llm: Any = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 response_cache: Optional[LLMResponseCache] = None,
+                 batch_token_budget: int = LLM_BATCH_TOKEN_BUDGET,
+                 batch_max_emails: int = LLM_BATCH_MAX_EMAILS,
+                 max_body_tokens: int = LLM_MAX_BODY_TOKENS):
         self.ingestion_agent = IngestionAgent(data_path)
-        self.processed_emails = []
+        # Emails analyzed so far, by email ID; re-sent emails count as duplicates
+        self.processed_emails = ProcessedEmailIndex(max_entries=PROCESSED_EMAIL_INDEX_MAX_ENTRIES)
+        # Analyses by email ID, from single and batch prompts
+        self.results = BoundedCache(max_entries=EMAIL_RESULT_CACHE_MAX_ENTRIES, ttl=EMAIL_RESULT_CACHE_TTL)
+        # Optional disk cache behind `results`, so analyses survive restarts
+        self.response_cache = response_cache
+        self.llm = llm if llm is not None else default_llm
+        self.model_name = getattr(self.llm, 'model', None) or type(self.llm).__name__
+        # Batch prompts stay within batch_token_budget (prompt, emails and expected answers)
+        self.batch_token_budget = batch_token_budget
+        self.batch_max_emails = batch_max_emails
+        self.max_body_tokens = max_body_tokens
+        self.max_concurrency = max_concurrency
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self._llm_executor: Optional[ThreadPoolExecutor] = None
         
     def initialize_system(self):
         """Initialize the cognitive system with basic context."""
         pass  # We'll use LangChain for analysis instead
     
+    def _slots(self) -> asyncio.Semaphore:
+        # Created on first use so the semaphore belongs to the running loop
+        if self._llm_slots is None:
+            self._llm_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._llm_slots
+    
+    async def _invoke_llm(self, messages: List[Any]) -> Any:
+        """Send messages to the LLM without blocking the event loop."""
+        async with self._slots():
+            if hasattr(self.llm, 'ainvoke'):
+                response = await self.llm.ainvoke(messages)
+            else:
+                if self._llm_executor is None:
+                    self._llm_executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm')
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(self._llm_executor, self.llm.invoke, messages)
+        if (getattr(response, 'response_metadata', None) or {}).get("stop_reason") == "max_tokens":
+            raise ValueError("The LLM answer was cut off at max_tokens")
+        return response
+    
+    async def _stream_llm(self, messages: List[Any]) -> AsyncIterator[str]:
+        """Yield the LLM's answer text as it is generated, holding a concurrency slot throughout."""
+        if not hasattr(self.llm, 'astream'):
+            yield (await self._invoke_llm(messages)).content
+            return
+        async with self._slots():
+            async for chunk in self.llm.astream(messages):
+                yield chunk.content
+    
     def convert_to_cognitive_email(self, ingested_thread: IngestedThread) -> List[Email]:
         """Convert an IngestedThread to a list of Email objects for the cognitive system."""
         emails = []
@@ -177,97 +335,246 @@ class CognitiveEmailAdapter:
             
         return emails
     
-    async def process_email(self, email: Email, recent_emails: List[Email] = None) -> Dict[str, Any]:
-        """Process a single email using LangChain with Claude."""
+    async def process_email(self, email: Email, recent_emails: List[Email] = None,
+                            raise_errors: bool = False) -> Dict[str, Any]:
+        """
+        Process a single email using LangChain with Claude.
+        
+        When recent emails are given, the email and every recent email without a
+        cached analysis are analyzed in batch prompts. Bodies are condensed to
+        max_body_tokens, and emails are packed into as few prompts as fit the
+        token budget, and whose answers fit the model's max_tokens, which are
+        sent concurrently. Each answer holds one
+        analysis per email ID; all of them are cached, so a later call for any
+        email of the batch needs no LLM round-trip. With a response_cache the
+        analyses are also kept on disk and survive restarts.
+        
+        If the analysis fails, the default analysis is returned, or the error
+        is raised with raise_errors.
+        """
         try:
             print(f"Starting to process email: {email.subject}")
             
-            # If this is the first email in a batch, process all emails together
-            if recent_emails and not self.processed_emails:
-                print(f"Processing batch of {len(recent_emails) + 1} emails")
-                all_emails = [email] + recent_emails
+            # Served from an earlier single or batch analysis
+            cached = await self._get_cached_analysis(email)
+            if cached is not None:
+                print(f"Email {email.subject} was already analyzed")
+                self.processed_emails.add(email)
+                return cached
+            
+            # Analyze the recent emails along with this one, unless they were processed already
+            batch = [email]
+            batch_ids = {email.email_id}
+            for recent_email in recent_emails or []:
+                if recent_email.email_id in batch_ids or await self._was_processed(recent_email):
+                    continue
+                batch.append(recent_email)
+                batch_ids.add(recent_email.email_id)
+            
+            if len(batch) > 1:
+                print(f"Processing batch of {len(batch)} emails")
                 
-                # Format all emails for analysis
-                emails_context = "Emails to Analyze:\n"
-                for i, current_email in enumerate(all_emails, 1):
-                    emails_context += f"\nEmail {i}:\n"
-                    emails_context += f"Subject: {current_email.subject}\n"
-                    emails_context += f"From: {current_email.sender}\n"
-                    emails_context += f"Date: {current_email.timestamp}\n"
-                    emails_context += f"Body: {current_email.body}\n"
-                    emails_context += f"Thread ID: {current_email.thread_id}\n"
-                    emails_context += "---\n"
-
-                print("Formatting prompt for batch analysis")
-                # Format the prompt with all emails
-                formatted_prompt = prompt.format_messages(
-                    subject="Multiple Emails Analysis",
-                    sender="Multiple Senders",
-                    recipients="Multiple Recipients",
-                    body=emails_context,
-                    recent_emails="",  # No need for recent emails context since we're analyzing all at once
-                    format_instructions=output_parser.get_format_instructions()
+                # Pack the emails into prompts within the token budget and send them concurrently
+                blocks = [self._format_email_block(batch_email) for batch_email in batch]
+                plan = pack_batches(
+                    [estimate_tokens(block) + ANALYSIS_OUTPUT_TOKENS for block in blocks],
+                    max(1, self.batch_token_budget - BATCH_PROMPT_TOKENS),
+                    self._emails_per_prompt()
                 )
+                print(f"Sending {len(plan)} batch request(s) to Claude")
+                results = await asyncio.gather(
+                    *(self._analyze_batch([batch[i] for i in indexes], [blocks[i] for i in indexes])
+                      for indexes in plan),
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, Exception):
+                        print(f"Error in batch request: {result}")
                 
-                print("Sending batch request to Claude")
-                # Get response from Claude through LangChain
-                response = llm.invoke(formatted_prompt)
-                print("Received response from Claude")
-                
-                print("Parsing structured output")
-                # Parse the structured output
-                result = output_parser.parse(response.content)
-                
-                # Store all emails as processed
-                self.processed_emails.extend(all_emails)
-                
-                # Extract the analysis for the current email
-                current_email_analysis = self._extract_email_analysis(result, email)
-                return current_email_analysis
-            
-            # If this email was already processed in a batch, return its analysis
-            if email in self.processed_emails:
-                print(f"Email {email.subject} was already processed in batch")
-                return self._get_cached_analysis(email)
+                # Extract the analysis for the current email, which the first prompt holds
+                if not isinstance(results[0], Exception):
+                    current_email_analysis = self._extract_email_analysis(results[0], email)
+                    if current_email_analysis is not None:
+                        return current_email_analysis
+                print(f"Batch result has no analysis for {email.subject}, analyzing it alone")
             
             # If this is a single email analysis
             print("Processing single email")
             formatted_prompt = prompt.format_messages(
-                subject=email.subject,
-                sender=email.sender,
-                recipients=', '.join(email.recipients),
-                body=email.body,
-                recent_emails="",  # No recent emails context for single analysis
+                body=condense_body(email.body, self.max_body_tokens),
                 format_instructions=output_parser.get_format_instructions()
             )
             
             print("Sending request to Claude")
-            response = llm.invoke(formatted_prompt)
+            response = await self._invoke_llm(formatted_prompt)
             print("Received response from Claude")
             
             print("Parsing structured output")
-            result = output_parser.parse(response.content)
+            result = self._format_result(output_parser.parse(response.content))
             
             # Store the email for future reference
-            self.processed_emails.append(email)
+            self.processed_emails.add(email)
+            await self._store_analysis(email, result)
             
-            return self._format_result(result)
+            return dict(result)
             
         except Exception as e:
             print(f"Error processing email with LangChain: {e}")
+            if raise_errors:
+                raise
             return self._get_default_analysis()
 
-    def _extract_email_analysis(self, batch_result: Dict[str, Any], email: Email) -> Dict[str, Any]:
-        """Extract the analysis for a specific email from the batch result."""
-        # For now, return the batch result as is
-        # In the future, we can parse the batch result to extract specific email analysis
-        return self._format_result(batch_result)
-
-    def _get_cached_analysis(self, email: Email) -> Dict[str, Any]:
-        """Get cached analysis for an email that was processed in a batch."""
-        # For now, return a default analysis
-        # In the future, we can store and retrieve specific analyses for each email
-        return self._get_default_analysis()
+    async def stream_email_analysis(self, email: Email,
+                                    raise_errors: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Analyze a single email, yielding (field, value) pairs as soon as each
+        field of the streamed answer parses.
+        
+        The prompt asks for primary_intent, priority and urgency first (see
+        STREAM_FIELD_ORDER). Every field is yielded exactly once: a cached
+        analysis at once, and fields the answer lacks, or all remaining fields
+        if the call fails, from the default analysis. With raise_errors, a
+        failure is raised instead, after the fields yielded so far. The
+        complete analysis is cached like those of process_email.
+        """
+        sent = set()
+        try:
+            print(f"Starting to stream analysis of email: {email.subject}")
+            cached = await self._get_cached_analysis(email)
+            if cached is not None:
+                print(f"Email {email.subject} was already analyzed")
+                self.processed_emails.add(email)
+                for field in STREAM_FIELD_ORDER:
+                    sent.add(field)
+                    yield field, cached.get(field)
+                return
+            
+            formatted_prompt = prompt.format_messages(
+                body=condense_body(email.body, self.max_body_tokens),
+                format_instructions=STREAM_FORMAT_INSTRUCTIONS
+            )
+            print("Streaming request to Claude")
+            text = ""
+            fields = JSONFieldStream()
+            # Closed promptly if the consumer stops early, releasing the concurrency slot
+            async with contextlib.aclosing(self._stream_llm(formatted_prompt)) as chunks:
+                async for chunk in chunks:
+                    text += chunk
+                    for field, value in fields.feed(chunk):
+                        if field in STREAM_FIELD_ORDER and field not in sent:
+                            sent.add(field)
+                            yield field, self._format_result({field: value})[field]
+            
+            print("Parsing structured output")
+            result = self._format_result(output_parser.parse(text))
+            self.processed_emails.add(email)
+            await self._store_analysis(email, result)
+            remaining = result
+            
+        except Exception as e:
+            print(f"Error streaming email analysis with LangChain: {e}")
+            if raise_errors:
+                raise
+            remaining = self._get_default_analysis()
+        
+        for field in STREAM_FIELD_ORDER:
+            if field not in sent:
+                yield field, remaining.get(field)
+
+    def _format_email_block(self, email: Email) -> str:
+        """Describe one email of a batch prompt, with its body condensed to the body budget."""
+        return (
+            f"Email ID: {email.email_id}\n"
+            f"Subject: {email.subject}\n"
+            f"From: {email.sender}\n"
+            f"Date: {email.timestamp}\n"
+            f"Body: {condense_body(email.body, self.max_body_tokens)}\n"
+            f"Thread ID: {email.thread_id}\n"
+        )
+
+    def _emails_per_prompt(self) -> int:
+        """Most emails a batch prompt may hold: batch_max_emails, and no more analyses than fit max_tokens."""
+        output_cap = getattr(self.llm, 'max_tokens', None)
+        if not isinstance(output_cap, int) or output_cap <= 0:
+            return self.batch_max_emails
+        fitting = max(1, output_cap // ANALYSIS_OUTPUT_TOKENS)
+        return min(self.batch_max_emails, fitting) if self.batch_max_emails else fitting
+
+    async def _analyze_batch(self, emails: List[Email], blocks: List[str]) -> Dict[str, Any]:
+        """Analyze emails in one prompt, cache every analysis and return the parsed answer."""
+        # Format all emails for analysis
+        emails_context = "Emails to Analyze:\n"
+        for i, block in enumerate(blocks, 1):
+            emails_context += f"\nEmail {i}:\n{block}---\n"
+        
+        formatted_prompt = prompt.format_messages(
+            body=emails_context,
+            format_instructions=BATCH_FORMAT_INSTRUCTIONS
+        )
+        response = await self._invoke_llm(formatted_prompt)
+        
+        # Parse the structured output and keep every email's analysis
+        result = parse_json_markdown(response.content)
+        await self._store_batch_analysis(result, emails)
+        return result
+
+    async def _store_batch_analysis(self, batch_result: Dict[str, Any], batch: List[Email]) -> None:
+        """Cache the analysis of every email the batch result covers."""
+        if not isinstance(batch_result, dict):
+            print("Batch result is not keyed by email ID, nothing to cache")
+            return
+        for batch_email in batch:
+            analysis = batch_result.get(batch_email.email_id)
+            if _is_complete_analysis(analysis):
+                await self._store_analysis(batch_email, self._format_result(dict(analysis)))
+                self.processed_emails.add(batch_email)
+            elif analysis is not None:
+                print(f"Batch analysis of {batch_email.subject} is incomplete, not caching it")
+
+    def _extract_email_analysis(self, batch_result: Dict[str, Any], email: Email) -> Optional[Dict[str, Any]]:
+        """Extract the analysis for a specific email from the batch result, if it is complete."""
+        analysis = batch_result.get(email.email_id) if isinstance(batch_result, dict) else None
+        return self._format_result(dict(analysis)) if _is_complete_analysis(analysis) else None
+
+    async def _was_processed(self, email: Email) -> bool:
+        """
+        Whether an email was analyzed before: an O(1) check of the processed-email
+        index, then of the caches, e.g. for analyses kept on disk across a restart.
+        """
+        if email in self.processed_emails:
+            return True
+        if await self._lookup_analysis(email) is None:
+            return False
+        self.processed_emails.add(email)
+        return True
+
+    async def _lookup_analysis(self, email: Email) -> Optional[Dict[str, Any]]:
+        """Find an email's analysis in memory, then on disk, reading the disk in a worker thread."""
+        cached = self.results.get(email.email_id)
+        if cached is None and self.response_cache is not None:
+            try:
+                cached = await asyncio.to_thread(
+                    self.response_cache.get, self.model_name, PROMPT_VERSION, email.email_id)
+            except sqlite3.Error as e:
+                print(f"Error reading LLM response cache: {e}")
+            if cached is not None:
+                self.results.set(email.email_id, cached)
+        return cached
+
+    async def _store_analysis(self, email: Email, analysis: Dict[str, Any]) -> None:
+        """Keep an email's analysis in memory and on disk, writing the disk in a worker thread."""
+        self.results.set(email.email_id, analysis)
+        if self.response_cache is not None:
+            try:
+                await asyncio.to_thread(
+                    self.response_cache.set, self.model_name, PROMPT_VERSION, email.email_id, analysis)
+            except sqlite3.Error as e:
+                print(f"Error writing LLM response cache: {e}")
+
+    async def _get_cached_analysis(self, email: Email) -> Optional[Dict[str, Any]]:
+        """Get the cached analysis of an email, from a single or batch analysis."""
+        cached = await self._lookup_analysis(email)
+        return dict(cached) if cached is not None else None
 
     def _format_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Format and validate the analysis result."""
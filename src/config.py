@@ -4,8 +4,15 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# LLM backend: "anthropic" calls the Anthropic API; "mock" sends the same requests to a
+# local mock server (src/mock_llm_server.py) at MOCK_LLM_URL and needs no API key
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'anthropic')
+MOCK_LLM_URL = os.getenv('MOCK_LLM_URL', 'http://127.0.0.1:8765')
+
 # Get API key from environment variable
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
+if not ANTHROPIC_API_KEY and LLM_BACKEND == 'mock':
+    ANTHROPIC_API_KEY = 'mock-key'
 
 if not ANTHROPIC_API_KEY:
     raise ValueError("ANTHROPIC_API_KEY environment variable is not set. Please create a .env file with your API key.")
@@ -16,4 +23,40 @@ CORS_ORIGINS = [
     "chrome-extension://*",
     "http://localhost:8000",
     "http://127.0.0.1:8000"
-] 
\ No newline at end of file
+] 
+
+# Long-term observer memory: "json" keeps one shared document (the demo default),
+# "sqlite" keeps traits per user in a WAL-mode database
+OBSERVER_MEMORY_BACKEND = os.getenv('OBSERVER_MEMORY_BACKEND', 'json')
+OBSERVER_MEMORY_DB = os.getenv('OBSERVER_MEMORY_DB', 'data/observerMemory.db')
+
+# Cache of /analyze responses: LRU bounded by entry count and approximate bytes, with a TTL in seconds
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', '1024'))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+ANALYSIS_CACHE_TTL = float(os.getenv('ANALYSIS_CACHE_TTL', '3600'))
+
+# Token for the /admin endpoints (X-Admin-Token header); when empty they only answer localhost
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# Per-email LLM analyses kept by CognitiveEmailAdapter, e.g. from batch prompts
+EMAIL_RESULT_CACHE_MAX_ENTRIES = int(os.getenv('EMAIL_RESULT_CACHE_MAX_ENTRIES', '4096'))
+EMAIL_RESULT_CACHE_TTL = float(os.getenv('EMAIL_RESULT_CACHE_TTL', '3600'))
+
+# IDs of emails CognitiveEmailAdapter has processed, least recently seen evicted first
+PROCESSED_EMAIL_INDEX_MAX_ENTRIES = int(os.getenv('PROCESSED_EMAIL_INDEX_MAX_ENTRIES', '10000'))
+
+# Disk cache of LLM analyses, keyed by model, prompt version and email content; empty disables it
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'data/llmResponseCache.db')
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '100000'))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', str(30 * 24 * 3600)))
+
+# Batch prompts: estimated tokens per prompt (instructions, emails and expected answers),
+# emails per prompt (fewer if their answers would not fit the model's max_tokens),
+# and tokens per email body before it is condensed
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv('LLM_BATCH_TOKEN_BUDGET', '8000'))
+LLM_BATCH_MAX_EMAILS = int(os.getenv('LLM_BATCH_MAX_EMAILS', '8'))
+LLM_MAX_BODY_TOKENS = int(os.getenv('LLM_MAX_BODY_TOKENS', '1500'))
+
+# Maximum number of LLM requests in flight at once
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
@@ -0,0 +1,64 @@
+import datetime
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Optional, Union
+
+try:
+    import dateutil.parser as _dateutil_parser
+except ImportError:  # dateutil is only a last resort
+    _dateutil_parser = None
+
+DATE_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_datetime(value: str) -> datetime.datetime:
+    """
+    Parse an ISO-8601 or RFC 2822 timestamp.
+
+    Tries a strict ISO-8601 fast path first, then RFC 2822 as used in email Date:
+    headers, and dateutil only as a last resort. Results are memoized because the
+    same timestamps recur across a mailbox and across API requests.
+
+    Raises:
+        ValueError: if no parser understands the value
+    """
+    text = value.strip()
+
+    # ISO-8601, e.g. 2025-04-30T18:30:00Z (fromisoformat only accepts 'Z' from 3.11)
+    iso_text = text[:-1] + '+00:00' if text[-1:] in ('Z', 'z') else text
+    try:
+        return datetime.datetime.fromisoformat(iso_text)
+    except ValueError:
+        pass
+
+    # RFC 2822, e.g. Wed, 30 Apr 2025 18:30:00 -0700 (PDT)
+    try:
+        return parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        pass
+
+    if _dateutil_parser is not None:
+        try:
+            return _dateutil_parser.parse(text)
+        except (ValueError, OverflowError) as e:
+            raise ValueError(f"Unrecognized date {value!r}: {e}") from None
+    raise ValueError(f"Unrecognized date {value!r}")
+
+
+def parse_date(value: Union[str, datetime.datetime, None],
+               default: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """
+    Lenient variant of parse_datetime for request data.
+
+    Datetimes are passed through unchanged. Missing or unparseable values fall back
+    to `default`, or to the current time if no default is given.
+    """
+    if isinstance(value, datetime.datetime):
+        return value
+    if value:
+        try:
+            return parse_datetime(value)
+        except ValueError as e:
+            print(f"Error parsing date: {e}")
+    return default if default is not None else datetime.datetime.now()
@@ -1,9 +1,60 @@
 import json
+import os
+import sys
+import heapq
+import hashlib
 import datetime
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from sys import intern
+from typing import Dict, List, Any, Optional, Iterator, Iterable, IO, Tuple
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.date_parsing import parse_datetime
+from src.json_stream import JSONStreamReader
+
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_EPOCH_NAIVE = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_SECOND = datetime.timedelta(seconds=1)
+_TIMEZONES: Dict[int, datetime.timezone] = {0: datetime.timezone.utc}
+
+
+def _to_timestamp(value: datetime.datetime) -> Tuple[int, Optional[int]]:
+    """Split a datetime into epoch microseconds and a UTC offset in seconds (None if naive)."""
+    offset = value.utcoffset()
+    if offset is None:
+        return (value - _EPOCH_NAIVE) // _MICROSECOND, None
+    return (value - _EPOCH) // _MICROSECOND, offset // _SECOND
+
+
+def _from_timestamp(timestamp: int, offset: Optional[int]) -> datetime.datetime:
+    """Rebuild the datetime stored by _to_timestamp."""
+    if offset is None:
+        return _EPOCH_NAIVE + datetime.timedelta(microseconds=timestamp)
+    timezone = _TIMEZONES.get(offset)
+    if timezone is None:
+        timezone = _TIMEZONES.setdefault(offset, datetime.timezone(datetime.timedelta(seconds=offset)))
+    return (_EPOCH + datetime.timedelta(microseconds=timestamp)).astimezone(timezone)
+
+
+def _intern_addresses(addresses: Optional[List[str]]) -> List[str]:
+    """Intern addresses so every occurrence across the mailbox shares one string object."""
+    return [intern(address) for address in addresses] if addresses else []
+
 
 class EmailMessage:
-    """Representation of an individual email message."""
+    """
+    Representation of an individual email message.
+    
+    Addresses are interned and the date is kept as epoch microseconds; the
+    datetime is only built when `date` is read.
+    """
+    __slots__ = ('id', 'from_address', 'to_addresses', 'cc_addresses',
+                 '_ts', '_tz', 'subject', 'snippet', 'body')
+    
     def __init__(self, 
                  id: str,
                  from_address: str, 
@@ -14,18 +65,26 @@ class EmailMessage:
                  body: str,
                  cc_addresses: List[str] = None):
         self.id = id
-        self.from_address = from_address
-        self.to_addresses = to_addresses
-        self.cc_addresses = cc_addresses or []
-        self.date = date
+        self.from_address = intern(from_address)
+        self.to_addresses = _intern_addresses(to_addresses)
+        self.cc_addresses = _intern_addresses(cc_addresses)
+        self._ts, self._tz = _to_timestamp(date)
         self.subject = subject
         self.snippet = snippet
         self.body = body
     
+    @property
+    def date(self) -> datetime.datetime:
+        return _from_timestamp(self._ts, self._tz)
+    
+    @date.setter
+    def date(self, value: datetime.datetime) -> None:
+        self._ts, self._tz = _to_timestamp(value)
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'EmailMessage':
         """Create an EmailMessage from a dictionary representation."""
-        date = datetime.datetime.fromisoformat(data['date'].replace('Z', '+00:00'))
+        date = parse_datetime(data['date'])
         return cls(
             id=data['id'],
             from_address=data['from'],
@@ -40,9 +99,11 @@ class EmailMessage:
 
 class EmailThread:
     """Representation of an email thread containing multiple messages."""
+    __slots__ = ('thread_id', 'messages')
+    
     def __init__(self, thread_id: str, messages: List[EmailMessage]):
         self.thread_id = thread_id
-        self.messages = sorted(messages, key=lambda msg: msg.date)
+        self.messages = sorted(messages, key=lambda msg: msg._ts)
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'EmailThread':
@@ -53,6 +114,9 @@ class EmailThread:
 
 class IngestedThread:
     """Normalized email thread ready for processing by other agents."""
+    __slots__ = ('thread_id', 'latest_snippet', 'participants', '_ts', '_tz',
+                 'full_messages', 'subject')
+    
     def __init__(self, 
                  thread_id: str, 
                  latest_snippet: str, 
@@ -62,11 +126,19 @@ class IngestedThread:
                  subject: str):
         self.thread_id = thread_id
         self.latest_snippet = latest_snippet
-        self.participants = participants
-        self.received_at = received_at
+        self.participants = _intern_addresses(participants)
+        self._ts, self._tz = _to_timestamp(received_at)
         self.full_messages = full_messages
         self.subject = subject  # Usually the subject of the first message
     
+    @property
+    def received_at(self) -> datetime.datetime:
+        return _from_timestamp(self._ts, self._tz)
+    
+    @received_at.setter
+    def received_at(self, value: datetime.datetime) -> None:
+        self._ts, self._tz = _to_timestamp(value)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert the IngestedThread to a dictionary for serialization."""
         return {
@@ -90,13 +162,116 @@ class IngestedThread:
         }
 
 
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_json_array(file: IO[str], key: str, chunk_size: int = _STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of the array stored under `key` in a top-level JSON object."""
+    reader = JSONStreamReader(file, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key:
+            reader.expect('[')
+            if reader.peek() == ']':
+                return
+            while True:
+                yield reader.value()
+                if reader.peek() == ']':
+                    return
+                reader.expect(',')
+        reader.value()  # Skip values stored under other keys
+        if reader.peek() == '}':
+            return
+        reader.expect(',')
+
+
+def _content_hash(raw_thread: Dict[str, Any]) -> str:
+    """Hash the canonical JSON form of a raw thread, independent of file formatting."""
+    canonical = json.dumps(raw_thread, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def _thread_to_record(thread: IngestedThread, content_hash: str, position: int) -> Dict[str, Any]:
+    """Flatten a normalized thread into the record format stored by ThreadIndex."""
+    return {
+        'thread_id': thread.thread_id,
+        'content_hash': content_hash,
+        'position': position,
+        'ts': thread._ts,
+        'tz': thread._tz,
+        'subject': thread.subject,
+        'latest_snippet': thread.latest_snippet,
+        'participants': thread.participants,
+        'messages': [
+            [msg.id, msg.from_address, msg.to_addresses, msg.cc_addresses, msg._ts, msg._tz,
+             msg.subject, msg.snippet, msg.body]
+            for msg in thread.full_messages
+        ]
+    }
+
+
+def _thread_from_record(record: Dict[str, Any]) -> IngestedThread:
+    """Rebuild a normalized thread from a stored record without re-parsing any dates."""
+    messages = []
+    for msg_id, from_address, to_addresses, cc_addresses, ts, tz, subject, snippet, body in record['messages']:
+        message = EmailMessage.__new__(EmailMessage)
+        message.id = msg_id
+        message.from_address = intern(from_address)
+        message.to_addresses = _intern_addresses(to_addresses)
+        message.cc_addresses = _intern_addresses(cc_addresses)
+        message._ts, message._tz = ts, tz
+        message.subject = subject
+        message.snippet = snippet
+        message.body = body
+        messages.append(message)
+    
+    thread = IngestedThread.__new__(IngestedThread)
+    thread.thread_id = record['thread_id']
+    thread.latest_snippet = record['latest_snippet']
+    thread.participants = _intern_addresses(record['participants'])
+    thread._ts, thread._tz = record['ts'], record['tz']
+    thread.full_messages = messages
+    thread.subject = record['subject']
+    return thread
+
+
+def _reintern_thread(thread: IngestedThread) -> IngestedThread:
+    """Intern a thread's addresses again, e.g. after unpickling it from a worker process."""
+    for message in thread.full_messages:
+        message.from_address = intern(message.from_address)
+        message.to_addresses = _intern_addresses(message.to_addresses)
+        message.cc_addresses = _intern_addresses(message.cc_addresses)
+    thread.participants = _intern_addresses(thread.participants)
+    return thread
+
+
+_CHUNKS_PER_WORKER = 4
+
+
+def _normalize_chunk(raw_threads: List[Dict[str, Any]]) -> List[IngestedThread]:
+    """Process pool entry point: normalize and sort one chunk of raw threads."""
+    return IngestionAgent().normalize_threads(raw_threads)
+
+
 class IngestionAgent:
     """
     Agent responsible for loading and normalizing email data.
     Acts as the interface between raw email data and the cognitive processing agents.
     """
-    def __init__(self, data_path: str = 'data/syntheticEmails.json'):
+    def __init__(self,
+                 data_path: str = 'data/syntheticEmails.json',
+                 index_path: Optional[str] = None,
+                 snapshot_path: Optional[str] = None,
+                 source: Optional[Any] = None):
         self.data_path = data_path
+        self.index_path = index_path
+        self.snapshot_path = snapshot_path
+        self.source = source  # Optional MailSource (see src/mail_sources.py) used instead of data_path
+        self._thread_index = None
     
     def load_synthetic_emails(self) -> List[Dict[str, Any]]:
         """Load synthetic email data from JSON file."""
@@ -111,55 +286,263 @@ class IngestionAgent:
             print(f"Error: Invalid JSON format in {self.data_path}")
             return []
     
-    def normalize_threads(self, raw_threads: List[Dict[str, Any]]) -> List[IngestedThread]:
-        """Convert raw email thread data into normalized IngestedThread objects."""
+    def normalize_thread(self, raw_thread: Dict[str, Any]) -> Optional[IngestedThread]:
+        """Convert a single raw thread into an IngestedThread (None for empty threads)."""
+        # Create EmailThread from raw data
+        return self.normalize_email_thread(EmailThread.from_dict(raw_thread))
+    
+    def normalize_email_thread(self, thread: EmailThread) -> Optional[IngestedThread]:
+        """Convert an EmailThread into an IngestedThread (None for empty threads)."""
+        if not thread.messages:
+            return None  # Skip empty threads
+        
+        # Get the latest message for snippet
+        latest_message = thread.messages[-1]
+        latest_snippet = latest_message.snippet
+        
+        # Extract the received time (when the latest message was received)
+        received_at = latest_message.date
+        
+        # Build a unique list of participants
+        participants = set()
+        for message in thread.messages:
+            participants.add(message.from_address)
+            participants.update(message.to_addresses)
+            participants.update(message.cc_addresses)
+        
+        # Use the subject of the first message (typically the thread subject)
+        subject = thread.messages[0].subject
+        
+        # Create the normalized thread
+        return IngestedThread(
+            thread_id=thread.thread_id,
+            latest_snippet=latest_snippet,
+            participants=list(participants),
+            received_at=received_at,
+            full_messages=thread.messages,
+            subject=subject
+        )
+    
+    def normalize_threads(self, raw_threads: List[Dict[str, Any]], workers: Optional[int] = None) -> List[IngestedThread]:
+        """
+        Convert raw email thread data into normalized IngestedThread objects.
+        
+        Args:
+            raw_threads: Raw thread dictionaries as found in the data file
+            workers: Number of worker processes to normalize with. None or 1 keeps
+                everything in the current process.
+            
+        Returns:
+            Normalized threads sorted by received date, most recent first
+        """
+        if workers is not None and workers > 1 and len(raw_threads) > 1:
+            return self._normalize_threads_parallel(raw_threads, workers)
+        
         normalized_threads = []
         
         for raw_thread in raw_threads:
-            # Create EmailThread from raw data
-            thread = EmailThread.from_dict(raw_thread)
-            
-            if not thread.messages:
-                continue  # Skip empty threads
-            
-            # Get the latest message for snippet
-            latest_message = thread.messages[-1]
-            latest_snippet = latest_message.snippet
-            
-            # Extract the received time (when the latest message was received)
-            received_at = latest_message.date
-            
-            # Build a unique list of participants
-            participants = set()
-            for message in thread.messages:
-                participants.add(message.from_address)
-                participants.update(message.to_addresses)
-                participants.update(message.cc_addresses)
-            
-            # Use the subject of the first message (typically the thread subject)
-            subject = thread.messages[0].subject
+            normalized_thread = self.normalize_thread(raw_thread)
+            if normalized_thread is not None:
+                normalized_threads.append(normalized_thread)
+        
+        # Sort threads by received date, most recent first
+        normalized_threads.sort(key=lambda t: t._ts, reverse=True)
+        
+        return normalized_threads
+    
+    def _normalize_threads_parallel(self, raw_threads: List[Dict[str, Any]], workers: int) -> List[IngestedThread]:
+        """Normalize contiguous chunks in a process pool and k-way merge the sorted results."""
+        # A few chunks per worker keeps the pool busy when chunks finish unevenly
+        chunk_count = min(len(raw_threads), workers * _CHUNKS_PER_WORKER)
+        chunk_size = -(-len(raw_threads) // chunk_count)
+        chunks = [raw_threads[i:i + chunk_size] for i in range(0, len(raw_threads), chunk_size)]
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            sorted_chunks = list(executor.map(_normalize_chunk, chunks))
+        
+        # Chunks are contiguous and merged in input order; heapq.merge prefers the
+        # earlier chunk on ties, so the result matches the stable serial sort exactly.
+        # Unpickled strings are not interned, so addresses are interned again here.
+        return [_reintern_thread(thread)
+                for thread in heapq.merge(*sorted_chunks, key=lambda t: t._ts, reverse=True)]
+    
+    def iter_raw_threads(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream raw thread dictionaries from the data file one at a time.
+        
+        Unlike load_synthetic_emails, the file is never held in memory as a whole;
+        only the thread currently being decoded is buffered.
+        """
+        try:
+            with open(self.data_path, 'r') as file:
+                yield from _iter_json_array(file, 'threads')
+        except FileNotFoundError:
+            print(f"Error: Could not find synthetic email data at {self.data_path}")
+        except json.JSONDecodeError:
+            print(f"Error: Invalid JSON format in {self.data_path}")
+    
+    def iter_threads(self, top_k: Optional[int] = None) -> Iterator[IngestedThread]:
+        """
+        Stream normalized threads from the data file.
+        
+        Args:
+            top_k: If given, only the top_k most recent threads are kept (in a bounded
+                heap) and yielded most recent first, so peak memory depends on top_k
+                rather than on the size of the mailbox. If None, threads are yielded
+                in file order as soon as they are parsed.
+        
+        Yields:
+            IngestedThread objects
+        """
+        if top_k is None:
+            for raw_thread in self.iter_raw_threads():
+                normalized_thread = self.normalize_thread(raw_thread)
+                if normalized_thread is not None:
+                    yield normalized_thread
+            return
+        
+        if top_k <= 0:
+            return
+        
+        # Min-heap of (timestamp, -position, thread); the oldest thread sits at the
+        # root and is evicted first. The negated position makes earlier threads win
+        # ties, matching the stable sort used by normalize_threads.
+        heap = []
+        position = 0
+        for raw_thread in self.iter_raw_threads():
+            normalized_thread = self.normalize_thread(raw_thread)
+            if normalized_thread is None:
+                continue
+            entry = (normalized_thread._ts, -position, normalized_thread)
+            position += 1
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+        
+        for _, _, normalized_thread in sorted(heap, key=lambda e: e[:2], reverse=True):
+            yield normalized_thread
+    
+    def _source_signature(self) -> Optional[str]:
+        """Identify the current version of the data file by path, size and mtime."""
+        try:
+            stat = os.stat(self.data_path)
+        except FileNotFoundError:
+            return None
+        return f"{os.path.abspath(self.data_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    
+    def _get_thread_index(self):
+        """Open the persistent thread index on first use."""
+        if self._thread_index is None:
+            from src.thread_index import ThreadIndex
+            self._thread_index = ThreadIndex(self.index_path)
+        return self._thread_index
+    
+    def ingest_incremental(self, workers: Optional[int] = None) -> List[IngestedThread]:
+        """
+        Synchronize the persistent thread index with the data file and return all threads.
+        
+        Only threads whose raw JSON changed since the last run are normalized again;
+        if the data file itself is unchanged, it is not read at all.
+        """
+        index = self._get_thread_index()
+        signature = self._source_signature()
+        
+        if signature is None:
+            print(f"Error: Could not find synthetic email data at {self.data_path}")
+            return []
+        
+        if index.get_source_signature() != signature:
+            known = index.get_hashes()
+            seen = set()
+            changed = []
+            moves = []
             
-            # Create the normalized thread
-            normalized_thread = IngestedThread(
-                thread_id=thread.thread_id,
-                latest_snippet=latest_snippet,
-                participants=list(participants),
-                received_at=received_at,
-                full_messages=thread.messages,
-                subject=subject
-            )
+            try:
+                with open(self.data_path, 'r') as file:
+                    for position, raw_thread in enumerate(_iter_json_array(file, 'threads')):
+                        thread_id = raw_thread['threadId']
+                        seen.add(thread_id)
+                        content_hash = _content_hash(raw_thread)
+                        stored = known.get(thread_id)
+                        if stored is None or stored[0] != content_hash:
+                            changed.append((raw_thread, content_hash, position))
+                        elif stored[1] != position:
+                            moves.append((position, thread_id))
+            except json.JSONDecodeError:
+                print(f"Error: Invalid JSON format in {self.data_path}")
+                return []
             
-            normalized_threads.append(normalized_thread)
+            normalized = self.normalize_threads([raw for raw, _, _ in changed], workers=workers)
+            by_id = {thread.thread_id: thread for thread in normalized}
+            upserts = [
+                _thread_to_record(by_id[raw['threadId']], content_hash, position)
+                for raw, content_hash, position in changed
+                if raw['threadId'] in by_id
+            ]
+            # Threads that vanished, or that no longer contain any messages
+            deletions = (set(known) - seen) | {raw['threadId'] for raw, _, _ in changed if raw['threadId'] not in by_id}
+            index.apply_changes(upserts, moves, deletions, signature)
         
-        # Sort threads by received date, most recent first
-        normalized_threads.sort(key=lambda t: t.received_at, reverse=True)
+        return [_thread_from_record(record) for record in index.iter_records()]
+    
+    def write_snapshot(self, threads: List[IngestedThread]) -> None:
+        """Write normalized threads to the binary snapshot at snapshot_path."""
+        from src.thread_snapshot import write_snapshot
+        signature = self._source_signature()
+        if signature is None:
+            return
+        records = [_thread_to_record(thread, '', position) for position, thread in enumerate(threads)]
+        write_snapshot(self.snapshot_path, records, signature)
+    
+    def load_snapshot(self) -> Optional[List[IngestedThread]]:
+        """
+        Load threads from the binary snapshot at snapshot_path.
+        
+        Returns None if there is no snapshot, or if it was written by another format
+        version or from an older version of the data file.
+        """
+        from src.thread_snapshot import load_snapshot
+        return load_snapshot(self.snapshot_path, self._source_signature())
+    
+    def ingest_messages(self, messages: Iterable[EmailMessage]) -> List[IngestedThread]:
+        """
+        Thread loose messages by their Message-ID/In-Reply-To/References headers
+        (see src/message_threader.py) and normalize the resulting threads.
+        """
+        from src.message_threader import MessageThreader
+        normalized_threads = []
+        for thread in MessageThreader().thread(messages):
+            normalized_thread = self.normalize_email_thread(thread)
+            if normalized_thread is not None:
+                normalized_threads.append(normalized_thread)
         
+        # Sort threads by received date, most recent first
+        normalized_threads.sort(key=lambda t: t._ts, reverse=True)
         return normalized_threads
     
-    def ingest(self) -> List[IngestedThread]:
+    def ingest_source(self, source) -> List[IngestedThread]:
+        """Normalize the messages of a MailSource (mbox, Maildir, .eml)."""
+        return self.ingest_messages(source.iter_messages())
+    
+    def ingest(self, workers: Optional[int] = None) -> List[IngestedThread]:
         """Main function to load and normalize email data."""
-        raw_threads = self.load_synthetic_emails()
-        normalized_threads = self.normalize_threads(raw_threads)
+        if self.source is not None:
+            return self.ingest_source(self.source)
+        
+        if self.snapshot_path is not None:
+            snapshot_threads = self.load_snapshot()
+            if snapshot_threads is not None:
+                return snapshot_threads
+        
+        if self.index_path is not None:
+            normalized_threads = self.ingest_incremental(workers=workers)
+        else:
+            raw_threads = self.load_synthetic_emails()
+            normalized_threads = self.normalize_threads(raw_threads, workers=workers)
+        
+        if self.snapshot_path is not None and normalized_threads:
+            self.write_snapshot(normalized_threads)
         return normalized_threads
 
 
@@ -0,0 +1,133 @@
+import json
+from typing import IO, Any, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+_CHUNK_SIZE = 64 * 1024
+
+
+class JSONStreamReader:
+    """
+    Incremental reader that decodes one JSON value at a time from text arriving
+    in chunks.
+
+    Text is read from `file`, `chunk_size` characters at a time, or pushed with
+    feed() when there is no file. Consumed text is dropped whenever the buffer
+    grows. Running out of text raises json.JSONDecodeError; in push mode a value
+    that ends exactly at the end of the buffer may continue (e.g. a number), so
+    it also raises until more text arrives, and the caller may reset `pos` and
+    retry after the next feed().
+    """
+    def __init__(self, file: Optional[IO[str]] = None, chunk_size: int = _CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> None:
+        """Append pushed text to the buffer, dropping already consumed text."""
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        """Read another chunk from the file into the buffer."""
+        if self.file is None or self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.feed(chunk)
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' if there is none yet)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        """Consume the next non-whitespace character, which must be `char`."""
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expected {char!r}", self.buffer, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value is probably cut off at the end of the buffer
+                if self._fill():
+                    continue
+                raise
+            if end == len(self.buffer) and not self.eof:
+                # A scalar that ends exactly at the buffer edge may continue (e.g. numbers)
+                if self._fill():
+                    continue
+                if self.file is None:
+                    raise json.JSONDecodeError("Value may continue", self.buffer, self.pos)
+            self.pos = end
+            return value
+
+
+class JSONFieldStream:
+    """
+    Incremental parser for the top-level fields of a streamed JSON object.
+
+    Feed text chunks as they arrive, e.g. LLM tokens of a ```json code block;
+    each call returns the (key, value) pairs completed so far, in order. Text
+    before the first '{' is skipped. A value is only returned once a character
+    follows it, so a number or literal cut off mid-token is never reported.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._reader = JSONStreamReader()
+        self._started = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        fields = []
+        if self.done:
+            return fields
+        reader = self._reader
+        reader.feed(chunk)
+        if not self._started:
+            start = reader.buffer.find("{", reader.pos)
+            if start < 0:
+                return fields
+            reader.pos = start + 1
+            self._started = True
+        while True:
+            field = self._next_field()
+            if field is None:
+                return fields
+            fields.append(field)
+
+    def _next_field(self) -> Optional[Tuple[str, Any]]:
+        reader = self._reader
+        while reader.peek() == ",":
+            reader.pos += 1
+        if reader.peek() == "}":
+            self.done = True
+            return None
+        start = reader.pos
+        try:
+            key = reader.value()
+            reader.expect(":")
+            value = reader.value()
+        except json.JSONDecodeError:
+            reader.pos = start
+            return None
+        if not isinstance(key, str):
+            reader.pos = start
+            return None
+        return key, value
@@ -0,0 +1,74 @@
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+MAX_CACHED_TOKENS = 100000
+
+
+class KeywordMatcher:
+    """
+    Compiled multi-pattern matcher over a table of labelled keyword lists.
+
+    A label's score is the number of entries in its list that occur in the text
+    as substrings, which is exactly what looping `keyword in text` over every list
+    computes. The table is compiled once:
+
+    - keywords shared by several labels (or repeated in one list) are matched once
+      and mapped back to their labels through a precomputed weight table;
+    - a keyword without whitespace can only occur inside a single whitespace-
+      separated token, so the keywords contained in each distinct token are
+      computed once and memoized. Mail text reuses a small vocabulary, so most
+      texts are matched with one split() and a dictionary lookup per token;
+    - only the few multi-word phrases are searched for in the whole text.
+
+    A combined overlapping regex was measured to be slower than this in CPython
+    (see benchmarks/observer_scoring.py).
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]]):
+        self.labels: List[str] = list(patterns)
+        self.weights: Dict[str, List[Tuple[str, int]]] = {}
+
+        counts: Dict[str, Dict[str, int]] = {}
+        for label, keywords in patterns.items():
+            for keyword in keywords:
+                label_counts = counts.setdefault(keyword, {})
+                label_counts[label] = label_counts.get(label, 0) + 1
+        for keyword, label_counts in counts.items():
+            self.weights[keyword] = list(label_counts.items())
+
+        self.keywords: List[str] = list(counts)
+        self._words = [k for k in self.keywords if not any(c.isspace() for c in k)]
+        self.phrases = [k for k in self.keywords if any(c.isspace() for c in k)]
+        self._token_hits: Dict[str, FrozenSet[str]] = {}
+
+    def keywords_in_token(self, token: str) -> FrozenSet[str]:
+        """Return the single-word keywords contained in one whitespace-free token (memoized)."""
+        hits = self._token_hits.get(token)
+        if hits is None:
+            if len(self._token_hits) >= MAX_CACHED_TOKENS:
+                self._token_hits.clear()
+            hits = self._token_hits[token] = frozenset(k for k in self._words if k in token)
+        return hits
+
+    def find(self, text: str) -> Set[str]:
+        """Return the distinct keywords that occur in `text`."""
+        found = {phrase for phrase in self.phrases if phrase in text}
+        cached = self._token_hits.get
+        for token in text.split():
+            hits = cached(token)
+            if hits is None:
+                hits = self.keywords_in_token(token)
+            if hits:
+                found |= hits
+        return found
+
+    def score_hits(self, hits) -> Dict[str, int]:
+        """Score labels from already found keywords; only labels with hits are returned, in table order."""
+        scores: Dict[str, int] = {}
+        for keyword in hits:
+            for label, count in self.weights.get(keyword, ()):
+                scores[label] = scores.get(label, 0) + count
+        return {label: scores[label] for label in self.labels if label in scores}
+
+    def score(self, text: str) -> Dict[str, int]:
+        """Score every label against `text` in a single pass over its tokens."""
+        return self.score_hits(self.find(text))
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+
+class LLMResponseCache:
+    """
+    Disk-backed cache of LLM analyses in SQLite, surviving server restarts.
+
+    Entries are keyed by (model, prompt version, content hash): a new model or an
+    edited prompt template never reuses old answers. Each entry expires `ttl`
+    seconds after it was written. Past `max_entries` or `max_bytes` of stored
+    JSON, the least recently read entries are evicted. Reads are only recorded in
+    memory and written in batches: with the next set(), once `touch_batch_size`
+    reads are pending, or on flush() and close(). Like SQLiteMemoryStorage,
+    the database runs in WAL mode with synchronous=NORMAL and one connection per
+    thread. Hit, miss, expiration and eviction counters are kept per process.
+    """
+
+    _SELECT = "SELECT value, expires_at FROM responses WHERE key = ?"
+    _TOUCH = "UPDATE responses SET accessed_at = ? WHERE key = ?"
+    _UPSERT = (
+        "INSERT INTO responses (key, model, prompt_version, value, size, created_at, expires_at, accessed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+        "created_at = excluded.created_at, expires_at = excluded.expires_at, accessed_at = excluded.accessed_at"
+    )
+
+    def __init__(self, path: str, max_entries: int = 100000, max_bytes: int = 256 * 1024 * 1024,
+                 ttl: Optional[float] = 30 * 24 * 3600, clock: Callable[[], float] = time.time,
+                 touch_batch_size: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.touch_batch_size = touch_batch_size
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # Key -> time of the last read not yet written to accessed_at
+        self._touched: Dict[str, float] = {}
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._entries, self._bytes = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, content_hash: str) -> str:
+        return hashlib.sha256(f"{model}\x1f{prompt_version}\x1f{content_hash}".encode('utf-8')).hexdigest()
+
+    def get(self, model: str, prompt_version: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis, or None if it is missing or expired."""
+        key = self.make_key(model, prompt_version, content_hash)
+        now = self.clock()
+        connection = self._connection()
+        row = connection.execute(self._SELECT, (key,)).fetchone()
+        if row is not None and row[1] is not None and now >= row[1]:
+            with self._lock:
+                with connection:
+                    self._delete(connection, [key])
+                self.expirations += 1
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch_size:
+                with connection:
+                    self._write_touches(connection)
+        return json.loads(row[0])
+
+    def set(self, model: str, prompt_version: str, content_hash: str, value: Dict[str, Any],
+            ttl: Optional[float] = None) -> None:
+        """Store an analysis, replacing an earlier one, and evict past the bounds."""
+        key = self.make_key(model, prompt_version, content_hash)
+        data = json.dumps(value)
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        now = self.clock()
+        connection = self._connection()
+        with self._lock:
+            with connection:
+                self._write_touches(connection)
+                previous = connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                connection.execute(self._UPSERT, (key, model, prompt_version, data, size, now,
+                                                  now + ttl if ttl is not None else None, now))
+                if previous is None:
+                    self._entries += 1
+                self._bytes += size - (previous[0] if previous else 0)
+                if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                    self._evict(connection, now)
+
+    def flush(self) -> None:
+        """Write the pending read times."""
+        connection = self._connection()
+        with self._lock:
+            with connection:
+                self._write_touches(connection)
+
+    def _write_touches(self, connection: sqlite3.Connection) -> None:
+        """Write the pending read times; the caller holds the lock and a transaction."""
+        if self._touched:
+            connection.executemany(self._TOUCH, [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched = {}
+
+    def _delete(self, connection: sqlite3.Connection, keys) -> None:
+        """Delete entries and update the totals; the caller holds the lock and a transaction."""
+        for key in keys:
+            row = connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._entries -= 1
+                self._bytes -= row[0]
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then the least recently read ones until within bounds."""
+        expired = [key for key, in connection.execute(
+            "SELECT key FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))]
+        self._delete(connection, expired)
+        self.expirations += len(expired)
+        if self._entries <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        excess_entries = self._entries - self.max_entries
+        excess_bytes = self._bytes - self.max_bytes
+        victims = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            victims.append(key)
+            excess_entries -= 1
+            excess_bytes -= size
+        self._delete(connection, victims)
+        self.evictions += len(victims)
+
+    def clear(self) -> int:
+        """Delete every entry; returns how many were deleted."""
+        connection = self._connection()
+        with self._lock:
+            with connection:
+                count = connection.execute("DELETE FROM responses").rowcount
+            self._entries = self._bytes = 0
+            self._touched = {}
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Return occupancy, bounds and this process's hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._entries,
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def close(self) -> None:
+        if self._touched:
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Error writing LLM response cache read times: {e}")
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,280 @@
+import datetime
+import mmap
+import os
+import re
+import sys
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from email import policy
+from email.parser import BytesParser
+from email.utils import getaddresses
+from typing import List, Any, Optional, Iterator, Tuple
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.date_parsing import parse_datetime
+from src.ingestionAgent import EmailMessage, EmailThread
+from src.message_threader import MessageThreader
+
+_MESSAGE_ID = re.compile(r'<([^<>\s]+)>')
+_HEADER_PARSER = BytesParser(policy=policy.default)
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_SNIPPET_LENGTH = 100
+_MBOX_QUOTED_FROM = re.compile(rb'(?m)^>(>*From )')
+
+
+def _split_headers(raw: bytes) -> bytes:
+    """Return only the header block of a raw RFC 5322 message."""
+    for separator in (b'\r\n\r\n', b'\n\n'):
+        end = raw.find(separator)
+        if end != -1:
+            return raw[:end + len(separator)]
+    return raw
+
+
+def _ids(value: Optional[str]) -> List[str]:
+    """Extract bracketed message IDs from a Message-ID/In-Reply-To/References value."""
+    if not value:
+        return []
+    return _MESSAGE_ID.findall(value)
+
+
+def parse_headers(raw: bytes) -> Tuple[Any, ...]:
+    """
+    Parse the threading and addressing headers of a raw message without touching its body.
+
+    Returns a plain tuple so it can be sent back cheaply from worker processes:
+    (message_id, in_reply_to, references, from, to, cc, date, subject)
+    """
+    headers = _HEADER_PARSER.parsebytes(_split_headers(raw), headersonly=True)
+
+    def addresses(name: str) -> List[str]:
+        return [address for _, address in getaddresses([str(value) for value in headers.get_all(name, [])]) if address]
+
+    message_ids = _ids(str(headers.get('Message-ID', '')))
+    in_reply_to = _ids(str(headers.get('In-Reply-To', '')))
+    try:
+        date = parse_datetime(str(headers['Date']))
+    except ValueError:
+        date = _EPOCH  # Undated messages sort first
+
+    from_addresses = addresses('From')
+    return (
+        message_ids[0] if message_ids else None,
+        in_reply_to[-1] if in_reply_to else None,
+        _ids(str(headers.get('References', ''))),
+        from_addresses[0] if from_addresses else '',
+        addresses('To'),
+        addresses('Cc'),
+        date,
+        str(headers.get('Subject', '')),
+    )
+
+
+class MimeEmailMessage(EmailMessage):
+    """
+    EmailMessage parsed from raw RFC 5322 bytes.
+
+    Headers are parsed up front; the MIME body is only decoded when `body` or
+    `snippet` is first read.
+    """
+    __slots__ = ('message_id', 'in_reply_to', 'references', '_raw', '_body', '_snippet')
+
+    def __init__(self, raw: bytes, headers: Tuple[Any, ...], fallback_id: str):
+        message_id, in_reply_to, references, from_address, to_addresses, cc_addresses, date, subject = headers
+        self._raw = raw
+        self._snippet = None
+        self.message_id = message_id
+        self.in_reply_to = in_reply_to
+        self.references = references
+        super().__init__(
+            id=message_id or fallback_id,
+            from_address=from_address,
+            to_addresses=to_addresses,
+            cc_addresses=cc_addresses,
+            date=date,
+            subject=subject,
+            snippet=None,
+            body=None
+        )
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, fallback_id: str) -> 'MimeEmailMessage':
+        """Create a message from raw bytes."""
+        return cls(raw, parse_headers(raw), fallback_id)
+
+    @property
+    def body(self) -> str:
+        if self._body is None and self._raw is not None:
+            message = BytesParser(policy=policy.default).parsebytes(self._message_bytes())
+            try:
+                part = message.get_body(preferencelist=('plain', 'html'))
+                self._body = part.get_content() if part is not None else ''
+            except (LookupError, ValueError):
+                payload = message.get_payload(decode=True) or b''
+                self._body = payload.decode('utf-8', 'replace')
+            self._raw = None
+        return self._body
+
+    @body.setter
+    def body(self, value: Optional[str]) -> None:
+        self._body = value
+    
+    def _message_bytes(self) -> bytes:
+        """Return the raw message bytes to decode the body from."""
+        return bytes(self._raw)
+
+    @property
+    def snippet(self) -> str:
+        if self._snippet is None:
+            self._snippet = ' '.join(self.body.split())[:_SNIPPET_LENGTH]
+        return self._snippet
+
+    @snippet.setter
+    def snippet(self, value: Optional[str]) -> None:
+        self._snippet = value
+
+
+class MailSource(ABC):
+    """Base class for pluggable message sources consumed by the Ingestion Agent."""
+
+    @abstractmethod
+    def iter_messages(self) -> Iterator[MimeEmailMessage]:
+        """Yield every message in the source."""
+
+    def iter_threads(self) -> Iterator[EmailThread]:
+        """Group the source's messages into threads using their reply headers."""
+        return iter(MessageThreader().thread(self.iter_messages()))
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+class EmlSource(MailSource):
+    """Source reading individual .eml files from a list of paths or a directory tree."""
+
+    def __init__(self, paths):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+
+    def _files(self) -> Iterator[str]:
+        for path in self.paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    for name in sorted(names):
+                        if name.lower().endswith('.eml'):
+                            yield os.path.join(root, name)
+            else:
+                yield path
+
+    def iter_messages(self) -> Iterator[MimeEmailMessage]:
+        for path in self._files():
+            yield MimeEmailMessage.from_bytes(_read_file(path), fallback_id=path)
+
+
+class MaildirSource(MailSource):
+    """Source reading every message in the cur/ and new/ folders of a Maildir."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def iter_messages(self) -> Iterator[MimeEmailMessage]:
+        for folder in ('cur', 'new'):
+            directory = os.path.join(self.path, folder)
+            if not os.path.isdir(directory):
+                continue
+            for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+                if entry.is_file() and not entry.name.startswith('.'):
+                    yield MimeEmailMessage.from_bytes(_read_file(entry.path), fallback_id=entry.name)
+
+
+class MboxEmailMessage(MimeEmailMessage):
+    """Message stored in an mbox; '>From ' quoting is undone when the body is decoded."""
+    __slots__ = ()
+    
+    def _message_bytes(self) -> bytes:
+        return _MBOX_QUOTED_FROM.sub(rb'\1', bytes(self._raw))
+
+
+def _mbox_boundaries(data) -> List[int]:
+    """Return the offsets of every 'From ' separator line in an mbox file."""
+    offsets = [0] if data[:5] == b'From ' else []
+    position = data.find(b'\nFrom ')
+    while position != -1:
+        offsets.append(position + 1)
+        position = data.find(b'\nFrom ', position + 1)
+    return offsets
+
+
+def _mbox_message_bytes(data, start: int, end: int):
+    """Slice one message out of an mbox, dropping its 'From ' separator line."""
+    line_end = data.find(b'\n', start, end)
+    return data[line_end + 1 if line_end != -1 else end:end]
+
+
+def _parse_mbox_range(path: str, ranges: List[Tuple[int, int]]) -> List[Tuple[Any, ...]]:
+    """Process pool entry point: parse the headers of a run of mbox messages."""
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return [parse_headers(_mbox_message_bytes(data, start, end)) for start, end in ranges]
+
+
+class MboxSource(MailSource):
+    """
+    Source reading an mbox file.
+
+    The file is mapped into memory and split at 'From ' separator lines. With
+    workers > 1 the header parsing is spread over a process pool; message bodies
+    stay in the mapping until they are read. close() the source, or use it as a
+    context manager, once its messages have been read: it unmaps the file, and
+    bodies not read by then can no longer be decoded.
+    """
+
+    def __init__(self, path: str, workers: Optional[int] = None):
+        self.path = path
+        self.workers = workers
+        self._mappings: List[mmap.mmap] = []
+        # Every view into a mapping must be released before it can be closed
+        self._views: List[memoryview] = []
+
+    def close(self) -> None:
+        """Unmap the file for every iteration so far."""
+        for view in self._views:
+            view.release()
+        self._views = []
+        for data in self._mappings:
+            data.close()
+        self._mappings = []
+
+    def __enter__(self) -> 'MboxSource':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def iter_messages(self) -> Iterator[MimeEmailMessage]:
+        if os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mappings.append(data)
+        view = memoryview(data)
+        self._views.append(view)
+        starts = _mbox_boundaries(data)
+        ranges = list(zip(starts, starts[1:] + [len(data)]))
+
+        if self.workers is not None and self.workers > 1 and len(ranges) > 1:
+            chunk_size = -(-len(ranges) // (self.workers * 4))
+            chunks = [ranges[i:i + chunk_size] for i in range(0, len(ranges), chunk_size)]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                headers = [item for chunk in executor.map(_parse_mbox_range, [self.path] * len(chunks), chunks)
+                           for item in chunk]
+        else:
+            headers = [parse_headers(bytes(_mbox_message_bytes(data, start, end))) for start, end in ranges]
+
+        for number, ((start, end), message_headers) in enumerate(zip(ranges, headers)):
+            line_end = data.find(b'\n', start, end)
+            raw = view[line_end + 1 if line_end != -1 else end:end]
+            self._views.append(raw)
+            yield MboxEmailMessage(raw, message_headers, fallback_id=f"{os.path.basename(self.path)}:{number}")
@@ -1,13 +1,25 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, validator
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import AsyncIterator, List, Optional, Dict, Any
 from src.cognitive_email_adapter import CognitiveEmailAdapter, Email
 from src.ingestionAgent import IngestionAgent, EmailMessage, IngestedThread
 from src.observerAgent import ObserverAgent
+from src.memory_storage import DEFAULT_USER, SQLiteMemoryStorage
+from src.bounded_cache import BoundedCache
+from src.llm_cache import LLMResponseCache
+from src.single_flight import FlightAbandoned, SingleFlight
+from src.admin_auth import admin_guard
+from src.config import (
+    OBSERVER_MEMORY_BACKEND, OBSERVER_MEMORY_DB, ADMIN_TOKEN,
+    ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_MAX_BYTES, ANALYSIS_CACHE_TTL,
+    LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL
+)
+from src.date_parsing import parse_date
 import asyncio
-import dateutil.parser
+import contextlib
+import functools
 import json
 import hashlib
 
@@ -36,12 +48,6 @@ class EmailData(BaseModel):
     thread_id: Optional[str] = None
     thread_info: Optional[Dict] = None
 
-    @validator('timestamp')
-    def validate_timestamp(cls, v):
-        if v is None:
-            return datetime.now().isoformat()
-        return v
-
     @validator('recipients')
     def validate_recipients(cls, v):
         if v is None:
@@ -51,6 +57,7 @@ class EmailData(BaseModel):
 class EmailRequest(BaseModel):
     current_email: Optional[EmailData] = None
     recent_emails: Optional[List[EmailData]] = []
+    user_id: Optional[str] = None
 
     @validator('recent_emails')
     def validate_recent_emails(cls, v):
@@ -99,240 +106,395 @@ class EmailAnalysis(BaseModel):
     recent_emails_analysis: Optional[List[Dict[str, Any]]] = None
 
 # Initialize the agents
-email_adapter = CognitiveEmailAdapter()
+email_adapter = CognitiveEmailAdapter(
+    response_cache=LLMResponseCache(
+        LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL
+    ) if LLM_CACHE_PATH else None
+)
 ingestion_agent = IngestionAgent()
-observer_agent = ObserverAgent()
+observer_agent = ObserverAgent(
+    memory_storage=SQLiteMemoryStorage(OBSERVER_MEMORY_DB) if OBSERVER_MEMORY_BACKEND == 'sqlite' else None
+)
+
+# Cache for email analysis results, bounded in entries and bytes; entries expire after the TTL
+analysis_cache = BoundedCache(
+    max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+    max_bytes=ANALYSIS_CACHE_MAX_BYTES,
+    ttl=ANALYSIS_CACHE_TTL,
+    sizeof=lambda response: len(response.model_dump_json())
+)
 
-# Cache for email analysis results
-analysis_cache = {}
+# Analyses in progress by cache key; identical concurrent requests share one
+analysis_flights = SingleFlight()
 
-def get_cache_key(email_data: dict) -> str:
-    """Generate a cache key based on email content."""
-    # Create a unique key based on email content
+def get_cache_key(email_data: dict, user_id: Optional[str] = None) -> str:
+    """
+    Generate a cache key based on email content.
+    
+    Only fields that determine the analysis are hashed. The timestamp is included
+    only when the client sent one; a missing timestamp defaults to the current
+    time, which would otherwise make the key unique per request.
+    """
     key_data = {
-        'subject': email_data.get('subject', ''),
-        'from': email_data.get('sender', ''),
-        'to': email_data.get('recipients', []),
-        'content': email_data.get('body', ''),
-        'timestamp': str(email_data.get('timestamp', ''))  # Convert datetime to string
+        'subject': (email_data.get('subject') or '').strip(),
+        'from': (email_data.get('sender') or '').strip().lower(),
+        'to': sorted(recipient.strip().lower() for recipient in email_data.get('recipients') or []),
+        'content': email_data.get('body') or '',
+        'thread_id': email_data.get('thread_id') or '',
+        'timestamp': email_data.get('timestamp') or '',
+        'user_id': user_id or DEFAULT_USER
     }
     # Convert to string and hash it
     key_str = json.dumps(key_data, sort_keys=True)
-    return hashlib.md5(key_str.encode()).hexdigest()
+    return hashlib.sha256(key_str.encode()).hexdigest()
 
-def parse_date(date_str: str) -> datetime:
-    """Parse a date string into a datetime object, handling various formats."""
-    try:
-        # Try parsing with dateutil first (handles most formats)
-        return dateutil.parser.parse(date_str)
-    except Exception as e:
-        print(f"Error parsing date with dateutil: {e}")
+DEFAULT_USER_TRAITS = {
+    "workEmailUser": True,
+    "newsletterSubscriber": False,
+    "frequentShopper": True,
+    "traveler": False,
+    "billPayer": True,
+    "techSavvy": False,
+    "financeFocused": False,
+    "healthConscious": False
+}
+
+def _email_thread(email: Email, message_id: str, snippet: str) -> Dict[str, Any]:
+    """Wrap a single email in a thread dict for the observer agent."""
+    return IngestedThread(
+        thread_id=email.thread_id,
+        latest_snippet=snippet,
+        participants=[email.sender] + email.recipients,
+        received_at=email.timestamp,
+        full_messages=[EmailMessage(
+            id=message_id,
+            from_address=email.sender,
+            to_addresses=email.recipients,
+            date=email.timestamp,
+            subject=email.subject,
+            snippet=snippet,
+            body=email.body
+        )],
+        subject=email.subject
+    ).to_dict()
+
+def prepare_emails(email_request: EmailRequest):
+    """
+    Build the adapter's emails and the observer's threads from a request.
+    
+    Returns (current_email, recent_emails, all_threads, cache_key); the current
+    email and its cache key are None if the request has no current email.
+    """
+    recent_emails = []
+    all_threads = []
+    current_email = None
+    cache_key = None
+    
+    print(f"Processing {len(email_request.recent_emails or [])} recent emails")
+    for email in email_request.recent_emails or []:
+        # Parse the timestamp once and share it between the models below
+        recent_email = Email(
+            sender=email.sender or "",
+            recipients=email.recipients or [],
+            subject=email.subject or "",
+            body=email.body or email.snippet or "",
+            timestamp=parse_date(email.timestamp),
+            thread_id=email.thread_id or ""
+        )
+        recent_emails.append(recent_email)
+        all_threads.append(_email_thread(recent_email, "recent", email.snippet or ""))
+    
+    if email_request.current_email:
+        print(f"Processing current email: {email_request.current_email.subject}")
+        current_email = Email(
+            sender=email_request.current_email.sender or "",
+            recipients=email_request.current_email.recipients or [],
+            subject=email_request.current_email.subject or "",
+            body=email_request.current_email.body or email_request.current_email.snippet or "",
+            timestamp=parse_date(email_request.current_email.timestamp),
+            thread_id=email_request.current_email.thread_id or ""
+        )
+        all_threads.append(_email_thread(current_email, "current", current_email.body[:100]))
+        
+        # Generate cache key for the current email
+        cache_key = get_cache_key({
+            'subject': current_email.subject,
+            'sender': current_email.sender,
+            'recipients': current_email.recipients,
+            'body': current_email.body,
+            'thread_id': current_email.thread_id,
+            'timestamp': email_request.current_email.timestamp
+        }, email_request.user_id)
+    
+    return current_email, recent_emails, all_threads, cache_key
+
+def observe_threads(email_request: EmailRequest, all_threads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run the local observer analysis: buckets, user traits, related threads and participants."""
+    print("Getting bucket analysis")
+    # Scan every thread once; buckets and traits are derived from the same analysis
+    thread_analysis = observer_agent.analyze_batch(all_threads)
+    buckets = observer_agent.suggest_buckets(analysis=thread_analysis)
+    bucket_assignments = observer_agent.assign_threads_to_buckets(buckets=buckets, analysis=thread_analysis)
+    
+    print("Getting user traits")
+    # Get user traits analysis
+    user_traits = observer_agent.update_user_memory(
+        analysis=thread_analysis, user_id=email_request.user_id or DEFAULT_USER
+    )
+    
+    # Get available buckets with counts
+    available_buckets = [
+        EmailBucket(
+            name=bucket,
+            count=observer_agent.get_bucket_count(bucket),
+            description=observer_agent.get_bucket_description(bucket)
+        )
+        for bucket in buckets
+    ]
+
+    # Get related threads if we have a current email
+    thread_list = []
+    if email_request.current_email:
+        # Request threads are only remembered for callers that identify themselves;
+        # anonymous requests are related to the shared session threads alone
+        if email_request.user_id:
+            observer_agent.index_threads(all_threads, user_id=email_request.user_id)
+        related_threads = observer_agent.get_related_threads(all_threads[0], user_id=email_request.user_id)
+        thread_list = [
+            EmailThread(
+                thread_id=thread['thread_id'],
+                subject=thread['subject'],
+                participants=thread['participants'],
+                message_count=len(thread.get('full_messages', [])),
+                last_updated=thread['received_at'],
+                latest_message=thread['latest_snippet']
+            )
+            for thread in related_threads
+        ]
+    
+    current = email_request.current_email
+    return {
+        "bucket": bucket_assignments.get(all_threads[0]['thread_id']) if all_threads else "Uncategorized",
+        "user_traits": user_traits.get("userTraits", dict(DEFAULT_USER_TRAITS)),
+        "thread_summary": all_threads[0]['latest_snippet'] if all_threads else None,
+        "participants_analysis": {
+            "sender": current.sender,
+            "recipients": current.recipients,
+            "total_participants": len(current.recipients) + 1
+        } if current else None,
+        "available_buckets": available_buckets,
+        "threads": thread_list
+    }
+
+# Fields of the response taken from the LLM analysis of the current email
+LLM_FIELDS = (
+    "primary_intent", "priority", "social_context", "suggested_actions", "related_emails",
+    "sentiment", "urgency", "follow_up_needed", "suggested_response"
+)
+
+def build_analysis(current_email_analysis: Optional[Dict[str, Any]], observed: Dict[str, Any]) -> EmailAnalysis:
+    """
+    Combine the LLM analysis of the current email with the observer's results;
+    fields the LLM analysis lacks keep the EmailAnalysis defaults.
+    """
+    llm_fields = {field: current_email_analysis[field] for field in LLM_FIELDS
+                  if field in (current_email_analysis or {})}
+    return EmailAnalysis(recent_emails_analysis=[], **observed, **llm_fields)
+
+def default_analysis() -> EmailAnalysis:
+    """Analysis returned when a request fails."""
+    return EmailAnalysis(
+        primary_intent="Unknown intent",
+        priority="Normal",
+        social_context=["General communication"],
+        suggested_actions=["Review email content", "Consider response"],
+        related_emails=[],
+        bucket="Uncategorized",
+        user_traits=dict(DEFAULT_USER_TRAITS),
+        sentiment="neutral",
+        urgency="normal",
+        follow_up_needed=False,
+        suggested_response="Please review the email content and respond accordingly.",
+        recent_emails_analysis=[]
+    )
+
+async def compute_analysis(email_request: EmailRequest, current_email: Optional[Email],
+                           recent_emails: List[Email], all_threads: List[Dict[str, Any]],
+                           cache_key: Optional[str]) -> EmailAnalysis:
+    """Analyze the emails with the LLM and the observer; the response is cached unless the LLM failed."""
+    current_email_analysis = None
+    cacheable = cache_key is not None
+    if current_email is not None:
+        # Process all emails in a single batch
+        print("Analyzing all emails in batch")
         try:
-            # Fallback to datetime.fromisoformat
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+            current_email_analysis = await email_adapter.process_email(current_email, recent_emails, raise_errors=True)
         except Exception as e:
-            print(f"Error parsing date with fromisoformat: {e}")
-            # Last resort: return current time
-            return datetime.now()
+            print(f"LLM analysis failed, response will not be cached: {e}")
+            cacheable = False
+
+    observed = observe_threads(email_request, all_threads)
+    response = build_analysis(current_email_analysis, observed)
+    
+    # Cache the result
+    if cacheable:
+        analysis_cache.set(cache_key, response)
+    return response
 
 @app.post("/analyze", response_model=EmailAnalysis)
 async def analyze_email(email_request: EmailRequest):
     print("Received analyze request")
     try:
-        # Initialize variables
-        recent_emails = []
-        recent_emails_analysis = []
-        all_threads = []
-        current_email_analysis = None
-
-        print(f"Processing {len(email_request.recent_emails or [])} recent emails")
+        current_email, recent_emails, all_threads, cache_key = prepare_emails(email_request)
+        compute = functools.partial(compute_analysis, email_request, current_email, recent_emails, all_threads, cache_key)
         
-        # Prepare all emails for batch processing
-        if email_request.recent_emails:
-            for email in email_request.recent_emails:
-                recent_email = Email(
-                    sender=email.sender or "",
-                    recipients=email.recipients or [],
-                    subject=email.subject or "",
-                    body=email.body or email.snippet or "",
-                    timestamp=parse_date(email.timestamp),
-                    thread_id=email.thread_id or ""
-                )
-                recent_emails.append(recent_email)
-                
-                thread = IngestedThread(
-                    thread_id=email.thread_id or "",
-                    latest_snippet=email.snippet or "",
-                    participants=[email.sender or ""] + (email.recipients or []),
-                    received_at=parse_date(email.timestamp),
-                    full_messages=[EmailMessage(
-                        id="recent",
-                        from_address=email.sender or "",
-                        to_addresses=email.recipients or [],
-                        date=parse_date(email.timestamp),
-                        subject=email.subject or "",
-                        snippet=email.snippet or "",
-                        body=email.body or email.snippet or ""
-                    )],
-                    subject=email.subject or ""
-                )
-                all_threads.append(thread.to_dict())
-
-        # Process current email if available
-        if email_request.current_email:
-            print(f"Processing current email: {email_request.current_email.subject}")
-            current_email = Email(
-                sender=email_request.current_email.sender or "",
-                recipients=email_request.current_email.recipients or [],
-                subject=email_request.current_email.subject or "",
-                body=email_request.current_email.body or email_request.current_email.snippet or "",
-                timestamp=parse_date(email_request.current_email.timestamp),
-                thread_id=email_request.current_email.thread_id or ""
-            )
-            
-            # Generate cache key for the current email
-            cache_key = get_cache_key({
-                'subject': current_email.subject,
-                'sender': current_email.sender,
-                'recipients': current_email.recipients,
-                'body': current_email.body,
-                'timestamp': current_email.timestamp
-            })
-            
-            # Check if we have a cached result
-            if cache_key in analysis_cache:
-                print(f"Using cached analysis for email: {current_email.subject}")
-                return analysis_cache[cache_key]
-            
-            # Process all emails in a single batch
-            print("Analyzing all emails in batch")
-            current_email_analysis = await email_adapter.process_email(current_email, recent_emails)
-
-            # Create thread for current email
-            current_thread = IngestedThread(
-                thread_id=current_email.thread_id,
-                latest_snippet=current_email.body[:100],
-                participants=[current_email.sender] + current_email.recipients,
-                received_at=current_email.timestamp,
-                full_messages=[EmailMessage(
-                    id="current",
-                    from_address=current_email.sender,
-                    to_addresses=current_email.recipients,
-                    date=current_email.timestamp,
-                    subject=current_email.subject,
-                    snippet=current_email.body[:100],
-                    body=current_email.body
-                )],
-                subject=current_email.subject
-            )
-            all_threads.append(current_thread.to_dict())
-
-        print("Getting bucket analysis")
-        # Get bucket analysis from observer agent
-        buckets = observer_agent.suggest_buckets(all_threads)
-        bucket_assignments = observer_agent.assign_threads_to_buckets(all_threads, buckets)
+        if cache_key is None:
+            return await compute()
         
-        print("Getting user traits")
-        # Get user traits analysis
-        user_traits = observer_agent.update_user_memory(all_threads)
+        # Check if we have a cached result
+        cached_response = analysis_cache.get(cache_key)
+        if cached_response is not None:
+            print(f"Using cached analysis for email: {current_email.subject}")
+            return cached_response
         
-        print("Preparing response")
-        # Get available buckets with counts
-        available_buckets = [
-            EmailBucket(
-                name=bucket,
-                count=observer_agent.get_bucket_count(bucket),
-                description=observer_agent.get_bucket_description(bucket)
-            )
-            for bucket in buckets
-        ]
-
-        # Get related threads if we have a current email
-        thread_list = []
-        if email_request.current_email:
-            related_threads = observer_agent.get_related_threads(all_threads[0])
-            thread_list = [
-                EmailThread(
-                    thread_id=thread['thread_id'],
-                    subject=thread['subject'],
-                    participants=thread['participants'],
-                    message_count=len(thread.get('full_messages', [])),
-                    last_updated=thread['received_at'],
-                    latest_message=thread['latest_snippet']
-                )
-                for thread in related_threads
-            ]
-
-        print("Sending response")
-        # Combine all analyses
-        response = EmailAnalysis(
-            primary_intent=current_email_analysis.get("primary_intent") if current_email_analysis else "Unknown intent",
-            priority=current_email_analysis.get("priority") if current_email_analysis else "Normal",
-            social_context=current_email_analysis.get("social_context", []) if current_email_analysis else ["General communication"],
-            suggested_actions=current_email_analysis.get("suggested_actions", []) if current_email_analysis else ["Review email content", "Consider response"],
-            related_emails=current_email_analysis.get("related_emails", []) if current_email_analysis else [],
-            bucket=bucket_assignments.get(all_threads[0]['thread_id']) if all_threads else "Uncategorized",
-            user_traits=user_traits.get("userTraits", {
-                "workEmailUser": True,
-                "newsletterSubscriber": False,
-                "frequentShopper": True,
-                "traveler": False,
-                "billPayer": True,
-                "techSavvy": False,
-                "financeFocused": False,
-                "healthConscious": False
-            }),
-            thread_summary=all_threads[0]['latest_snippet'] if all_threads else None,
-            participants_analysis={
-                "sender": email_request.current_email.sender if email_request.current_email else None,
-                "recipients": email_request.current_email.recipients if email_request.current_email else [],
-                "total_participants": len(email_request.current_email.recipients) + 1 if email_request.current_email else 0
-            } if email_request.current_email else None,
-            sentiment=current_email_analysis.get("sentiment", "neutral") if current_email_analysis else "neutral",
-            urgency=current_email_analysis.get("urgency", "normal") if current_email_analysis else "normal",
-            follow_up_needed=current_email_analysis.get("follow_up_needed", False) if current_email_analysis else False,
-            suggested_response=current_email_analysis.get("suggested_response") if current_email_analysis else "Please review the email content and respond accordingly.",
-            available_buckets=available_buckets,
-            threads=thread_list,
-            recent_emails_analysis=recent_emails_analysis
-        )
-        
-        # Cache the result
-        analysis_cache[cache_key] = response
+        # Requests for the same email while it is analyzed wait for that analysis
+        if cache_key in analysis_flights:
+            print(f"Waiting for the analysis in flight for email: {current_email.subject}")
+        response = await analysis_flights.do(cache_key, compute)
         
+        print("Sending response")
         return response
         
     except Exception as e:
         print(f"Error in analyze_email: {e}")
         # Return default analysis if there's an error
-        return EmailAnalysis(
-            primary_intent="Unknown intent",
-            priority="Normal",
-            social_context=["General communication"],
-            suggested_actions=["Review email content", "Consider response"],
-            related_emails=[],
-            bucket="Uncategorized",
-            user_traits={
-                "workEmailUser": True,
-                "newsletterSubscriber": False,
-                "frequentShopper": True,
-                "traveler": False,
-                "billPayer": True,
-                "techSavvy": False,
-                "financeFocused": False,
-                "healthConscious": False
-            },
-            sentiment="neutral",
-            urgency="normal",
-            follow_up_needed=False,
-            suggested_response="Please review the email content and respond accordingly.",
-            recent_emails_analysis=[]
-        )
+        return default_analysis()
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def stream_analysis(email_request: EmailRequest) -> AsyncIterator[str]:
+    """
+    Events of a streamed analysis:
+    
+    - "observer": bucket, user traits, buckets and related threads from the local
+      observer agent, sent before the LLM is called;
+    - "field": {"name", "value"} for each LLM field as soon as it parses,
+      primary_intent, priority and urgency first;
+    - "complete": the full EmailAnalysis, as /analyze would return it.
+    
+    A cached analysis, or one another request has in flight for the same email,
+    is sent as a single "complete" event. Requests for the email that arrive
+    while this one streams wait for its analysis; if this client disconnects
+    first, they analyze the email themselves.
+    """
+    flight = None
+    try:
+        current_email, _, all_threads, cache_key = prepare_emails(email_request)
+        if cache_key is not None:
+            cached_response = analysis_cache.get(cache_key)
+            while cached_response is None and cache_key in analysis_flights:
+                print(f"Waiting for the analysis in flight for email: {current_email.subject}")
+                try:
+                    cached_response = await analysis_flights.join(cache_key)
+                except FlightAbandoned:
+                    # Its streaming client went away; analyze the email here
+                    cached_response = analysis_cache.get(cache_key)
+            if cached_response is not None:
+                print(f"Using cached analysis for email: {current_email.subject}")
+                yield sse_event("complete", cached_response.model_dump())
+                return
+            flight = analysis_flights.claim(cache_key)
+        
+        observed = observe_threads(email_request, all_threads)
+        yield sse_event("observer", {
+            key: [item.model_dump() for item in value] if key in ("available_buckets", "threads") else value
+            for key, value in observed.items()
+        })
+        
+        current_email_analysis = None
+        cacheable = cache_key is not None
+        if current_email is not None:
+            current_email_analysis = {}
+            try:
+                async with contextlib.aclosing(
+                        email_adapter.stream_email_analysis(current_email, raise_errors=True)) as fields:
+                    async for field, value in fields:
+                        current_email_analysis[field] = value
+                        yield sse_event("field", {"name": field, "value": value})
+            except Exception as e:
+                print(f"LLM analysis failed, response will not be cached: {e}")
+                cacheable = False
+        
+        response = build_analysis(current_email_analysis, observed)
+        if cacheable:
+            analysis_cache.set(cache_key, response)
+        if flight is not None:
+            flight.set_result(response)
+        yield sse_event("complete", response.model_dump())
+        
+    except Exception as e:
+        print(f"Error in stream_analysis: {e}")
+        if flight is not None and not flight.done():
+            flight.set_exception(e)
+        yield sse_event("complete", default_analysis().model_dump())
+    finally:
+        # The client went away before the analysis was complete; requests waiting for it run their own
+        if flight is not None:
+            analysis_flights.abandon(cache_key, flight)
+
+@app.post("/analyze/stream")
+async def analyze_email_stream(email_request: EmailRequest):
+    """
+    Streaming variant of /analyze over Server-Sent Events (see stream_analysis).
+    
+    Only the current email is sent to the LLM; recent emails feed the observer
+    analysis.
+    """
+    print("Received streaming analyze request")
+    return StreamingResponse(
+        stream_analysis(email_request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+# Admin endpoints expose email content and can wipe the caches
+require_admin = admin_guard(ADMIN_TOKEN)
+
+@app.get("/admin/cache", dependencies=[Depends(require_admin)])
+async def inspect_cache(limit: int = 50):
+    """Report analysis cache statistics and its most recently used entries."""
+    analysis_cache.purge_expired()
+    return {
+        "analysis_cache": analysis_cache.stats(),
+        "entries": analysis_cache.entries(limit=limit),
+        "email_results": email_adapter.results.stats(),
+        "llm_responses": email_adapter.response_cache.stats() if email_adapter.response_cache else None,
+        "processed_emails": email_adapter.processed_emails.stats(),
+        "in_flight": analysis_flights.stats(),
+        "observer_results": observer_agent.result_cache_stats()
+    }
+
+@app.delete("/admin/cache", dependencies=[Depends(require_admin)])
+async def clear_cache(llm_responses: bool = False):
+    """Drop every cached analysis; the disk cache of LLM responses only if asked to."""
+    cleared = {"cleared": analysis_cache.clear(), "email_results": email_adapter.results.clear()}
+    if llm_responses and email_adapter.response_cache:
+        cleared["llm_responses"] = email_adapter.response_cache.clear()
+    return cleared
+
+@app.on_event("shutdown")
+async def flush_on_shutdown():
+    # Long-term memory is written behind requests; persist what is still pending
+    observer_agent.flush()
+    if email_adapter.response_cache:
+        email_adapter.response_cache.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.write_behind import WriteBehindJSONFile
+
+DEFAULT_USER = 'default'
+
+# (user_id, userTraits, timestamps) as produced by trait analysis
+TraitUpdate = Tuple[str, Dict[str, bool], Dict[str, Optional[str]]]
+
+
+class MemoryStorage(ABC):
+    """
+    Storage interface for the Observer Agent's long-term user memory.
+
+    Memory is returned in the shape the agent has always used:
+    {"userTraits": {trait: bool}, "timestamps": {trait: iso timestamp}}.
+    An update overwrites the given traits and sets the timestamps that are not None.
+    """
+
+    @abstractmethod
+    def load(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Return the long-term memory of a user."""
+
+    def update(self, user_id: str, user_traits: Dict[str, bool],
+               timestamps: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        """Apply one update and return the user's updated memory."""
+        self.update_many([(user_id, user_traits, timestamps)])
+        return self.load(user_id)
+
+    @abstractmethod
+    def update_many(self, updates: Iterable[TraitUpdate]) -> None:
+        """Apply a batch of updates, possibly for different users."""
+
+    def flush(self) -> None:
+        """Persist pending updates."""
+
+    def close(self) -> None:
+        """Persist pending updates and release resources."""
+        self.flush()
+
+
+class JSONMemoryStorage(MemoryStorage):
+    """
+    Single JSON document, written behind the request path (the default backend).
+
+    The file holds one memory document shared by every user ID, as the demo data
+    expects; use SQLiteMemoryStorage to keep users apart.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.document = self._load_document()
+        self._file = WriteBehindJSONFile(path, flush_interval=flush_interval)
+
+    def _load_document(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error loading long-term memory: {e}, creating new")
+            return {
+                "userTraits": {},
+                "timestamps": {}
+            }
+
+    def load(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        return self.document
+
+    def update(self, user_id: str, user_traits: Dict[str, bool],
+               timestamps: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        self.update_many([(user_id, user_traits, timestamps)])
+        return self.document
+
+    def update_many(self, updates: Iterable[TraitUpdate]) -> None:
+        # Mutate under the writer's lock so a background save never sees a partial update
+        with self._file.lock:
+            for _, user_traits, timestamps in updates:
+                self.document["userTraits"].update(user_traits)
+                for trait, timestamp in timestamps.items():
+                    if timestamp is not None:
+                        self.document["timestamps"][trait] = timestamp
+        self._file.mark_dirty(self.document)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SQLiteMemoryStorage(MemoryStorage):
+    """
+    Per-user long-term memory in SQLite.
+
+    The database runs in WAL mode with synchronous=NORMAL, so readers never block
+    the writer and commits do not wait for an fsync. Each thread gets its own
+    connection; every update batch is one transaction written with executemany,
+    and all statements are constant parameterized SQL, which sqlite3 compiles once
+    per connection and reuses from its statement cache.
+    """
+
+    _UPSERT_TRAIT = (
+        "INSERT INTO user_traits (user_id, trait, active) VALUES (?, ?, ?) "
+        "ON CONFLICT (user_id, trait) DO UPDATE SET active = excluded.active"
+    )
+    _UPSERT_TIMESTAMP = (
+        "INSERT INTO user_traits (user_id, trait, timestamp) VALUES (?, ?, ?) "
+        "ON CONFLICT (user_id, trait) DO UPDATE SET timestamp = excluded.timestamp"
+    )
+    _SELECT_USER = "SELECT trait, active, timestamp FROM user_traits WHERE user_id = ?"
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS user_traits (
+                    user_id TEXT NOT NULL,
+                    trait TEXT NOT NULL,
+                    active INTEGER,
+                    timestamp TEXT,
+                    PRIMARY KEY (user_id, trait)
+                ) WITHOUT ROWID
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def load(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        memory = {"userTraits": {}, "timestamps": {}}
+        for trait, active, timestamp in self._connection().execute(self._SELECT_USER, (user_id,)):
+            if active is not None:
+                memory["userTraits"][trait] = bool(active)
+            if timestamp is not None:
+                memory["timestamps"][trait] = timestamp
+        return memory
+
+    def update_many(self, updates: Iterable[TraitUpdate]) -> None:
+        trait_rows = []
+        timestamp_rows = []
+        for user_id, user_traits, timestamps in updates:
+            trait_rows.extend((user_id, trait, int(bool(active))) for trait, active in user_traits.items())
+            timestamp_rows.extend((user_id, trait, timestamp)
+                                  for trait, timestamp in timestamps.items() if timestamp is not None)
+        with self._connection() as connection:
+            connection.executemany(self._UPSERT_TRAIT, trait_rows)
+            connection.executemany(self._UPSERT_TIMESTAMP, timestamp_rows)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
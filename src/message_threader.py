@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+from typing import Dict, List, Iterable
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestionAgent import EmailMessage, EmailThread
+
+# Reply/forward prefixes stripped when comparing subjects, e.g. "Re: Fwd[2]: AW: ..."
+_SUBJECT_PREFIX = re.compile(r'^\s*((re|fwd?|aw|sv|antw)(\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+_REPLY_PREFIX = re.compile(r'^\s*(re|aw|sv|antw)(\[\d+\])?\s*:', re.IGNORECASE)
+
+
+def normalize_subject(subject: str) -> str:
+    """Strip reply/forward prefixes and normalize case and whitespace."""
+    return ' '.join(_SUBJECT_PREFIX.sub('', subject or '').split()).lower()
+
+
+class MessageThreader:
+    """
+    Groups raw messages into threads from their headers, JWZ style.
+
+    Every Message-ID (including IDs that are only referenced, never seen) becomes a
+    node in a union-find forest; a message is unioned with its In-Reply-To and every
+    entry of its References chain. Messages that carry no reply headers but have a
+    reply subject ("Re: ...") are attached to the thread started by a message with
+    the same normalized subject. With path halving and union by size the whole pass
+    is near-linear in the number of messages plus references.
+    """
+
+    def __init__(self, subject_fallback: bool = True):
+        self.subject_fallback = subject_fallback
+
+    def thread(self, messages: Iterable[EmailMessage]) -> List[EmailThread]:
+        """Return the threads formed by `messages`, in order of first appearance."""
+        messages = list(messages)
+        parent: List[int] = []
+        size: List[int] = []
+        nodes: Dict[str, int] = {}
+
+        def node_for(message_id: str) -> int:
+            node = nodes.get(message_id)
+            if node is None:
+                node = nodes[message_id] = len(parent)
+                parent.append(node)
+                size.append(1)
+            return node
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        def union(a: int, b: int) -> None:
+            a, b = find(a), find(b)
+            if a == b:
+                return
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+
+        message_nodes = []
+        for position, message in enumerate(messages):
+            message_id = getattr(message, 'message_id', None)
+            # Messages without a Message-ID still need a node of their own
+            node = node_for(message_id if message_id else f"\0{position}")
+            message_nodes.append(node)
+            for reference in getattr(message, 'references', None) or ():
+                union(node, node_for(reference))
+            in_reply_to = getattr(message, 'in_reply_to', None)
+            if in_reply_to:
+                union(node, node_for(in_reply_to))
+
+        if self.subject_fallback:
+            self._merge_by_subject(messages, message_nodes, union)
+
+        groups: Dict[int, List[EmailMessage]] = {}
+        for message, node in zip(messages, message_nodes):
+            groups.setdefault(find(node), []).append(message)
+
+        threads = []
+        for group in groups.values():
+            thread = EmailThread(thread_id='', messages=group)
+            first = thread.messages[0]
+            thread.thread_id = getattr(first, 'message_id', None) or first.id
+            threads.append(thread)
+        return threads
+
+    def _merge_by_subject(self, messages: List[EmailMessage], message_nodes: List[int], union) -> None:
+        """Attach header-less replies to the thread started under the same subject."""
+        starters: Dict[str, int] = {}
+        orphans = []
+        for message, node in zip(messages, message_nodes):
+            subject = normalize_subject(message.subject)
+            if not subject:
+                continue
+            has_headers = getattr(message, 'references', None) or getattr(message, 'in_reply_to', None)
+            if _REPLY_PREFIX.match(message.subject or ''):
+                if not has_headers:
+                    orphans.append((subject, node))
+            else:
+                starters.setdefault(subject, node)
+
+        for subject, node in orphans:
+            # With no original in the mailbox, orphaned replies group among themselves
+            starter = starters.setdefault(subject, node)
+            union(node, starter)
+
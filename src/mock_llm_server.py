@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.token_budget import estimate_tokens, token_prefix
+
+# Fields of the analysis the adapter asks for (response_schemas in cognitive_email_adapter)
+ANALYSIS_FIELDS = (
+    "primary_intent", "priority", "social_context", "suggested_actions", "related_emails",
+    "sentiment", "urgency", "follow_up_needed", "suggested_response", "bucket",
+    "user_traits", "thread_summary", "participants_analysis"
+)
+
+_SUBJECT = re.compile(r"^Subject: (.+)$", re.MULTILINE)
+_SENDER = re.compile(r"^From: (.+)$", re.MULTILINE)
+_EMAIL_ID = re.compile(r"^Email ID: (\S+)$", re.MULTILINE)
+_EMAIL_HEADING = re.compile(r"^Email \d+:$", re.MULTILINE)
+_URGENT = re.compile(r"\b(urgent|asap|immediately|deadline|critical)\b", re.IGNORECASE)
+
+
+class LatencyProfile:
+    """
+    Response timing of a model: a fixed time to first token plus generation at
+    `tokens_per_second` (0 means instantaneous), scaled by a random factor drawn
+    from a log-normal distribution with sigma `jitter`.
+    """
+
+    def __init__(self, time_to_first_token: float, tokens_per_second: float, jitter: float = 0.0):
+        self.time_to_first_token = time_to_first_token
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+
+    def timing(self, output_tokens: int, rng: random.Random) -> Tuple[float, float]:
+        """Return (time to first token, generation time) in seconds for an answer."""
+        generation = output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        scale = rng.lognormvariate(0.0, self.jitter) if self.jitter else 1.0
+        return self.time_to_first_token * scale, generation * scale
+
+    def delay(self, output_tokens: int, rng: random.Random) -> float:
+        return sum(self.timing(output_tokens, rng))
+
+
+PROFILES = {
+    "instant": LatencyProfile(0.0, 0, 0.0),
+    "fast": LatencyProfile(0.2, 400, 0.1),
+    "typical": LatencyProfile(0.8, 80, 0.25),
+    "slow": LatencyProfile(2.0, 30, 0.3),
+}
+
+# Anthropic error types for injected failures, by HTTP status
+_ERROR_TYPES = {429: "rate_limit_error", 500: "api_error", 529: "overloaded_error"}
+
+
+def _field_order(prompt: str) -> List[str]:
+    """Analysis fields in the order the prompt's output schema lists them; unlisted fields keep theirs."""
+    positions = {field: prompt.find(f'"{field}"') for field in ANALYSIS_FIELDS}
+    return sorted(ANALYSIS_FIELDS, key=lambda field: (positions[field] < 0, positions[field]))
+
+
+def mock_analysis(prompt: str) -> Dict[str, Any]:
+    """
+    Deterministic analysis of a prompt with every field the adapter's schema requires.
+
+    Values are derived from the prompt text, so the same prompt always gets the
+    same answer. Fields come in the order the prompt's schema lists them.
+    """
+    digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+    subject_match = _SUBJECT.search(prompt)
+    sender_match = _SENDER.search(prompt)
+    subject = subject_match.group(1).strip() if subject_match else "the email"
+    urgent = _URGENT.search(prompt) is not None
+    analysis = {
+        "primary_intent": f"Respond to {subject}",
+        "priority": "high" if urgent else ("medium", "low")[digest[0] % 2],
+        "social_context": ["Professional correspondence"],
+        "suggested_actions": ["Read the email", "Reply to the sender"],
+        "related_emails": [],
+        "sentiment": ("positive", "neutral", "negative")[digest[1] % 3],
+        "urgency": "high" if urgent else "normal",
+        "follow_up_needed": digest[2] % 2 == 0,
+        "suggested_response": f"Thanks for your email about {subject}; I will get back to you shortly.",
+        "bucket": ("Work", "Personal", "Updates", "Bills")[digest[3] % 4],
+        "user_traits": {},
+        "thread_summary": subject,
+        "participants_analysis": {"sender": sender_match.group(1).strip() if sender_match else None}
+    }
+    return {field: analysis[field] for field in _field_order(prompt)}
+
+
+def mock_answer(prompt: str) -> Dict[str, Any]:
+    """
+    Answer a prompt: one analysis per email keyed by ID for batch prompts, whose
+    emails carry an "Email ID:" line, otherwise a single analysis.
+    """
+    if not _EMAIL_ID.search(prompt):
+        return mock_analysis(prompt)
+    answer = {}
+    for section in _EMAIL_HEADING.split(prompt)[1:]:
+        section = section.split("\n---\n")[0]
+        email_id = _EMAIL_ID.search(section)
+        if email_id:
+            answer[email_id.group(1)] = mock_analysis(section)
+    return answer
+
+
+def stream_events(message: Dict[str, Any], chunk_chars: int = 16) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Split a Messages API response into the (event, data) pairs of its stream."""
+    text = message["content"][0]["text"]
+    start = dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=0))
+    yield "message_start", {"type": "message_start", "message": start}
+    yield "content_block_start", {"type": "content_block_start", "index": 0,
+                                  "content_block": {"type": "text", "text": ""}}
+    for offset in range(0, len(text), chunk_chars):
+        yield "content_block_delta", {"type": "content_block_delta", "index": 0,
+                                      "delta": {"type": "text_delta", "text": text[offset:offset + chunk_chars]}}
+    yield "content_block_stop", {"type": "content_block_stop", "index": 0}
+    yield "message_delta", {"type": "message_delta",
+                            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                            "usage": {"output_tokens": message["usage"]["output_tokens"]}}
+    yield "message_stop", {"type": "message_stop"}
+
+
+def _prompt_text(request: Dict[str, Any]) -> str:
+    """Concatenate the text of a Messages API request."""
+    parts = []
+    system = request.get("system")
+    if isinstance(system, str):
+        parts.append(system)
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content or [] if isinstance(block, dict))
+    return "\n".join(parts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockLLM/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip('/') == "/stats":
+            self._send_json(200, self.server.mock.stats())
+        else:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"type": "error", "error": {"type": "invalid_request_error", "message": str(e)}})
+            return
+        if not self.path.startswith("/v1/messages"):
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+        status, body, (first_token, generation) = self.server.mock.respond(request)
+        if status == 200 and request.get("stream"):
+            self._stream(body, first_token, generation)
+            return
+        if first_token + generation > 0:
+            time.sleep(first_token + generation)
+        self._send_json(status, body)
+
+    def _stream(self, message: Dict[str, Any], first_token: float, generation: float) -> None:
+        """Send a message as Messages API stream events, spreading its text over the generation time."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        text = message["content"][0]["text"]
+        output_tokens = message["usage"]["output_tokens"]
+        if first_token > 0:
+            time.sleep(first_token)
+        for event, data in stream_events(message):
+            if event == "content_block_delta" and output_tokens:
+                time.sleep(generation * len(data["delta"]["text"]) / len(text))
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+
+class MockLLMServer:
+    """
+    Local stand-in for the Anthropic Messages API (POST /v1/messages).
+
+    Answers every prompt with deterministic, schema-valid analyses (see
+    mock_answer) as a JSON code block, after a delay given by a latency
+    profile; requests with "stream": true get Messages API stream events, with
+    the text spread over the generation time. Answers longer than the request's
+    max_tokens are cut off there with stop_reason "max_tokens", as the real API
+    does. A share `error_rate` of requests fails with HTTP `error_status`
+    (429, 500 or 529) and an Anthropic error body. GET /stats reports request,
+    error and token counts. Random draws are seeded, so runs are repeatable.
+
+    Point the adapter at it with LLM_BACKEND=mock and MOCK_LLM_URL (see config).
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, profile: str = 'fast',
+                 error_rate: float = 0.0, error_status: int = 529, seed: int = 0):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}; choose from {', '.join(PROFILES)}")
+        if error_status not in _ERROR_TYPES:
+            raise ValueError(f"Unsupported error status {error_status}")
+        self.host = host
+        self.port = port
+        self.profile = PROFILES[profile]
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0}
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2] if self._httpd else (self.host, self.port)
+        return f"http://{host}:{port}"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def respond(self, request: Dict[str, Any]) -> tuple:
+        """
+        Return (status, body, (time to first token, generation time)) for a
+        Messages API request.
+        """
+        prompt = _prompt_text(request)
+        with self._lock:
+            self._counters["requests"] += 1
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            jitter_seed = self._rng.random()
+        if fail:
+            with self._lock:
+                self._counters["errors"] += 1
+            error = {"type": _ERROR_TYPES[self.error_status], "message": "Injected failure from the mock LLM"}
+            return self.error_status, {"type": "error", "error": error}, (self.profile.time_to_first_token, 0.0)
+
+        text = "```json\n" + json.dumps(mock_answer(prompt), indent=2) + "\n```"
+        input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        stop_reason = "end_turn"
+        max_tokens = request.get("max_tokens")
+        if isinstance(max_tokens, int) and output_tokens > max_tokens:
+            # Like the real API, stop generating at the request's output cap
+            text = token_prefix(text, max_tokens)
+            output_tokens = estimate_tokens(text)
+            stop_reason = "max_tokens"
+        with self._lock:
+            self._counters["input_tokens"] += input_tokens
+            self._counters["output_tokens"] += output_tokens
+        body = {
+            "id": f"msg_mock_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "mock"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        }
+        return 200, body, self.profile.timing(output_tokens, random.Random(jitter_seed))
+
+    def start(self) -> 'MockLLMServer':
+        """Serve in a background thread; port 0 picks a free port (see url)."""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = self._thread = None
+
+    def __enter__(self) -> 'MockLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+# Command-line server
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local mock of the Anthropic Messages API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, choices=sorted(_ERROR_TYPES), default=529)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.profile, args.error_rate, args.error_status, args.seed).start()
+    print(f"Mock LLM serving on {server.url} (profile {args.profile}, error rate {args.error_rate})")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
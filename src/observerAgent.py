@@ -1,22 +1,225 @@
+import hashlib
 import json
 import os
+import sqlite3
 import sys
 import datetime
 from typing import Dict, List, Any, Optional, Set
 from collections import Counter
+from functools import lru_cache
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import the IngestedThread model from the ingestion agent
 from src.ingestionAgent import IngestedThread
+from src.keyword_matcher import KeywordMatcher
+from src.thread_store import ThreadStore
+from src.related_index import RelatedThreadIndex, UserRelatedIndexes
+from src.memory_storage import DEFAULT_USER, MemoryStorage, JSONMemoryStorage
+
+# Keywords that suggest each bucket; a bucket scores one point per listed keyword found
+BUCKET_PATTERNS = {
+    "Work": ["project", "meeting", "review", "budget", "report", "team", "deadline", "client", "presentation", "agenda", "minutes", "action items"],
+    "Newsletters": ["weekly", "newsletter", "update", "digest", "insights", "trends", "subscribe", "unsubscribe", "marketing", "promotion"],
+    "Bills": ["bill", "payment", "due", "reminder", "invoice", "balance", "account", "statement", "transaction", "receipt", "subscription"],
+    "Social": ["weekend", "dinner", "plans", "party", "invite", "join", "meet up", "catch up", "coffee", "lunch", "dinner"],
+    "Shopping": ["order", "purchase", "shipped", "delivery", "track", "confirmation", "cart", "checkout", "discount", "sale", "receipt"],
+    "Travel": ["flight", "hotel", "reservation", "booking", "trip", "travel", "itinerary", "airport", "check-in", "boarding pass"],
+    "Job Search": ["application", "interview", "position", "resume", "job", "career", "recruiting", "hiring", "opportunity", "role"],
+    "Personal Finance": ["account", "bank", "statement", "transaction", "credit", "debit", "investment", "portfolio", "retirement", "savings"],
+    "Updates": ["update", "notification", "alert", "reminder", "system", "maintenance", "status", "change", "new feature"],
+    "Personal": ["family", "friend", "personal", "private", "catch up", "how are you", "hope you're well", "thinking of you"]
+}
+
+# Keywords that mark each long-term user trait; any hit activates the trait
+TRAIT_PATTERNS = {
+    "workEmailUser": ["meeting", "project", "deadline", "client", "team"],
+    "newsletterSubscriber": ["newsletter", "subscribe", "digest", "update"],
+    "frequentShopper": ["order", "purchase", "shipped", "delivery"],
+    "traveler": ["flight", "hotel", "booking", "travel"],
+    "billPayer": ["bill", "payment", "invoice", "statement"],
+    "jobSearching": ["job", "career", "interview", "application"],
+    "sociallyActive": ["meet", "catch up", "coffee", "lunch"],
+    "techSavvy": ["app", "software", "update", "tech"],
+    "financeFocused": ["investment", "portfolio", "retirement", "savings"],
+    "healthConscious": ["fitness", "wellness", "health", "nutrition"]
+}
+
+# Sentiment keywords; positive wins over negative when both occur
+SENTIMENT_PATTERNS = {
+    "positive": ["thank", "great", "appreciate", "excellent", "wonderful", "happy", "pleased"],
+    "negative": ["sorry", "apologize", "issue", "problem", "concern", "unfortunately", "regret"]
+}
+
+URGENCY_PATTERNS = {
+    "high": ["urgent", "asap", "important", "immediate", "critical", "emergency", "deadline"]
+}
+
+# Compiled once; each table scores the keyword hits of a single shared scan
+_BUCKET_MATCHER = KeywordMatcher(BUCKET_PATTERNS)
+_TRAIT_MATCHER = KeywordMatcher(TRAIT_PATTERNS)
+_SENTIMENT_MATCHER = KeywordMatcher(SENTIMENT_PATTERNS)
+_URGENCY_MATCHER = KeywordMatcher(URGENCY_PATTERNS)
+_ANALYSIS_MATCHER = KeywordMatcher({
+    "all": [keyword
+            for matcher in (_BUCKET_MATCHER, _TRAIT_MATCHER, _SENTIMENT_MATCHER, _URGENCY_MATCHER)
+            for keyword in matcher.keywords]
+})
+
+# Identifies the keyword tables; part of every cached result's key, so edited rules never reuse stale scores
+RULES_VERSION = hashlib.sha1(json.dumps(
+    [BUCKET_PATTERNS, TRAIT_PATTERNS, SENTIMENT_PATTERNS, URGENCY_PATTERNS], sort_keys=True
+).encode('utf-8')).hexdigest()[:12]
+
+# Default number of per-thread results kept by ObserverAgent's result cache
+RESULT_CACHE_SIZE = 10000
+
+# Bounds of the per-user similarity indexes of request threads: users kept, threads per user
+RELATED_MAX_USERS = 256
+RELATED_MAX_THREADS_PER_USER = 1000
+
+# NumPy batch scorer, built on first use by ObserverAgent.score_batch
+_BATCH_SCORER = None
+
+def _best_bucket(bucket_scores: Dict[str, int], buckets: List[str]) -> str:
+    """Return the highest scoring of `buckets`, the first one on ties, or 'Uncategorized'."""
+    best, max_score = "Uncategorized", 0
+    for bucket in buckets:
+        score = bucket_scores.get(bucket, 0)
+        if score > max_score:
+            best, max_score = bucket, score
+    return best
+
+def _score_content(subject: str, snippet: str, rules_version: str = RULES_VERSION) -> tuple:
+    """
+    Scan a thread's subject and snippet once and score every keyword table.
+
+    Returns (bucket_scores, traits, sentiment, urgency). Results are shared by the
+    result cache and must not be mutated.
+    """
+    hits = _ANALYSIS_MATCHER.find(f"{subject} {snippet}".lower())
+
+    sentiment_scores = _SENTIMENT_MATCHER.score_hits(hits)
+    if "positive" in sentiment_scores:
+        sentiment = "positive"
+    elif "negative" in sentiment_scores:
+        sentiment = "negative"
+    else:
+        sentiment = "neutral"
+
+    return (
+        _BUCKET_MATCHER.score_hits(hits),
+        frozenset(_TRAIT_MATCHER.score_hits(hits)),
+        sentiment,
+        "high" if _URGENCY_MATCHER.score_hits(hits) else "normal"
+    )
+
+class ThreadAnalysis:
+    """Keyword analysis of a single thread, computed from one scan of its text."""
+    __slots__ = ('thread_id', 'received_at', 'bucket_scores', 'traits', 'sentiment', 'urgency')
+
+    def __init__(self, thread_id: str, received_at: Optional[str], bucket_scores: Dict[str, int],
+                 traits: Set[str], sentiment: str, urgency: str):
+        self.thread_id = thread_id
+        self.received_at = received_at
+        self.bucket_scores = bucket_scores
+        self.traits = traits
+        self.sentiment = sentiment
+        self.urgency = urgency
+
+    def best_bucket(self, buckets: List[str]) -> str:
+        """Return the highest scoring of `buckets` for this thread."""
+        return _best_bucket(self.bucket_scores, buckets)
+
+class BatchAnalysis:
+    """
+    Result of ObserverAgent.analyze_batch.
+
+    Holds the per-thread analyses in input order; bucket suggestions, assignments
+    and user traits are derived from them without rescanning any text.
+    """
+
+    def __init__(self, threads: List[ThreadAnalysis]):
+        self.threads = threads
+        self.bucket_scores = Counter()
+        for analysis in threads:
+            self.bucket_scores.update(analysis.bucket_scores)
+
+    def suggested_buckets(self, limit: int = 5) -> List[str]:
+        """Return the top buckets by total score over the batch."""
+        return [bucket for bucket, _ in self.bucket_scores.most_common(limit)]
+
+    def assignments(self, buckets: List[str]) -> Dict[str, str]:
+        """Map each thread ID to its best bucket among `buckets`."""
+        return {analysis.thread_id: analysis.best_bucket(buckets) for analysis in self.threads}
+
+    def user_traits(self) -> Dict[str, Any]:
+        """Return traits seen anywhere in the batch, stamped with the last thread's time."""
+        user_traits = {trait: False for trait in TRAIT_PATTERNS}
+        for analysis in self.threads:
+            for trait in analysis.traits:
+                user_traits[trait] = True
+        # Active traits are re-stamped by every later thread, so the last one wins
+        timestamps = {}
+        if self.threads:
+            last_seen = self.threads[-1].received_at
+            timestamps = {trait: last_seen for trait, is_active in user_traits.items() if is_active}
+        return {"userTraits": user_traits, "timestamps": timestamps}
 
 class SessionMemory:
-    """In-memory structure to hold bucket definitions and thread assignments."""
+    """
+    In-memory structure to hold bucket definitions and thread assignments.
+    
+    Assignments are indexed both ways (thread -> bucket and bucket -> threads), so
+    assigning, reassigning or removing a thread and counting or listing a bucket
+    are O(1). Change assignments through assign/remove or by replacing
+    thread_to_bucket as a whole; the mapping itself must not be mutated in place.
+    """
     
     def __init__(self):
         self.bucket_definitions: List[str] = []
-        self.thread_to_bucket: Dict[str, str] = {}
+        self._thread_to_bucket: Dict[str, str] = {}
+        self._bucket_to_threads: Dict[str, Set[str]] = {}
+    
+    @property
+    def thread_to_bucket(self) -> Dict[str, str]:
+        return self._thread_to_bucket
+    
+    @thread_to_bucket.setter
+    def thread_to_bucket(self, thread_to_bucket: Dict[str, str]) -> None:
+        self._thread_to_bucket = {}
+        self._bucket_to_threads = {}
+        for thread_id, bucket in thread_to_bucket.items():
+            self.assign(thread_id, bucket)
+    
+    def assign(self, thread_id: str, bucket: str) -> None:
+        """Assign or reassign a thread to a bucket."""
+        previous = self._thread_to_bucket.get(thread_id)
+        if previous == bucket:
+            return
+        if previous is not None:
+            self._bucket_to_threads[previous].discard(thread_id)
+        self._thread_to_bucket[thread_id] = bucket
+        self._bucket_to_threads.setdefault(bucket, set()).add(thread_id)
+    
+    def remove(self, thread_id: str) -> None:
+        """Remove a thread's assignment, if any."""
+        bucket = self._thread_to_bucket.pop(thread_id, None)
+        if bucket is not None:
+            self._bucket_to_threads[bucket].discard(thread_id)
+    
+    def bucket_of(self, thread_id: str) -> Optional[str]:
+        """Return the bucket a thread is assigned to, or None."""
+        return self._thread_to_bucket.get(thread_id)
+    
+    def bucket_count(self, bucket: str) -> int:
+        """Return the number of threads assigned to a bucket."""
+        return len(self._bucket_to_threads.get(bucket, ()))
+    
+    def threads_in_bucket(self, bucket: str) -> Set[str]:
+        """Return the IDs of the threads assigned to a bucket (read-only)."""
+        return self._bucket_to_threads.get(bucket, set())
 
 class ObserverAgent:
     """
@@ -32,11 +235,25 @@ class ObserverAgent:
     
     def __init__(self, 
                  session_data_path: str = 'data/observerSessionData.json', 
-                 long_term_data_path: str = 'data/observerLongTermData.json'):
+                 long_term_data_path: str = 'data/observerLongTermData.json',
+                 memory_flush_interval: float = 1.0,
+                 memory_storage: Optional[MemoryStorage] = None,
+                 result_cache_size: int = RESULT_CACHE_SIZE,
+                 related_max_users: int = RELATED_MAX_USERS,
+                 related_max_threads: int = RELATED_MAX_THREADS_PER_USER):
         self.session_data_path = session_data_path
         self.long_term_data_path = long_term_data_path
         self.session_memory = SessionMemory()
-        self.long_term_memory = self._load_long_term_memory()
+        # Long-term memory defaults to the JSON file, written behind the request path; see flush()
+        self.memory_storage = memory_storage if memory_storage is not None else \
+            JSONMemoryStorage(long_term_data_path, flush_interval=memory_flush_interval)
+        self.thread_store = ThreadStore(self._load_session_data, self._session_data_signature)
+        self._related_index: Optional[RelatedThreadIndex] = None
+        self._related_version = None
+        # Threads from requests, scoped to the user who sent them and bounded
+        self._user_threads = UserRelatedIndexes(max_users=related_max_users, max_threads=related_max_threads)
+        # Bounded LRU of per-thread scores keyed by (subject, snippet, rules version): only new content is scanned
+        self._score_content = lru_cache(maxsize=result_cache_size)(_score_content)
         
     def _load_session_data(self) -> List[Dict[str, Any]]:
         """Load the synthetic session data for analysis."""
@@ -48,55 +265,95 @@ class ObserverAgent:
             print(f"Error loading session data: {e}")
             return []
     
-    def _load_long_term_memory(self) -> Dict[str, Any]:
-        """Load the long-term memory store."""
+    def _session_data_signature(self) -> Optional[tuple]:
+        """Identify the current version of the session data file."""
         try:
-            with open(self.long_term_data_path, 'r') as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error loading long-term memory: {e}, creating new")
-            return {
-                "userTraits": {},
-                "timestamps": {}
-            }
+            stat = os.stat(self.session_data_path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def invalidate_session_data(self) -> None:
+        """Reload session threads on the next lookup, e.g. after the data was replaced in place."""
+        self.thread_store.invalidate()
+    
+    @property
+    def long_term_memory(self) -> Dict[str, Any]:
+        """Long-term memory of the default user."""
+        return self.memory_storage.load(DEFAULT_USER)
     
-    def _save_long_term_memory(self) -> None:
-        """Save the long-term memory store."""
-        with open(self.long_term_data_path, 'w') as file:
-            json.dump(self.long_term_memory, file, indent=2)
+    def flush(self) -> None:
+        """Write pending long-term memory updates to storage; call on shutdown."""
+        try:
+            self.memory_storage.flush()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error saving long-term memory: {e}")
     
     def _extract_thread_summary(self, thread: Dict[str, Any]) -> str:
         """Extract a compact summary of a thread for LLM analysis."""
         return f"Subject: {thread['subject']}\nSnippet: {thread['latest_snippet']}"
     
+    def _analyze_thread(self, thread: Dict[str, Any]) -> ThreadAnalysis:
+        """Score a thread's subject and snippet, reusing the cached result for seen content."""
+        bucket_scores, traits, sentiment, urgency = self._score_content(
+            thread['subject'], thread.get('latest_snippet', ''), RULES_VERSION)
+        return ThreadAnalysis(
+            thread_id=thread.get('thread_id'),
+            received_at=thread.get('received_at'),
+            bucket_scores=bucket_scores,
+            traits=traits,
+            sentiment=sentiment,
+            urgency=urgency
+        )
+
+    def result_cache_stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and occupancy of the per-thread result cache."""
+        info = self._score_content.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+    def clear_result_cache(self) -> None:
+        """Drop all cached per-thread results and reset the counters."""
+        self._score_content.cache_clear()
+
+    def analyze_batch(self, threads: List[Dict[str, Any]]) -> BatchAnalysis:
+        """
+        Analyze threads in a single pass.
+
+        Each thread's text is lowercased and scanned once for bucket, trait,
+        sentiment and urgency keywords together; threads whose subject and
+        snippet were scored before are served from the result cache. Pass the result to
+        suggest_buckets, assign_threads_to_buckets and update_user_memory to
+        avoid rescanning the same threads.
+        """
+        return BatchAnalysis([self._analyze_thread(thread) for thread in threads])
+    
+    def score_batch(self, threads: List[Dict[str, Any]]):
+        """
+        Score a whole mailbox at once, e.g. for a nightly re-classification.
+        
+        Uses the NumPy batch scorer when NumPy is installed and falls back to
+        analyze_batch otherwise. The result can be passed as `analysis` to
+        suggest_buckets, assign_threads_to_buckets and update_user_memory.
+        """
+        global _BATCH_SCORER
+        from src.batch_scoring import BatchScorer, numpy_available
+        if not numpy_available():
+            return self.analyze_batch(threads)
+        if _BATCH_SCORER is None:
+            _BATCH_SCORER = BatchScorer(BUCKET_PATTERNS, TRAIT_PATTERNS)
+        return _BATCH_SCORER.score(threads)
+    
     def _analyze_buckets(self, threads: List[Dict[str, Any]]) -> List[str]:
         """
         Use pattern analysis to suggest bucket categories.
         """
-        # Define patterns for each possible bucket with more detailed keywords
-        patterns = {
-            "Work": ["project", "meeting", "review", "budget", "report", "team", "deadline", "client", "presentation", "agenda", "minutes", "action items"],
-            "Newsletters": ["weekly", "newsletter", "update", "digest", "insights", "trends", "subscribe", "unsubscribe", "marketing", "promotion"],
-            "Bills": ["bill", "payment", "due", "reminder", "invoice", "balance", "account", "statement", "transaction", "receipt", "subscription"],
-            "Social": ["weekend", "dinner", "plans", "party", "invite", "join", "meet up", "catch up", "coffee", "lunch", "dinner"],
-            "Shopping": ["order", "purchase", "shipped", "delivery", "track", "confirmation", "cart", "checkout", "discount", "sale", "receipt"],
-            "Travel": ["flight", "hotel", "reservation", "booking", "trip", "travel", "itinerary", "airport", "check-in", "boarding pass"],
-            "Job Search": ["application", "interview", "position", "resume", "job", "career", "recruiting", "hiring", "opportunity", "role"],
-            "Personal Finance": ["account", "bank", "statement", "transaction", "credit", "debit", "investment", "portfolio", "retirement", "savings"],
-            "Updates": ["update", "notification", "alert", "reminder", "system", "maintenance", "status", "change", "new feature"],
-            "Personal": ["family", "friend", "personal", "private", "catch up", "how are you", "hope you're well", "thinking of you"]
-        }
-        
         # Initialize bucket scores
         bucket_scores = Counter()
         
-        # Score each thread against patterns
+        # Score each thread against patterns in a single pass over its text
         for thread in threads:
             combined = f"{thread['subject']} {thread['latest_snippet']}".lower()
-            for bucket, keywords in patterns.items():
-                for keyword in keywords:
-                    if keyword in combined:
-                        bucket_scores[bucket] += 1
+            bucket_scores.update(_BUCKET_MATCHER.score(combined))
         
         # Return top 5 buckets by score
         return [bucket for bucket, _ in bucket_scores.most_common(5)]
@@ -105,115 +362,37 @@ class ObserverAgent:
         """
         Analyze threads to identify user traits with more detailed analysis.
         """
-        # Initialize trait analysis
-        trait_analysis = {
-            "userTraits": {
-                "workEmailUser": False,
-                "newsletterSubscriber": False,
-                "frequentShopper": False,
-                "traveler": False,
-                "billPayer": False,
-                "jobSearching": False,
-                "sociallyActive": False,
-                "techSavvy": False,
-                "financeFocused": False,
-                "healthConscious": False
-            },
-            "timestamps": {}
-        }
-        
-        # Analyze each thread for traits
-        for thread in threads:
-            combined = f"{thread['subject']} {thread['latest_snippet']}".lower()
-            
-            # Work email analysis
-            if any(word in combined for word in ["meeting", "project", "deadline", "client", "team"]):
-                trait_analysis["userTraits"]["workEmailUser"] = True
-            
-            # Newsletter analysis
-            if any(word in combined for word in ["newsletter", "subscribe", "digest", "update"]):
-                trait_analysis["userTraits"]["newsletterSubscriber"] = True
-            
-            # Shopping analysis
-            if any(word in combined for word in ["order", "purchase", "shipped", "delivery"]):
-                trait_analysis["userTraits"]["frequentShopper"] = True
-            
-            # Travel analysis
-            if any(word in combined for word in ["flight", "hotel", "booking", "travel"]):
-                trait_analysis["userTraits"]["traveler"] = True
-            
-            # Bill analysis
-            if any(word in combined for word in ["bill", "payment", "invoice", "statement"]):
-                trait_analysis["userTraits"]["billPayer"] = True
-            
-            # Job search analysis
-            if any(word in combined for word in ["job", "career", "interview", "application"]):
-                trait_analysis["userTraits"]["jobSearching"] = True
-            
-            # Social activity analysis
-            if any(word in combined for word in ["meet", "catch up", "coffee", "lunch"]):
-                trait_analysis["userTraits"]["sociallyActive"] = True
-            
-            # Tech savviness analysis
-            if any(word in combined for word in ["app", "software", "update", "tech"]):
-                trait_analysis["userTraits"]["techSavvy"] = True
-            
-            # Finance focus analysis
-            if any(word in combined for word in ["investment", "portfolio", "retirement", "savings"]):
-                trait_analysis["userTraits"]["financeFocused"] = True
-            
-            # Health consciousness analysis
-            if any(word in combined for word in ["fitness", "wellness", "health", "nutrition"]):
-                trait_analysis["userTraits"]["healthConscious"] = True
-            
-            # Update timestamps for active traits
-            for trait, is_active in trait_analysis["userTraits"].items():
-                if is_active:
-                    trait_analysis["timestamps"][trait] = thread['received_at']
-        
-        return trait_analysis
+        return self.analyze_batch(threads).user_traits()
     
     def _analyze_sentiment_and_urgency(self, thread: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze thread content for sentiment and urgency.
         """
-        combined = f"{thread['subject']} {thread['latest_snippet']}".lower()
-        
-        # Sentiment analysis
-        positive_words = ["thank", "great", "appreciate", "excellent", "wonderful", "happy", "pleased"]
-        negative_words = ["sorry", "apologize", "issue", "problem", "concern", "unfortunately", "regret"]
-        
-        sentiment = "neutral"
-        if any(word in combined for word in positive_words):
-            sentiment = "positive"
-        elif any(word in combined for word in negative_words):
-            sentiment = "negative"
-        
-        # Urgency analysis
-        urgency_words = ["urgent", "asap", "important", "immediate", "critical", "emergency", "deadline"]
-        urgency = "normal"
-        if any(word in combined for word in urgency_words):
-            urgency = "high"
-        
+        analysis = self._analyze_thread(thread)
         return {
-            "sentiment": sentiment,
-            "urgency": urgency
+            "sentiment": analysis.sentiment,
+            "urgency": analysis.urgency
         }
     
-    def suggest_buckets(self, threads: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    def suggest_buckets(self, 
+                        threads: Optional[List[Dict[str, Any]]] = None, 
+                        analysis: Optional[BatchAnalysis] = None) -> List[str]:
         """
         Suggest meaningful bucket categories for the current session threads.
         
         Args:
             threads: List of thread dictionaries (optional, will load from file if not provided)
+            analysis: Result of analyze_batch for the threads (optional, computed if not provided)
             
         Returns:
             List of 5-7 bucket names appropriate for the threads
         """
-        session_threads = threads if threads is not None else self._load_session_data()
+        if analysis is None:
+            session_threads = threads if threads is not None else self._load_session_data()
+            analysis = self.analyze_batch(session_threads)
         
         # Analyze the threads and suggest appropriate buckets
-        suggested_buckets = self._analyze_buckets(session_threads)
+        suggested_buckets = analysis.suggested_buckets()
         
         # Store the bucket definitions in session memory
         self.session_memory.bucket_definitions = suggested_buckets
@@ -222,18 +401,22 @@ class ObserverAgent:
     
     def assign_threads_to_buckets(self, 
                                  threads: Optional[List[Dict[str, Any]]] = None, 
-                                 buckets: Optional[List[str]] = None) -> Dict[str, str]:
+                                 buckets: Optional[List[str]] = None,
+                                 analysis: Optional[BatchAnalysis] = None) -> Dict[str, str]:
         """
         Assign each thread to the most appropriate bucket.
         
         Args:
             threads: List of thread dictionaries (optional, will load from file if not provided)
             buckets: List of bucket names (optional, will use buckets from session memory if not provided)
+            analysis: Result of analyze_batch for the threads (optional, computed if not provided)
             
         Returns:
             Dictionary mapping thread IDs to bucket names
         """
-        session_threads = threads if threads is not None else self._load_session_data()
+        if analysis is None:
+            session_threads = threads if threads is not None else self._load_session_data()
+            analysis = self.analyze_batch(session_threads)
         
         # Use provided buckets or get them from session memory
         if buckets is not None:
@@ -242,55 +425,59 @@ class ObserverAgent:
             bucket_list = self.session_memory.bucket_definitions
         else:
             # If no buckets are available, suggest them now
-            bucket_list = self.suggest_buckets(session_threads)
+            bucket_list = self.suggest_buckets(analysis=analysis)
         
         # Assign each thread to a bucket
-        thread_to_bucket = {}
-        for thread in session_threads:
-            thread_id = thread['thread_id']
-            assigned_bucket = self._assign_thread_to_bucket(thread, bucket_list)
-            thread_to_bucket[thread_id] = assigned_bucket
+        thread_to_bucket = analysis.assignments(bucket_list)
         
         # Store the assignments in session memory
         self.session_memory.thread_to_bucket = thread_to_bucket
+        self.thread_store.set_assignments(thread_to_bucket)
         
         return thread_to_bucket
     
-    def update_user_memory(self, threads: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    def update_user_memory(self, 
+                           threads: Optional[List[Dict[str, Any]]] = None, 
+                           analysis: Optional[BatchAnalysis] = None,
+                           user_id: str = DEFAULT_USER) -> Dict[str, Any]:
         """
         Analyze threads to identify and update long-term user traits.
         
         Args:
             threads: List of thread dictionaries (optional, will load from file if not provided)
+            analysis: Result of analyze_batch for the threads (optional, computed if not provided)
+            user_id: Mailbox whose memory is updated (only kept apart by per-user storage backends)
             
         Returns:
             Dictionary with the updated user traits and timestamps
         """
-        session_threads = threads if threads is not None else self._load_session_data()
+        if analysis is None:
+            session_threads = threads if threads is not None else self._load_session_data()
+            analysis = self.analyze_batch(session_threads)
         
         # Analyze the threads to identify user traits
-        memory_updates = self._analyze_user_traits(session_threads)
-        
-        # Update long-term memory with new trait information
-        self.long_term_memory["userTraits"].update(memory_updates["userTraits"])
-        
-        # Update timestamps for traits where appropriate
-        for trait, timestamp in memory_updates["timestamps"].items():
-            if timestamp is not None:
-                self.long_term_memory["timestamps"][trait] = timestamp
-        
-        # Save the updated long-term memory
-        self._save_long_term_memory()
+        memory_updates = analysis.user_traits()
         
-        return self.long_term_memory
+        # Update long-term memory with new trait information; timestamps are only set where known
+        return self.memory_storage.update(user_id, memory_updates["userTraits"], memory_updates["timestamps"])
 
     def get_bucket_count(self, bucket: str) -> int:
         """Get the number of emails in a bucket."""
-        count = 0
-        for thread_id, assigned_bucket in self.session_memory.thread_to_bucket.items():
-            if assigned_bucket == bucket:
-                count += 1
-        return count
+        return self.session_memory.bucket_count(bucket)
+
+    def get_bucket_threads(self, bucket: str) -> List[str]:
+        """Get the IDs of the threads assigned to a bucket."""
+        return list(self.session_memory.threads_in_bucket(bucket))
+
+    def assign_thread(self, thread_id: str, bucket: str) -> None:
+        """Assign or reassign a single thread to a bucket."""
+        self.session_memory.assign(thread_id, bucket)
+        self.thread_store.assign(thread_id, bucket)
+
+    def remove_thread(self, thread_id: str) -> None:
+        """Remove a single thread's bucket assignment."""
+        self.session_memory.remove(thread_id)
+        self.thread_store.remove(thread_id)
 
     def get_bucket_description(self, bucket: str) -> str:
         """Get a detailed description for a bucket."""
@@ -309,33 +496,53 @@ class ObserverAgent:
         }
         return descriptions.get(bucket, f"Emails categorized as {bucket}")
 
-    def get_related_threads(self, thread: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Get threads related to the given thread."""
-        related_threads = []
-        current_bucket = self.session_memory.thread_to_bucket.get(thread['thread_id'])
+    def _get_related_index(self) -> RelatedThreadIndex:
+        """Return the similarity index over the store's threads, rebuilt when the store reloads."""
+        threads = self.thread_store.threads()
+        if self._related_index is None or self._related_version != self.thread_store.version:
+            self._related_index = RelatedThreadIndex()
+            self._related_index.add_many(threads)
+            self._related_version = self.thread_store.version
+        return self._related_index
+
+    def index_threads(self, threads: List[Dict[str, Any]], user_id: str) -> None:
+        """
+        Add or update threads from a request in the user's own similarity index.
+        
+        They are never added to the shared session thread store, and only
+        related to threads of the same user.
+        """
+        self._user_threads.add(user_id, threads)
+
+    def get_related_threads(self, thread: Dict[str, Any], limit: int = 5,
+                            user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the session threads most similar to the given thread, and with a
+        user_id also the user's own indexed threads.
+        """
+        thread_id = thread.get('thread_id')
+        candidates = {}
+        user_matches = self._user_threads.similar(user_id, thread, limit) if user_id else []
+        # The user's copy of a thread replaces a session thread with the same ID
+        for similarity, related in self._get_related_index().similar(thread, limit) + user_matches:
+            if not thread_id or related['thread_id'] != thread_id:
+                candidates[related['thread_id']] = (similarity, related)
+        ranked = sorted(candidates.values(), key=lambda pair: -pair[0])
+        return [related for _, related in ranked[:limit]]
+
+    def get_recent_bucket_threads(self, thread: Dict[str, Any], limit: int = 5) -> List[Dict[str, Any]]:
+        """Get the most recent other threads in the given thread's bucket."""
+        current_bucket = self.session_memory.bucket_of(thread['thread_id'])
         
         if not current_bucket:
             return []
 
-        # Get all threads in the same bucket
-        for thread_id, bucket in self.session_memory.thread_to_bucket.items():
-            if bucket == current_bucket and thread_id != thread['thread_id']:
-                # Load thread data
-                thread_data = self._load_thread_data(thread_id)
-                if thread_data:
-                    related_threads.append(thread_data)
-
-        # Sort by date (most recent first) and limit to 5 threads
-        related_threads.sort(key=lambda x: x['received_at'], reverse=True)
-        return related_threads[:5]
+        # Most recent threads in the same bucket, read from the store's bucket index
+        return self.thread_store.recent_in_bucket(current_bucket, limit, exclude=thread['thread_id'])
 
     def _load_thread_data(self, thread_id: str) -> Optional[Dict[str, Any]]:
         """Load thread data from session data."""
-        threads = self._load_session_data()
-        for thread in threads:
-            if thread['thread_id'] == thread_id:
-                return thread
-        return None
+        return self.thread_store.get(thread_id)
 
     def _assign_thread_to_bucket(self, thread: Dict[str, Any], buckets: List[str]) -> str:
         """
@@ -348,47 +555,9 @@ class ObserverAgent:
         Returns:
             The name of the most appropriate bucket
         """
-        # Define patterns for each bucket with more detailed keywords
-        patterns = {
-            "Work": ["project", "meeting", "review", "budget", "report", "team", "deadline", "client", "presentation", "agenda", "minutes", "action items"],
-            "Newsletters": ["weekly", "newsletter", "update", "digest", "insights", "trends", "subscribe", "unsubscribe", "marketing", "promotion"],
-            "Bills": ["bill", "payment", "due", "reminder", "invoice", "balance", "account", "statement", "transaction", "receipt", "subscription"],
-            "Social": ["weekend", "dinner", "plans", "party", "invite", "join", "meet up", "catch up", "coffee", "lunch", "dinner"],
-            "Shopping": ["order", "purchase", "shipped", "delivery", "track", "confirmation", "cart", "checkout", "discount", "sale", "receipt"],
-            "Travel": ["flight", "hotel", "reservation", "booking", "trip", "travel", "itinerary", "airport", "check-in", "boarding pass"],
-            "Job Search": ["application", "interview", "position", "resume", "job", "career", "recruiting", "hiring", "opportunity", "role"],
-            "Personal Finance": ["account", "bank", "statement", "transaction", "credit", "debit", "investment", "portfolio", "retirement", "savings"],
-            "Updates": ["update", "notification", "alert", "reminder", "system", "maintenance", "status", "change", "new feature"],
-            "Personal": ["family", "friend", "personal", "private", "catch up", "how are you", "hope you're well", "thinking of you"]
-        }
-        
-        # Initialize bucket scores
-        bucket_scores = {bucket: 0 for bucket in buckets}
-        
         # Combine subject and snippet for analysis
         combined = f"{thread['subject']} {thread.get('latest_snippet', '')}".lower()
-        
-        # Score each bucket based on keyword matches
-        for bucket in buckets:
-            if bucket in patterns:
-                for keyword in patterns[bucket]:
-                    if keyword in combined:
-                        bucket_scores[bucket] += 1
-        
-        # Find the bucket with the highest score
-        if not bucket_scores:
-            return "Uncategorized"
-            
-        max_score = max(bucket_scores.values())
-        if max_score == 0:
-            return "Uncategorized"
-            
-        # Return the bucket with the highest score
-        for bucket, score in bucket_scores.items():
-            if score == max_score:
-                return bucket
-                
-        return "Uncategorized"
+        return _best_bucket(_BUCKET_MATCHER.score(combined), buckets)
 
 # Command-line demo
 if __name__ == "__main__":
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+
+class ProcessedEmailIndex:
+    """
+    Bounded index of processed emails by email_id, the hash of their normalized
+    content, so a re-sent copy of an email is recognized whatever its timestamp.
+
+    Lookups and inserts are O(1). Adding an email that is already indexed counts
+    as a duplicate and marks it recently used; past `max_entries`, the least
+    recently seen emails are evicted. All methods are thread-safe.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.added = 0
+        self.duplicates = 0
+        self.evictions = 0
+        # Email ID -> times the email was seen
+        self._seen: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, email: Any) -> bool:
+        return email.email_id in self._seen
+
+    def add(self, email: Any) -> bool:
+        """Record a processed email; returns False if it had been processed before."""
+        email_id = email.email_id
+        with self._lock:
+            count = self._seen.get(email_id)
+            if count is not None:
+                self._seen[email_id] = count + 1
+                self._seen.move_to_end(email_id)
+                self.duplicates += 1
+                return False
+            self._seen[email_id] = 1
+            self.added += 1
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def seen_count(self, email: Any) -> int:
+        """Return how often an email was recorded, 0 if it is not indexed."""
+        return self._seen.get(email.email_id, 0)
+
+    def clear(self) -> int:
+        """Forget every email; returns how many were indexed."""
+        with self._lock:
+            count = len(self._seen)
+            self._seen.clear()
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Return occupancy and the added/duplicate/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._seen),
+                "max_entries": self.max_entries,
+                "added": self.added,
+                "duplicates": self.duplicates,
+                "evictions": self.evictions
+            }
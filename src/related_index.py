@@ -0,0 +1,221 @@
+import heapq
+import os
+import random
+import re
+import sys
+import zlib
+from array import array
+from collections import Counter, OrderedDict
+from operator import itemgetter
+from typing import Dict, List, Any, Optional, Iterable, Set, Tuple
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.message_threader import normalize_subject
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9'._-]*[a-z0-9]")
+_STOPWORDS = frozenset(
+    "the and for you your with this that are was were have has had from not but all any can our out "
+    "will just been into about their them they there what when where which who why how its it's "
+    "let's please thanks thank hi hello regards dear new get see more".split()
+)
+_MIX = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+def thread_features(thread: Dict[str, Any]) -> Set[str]:
+    """Lexical features of a thread: subject and snippet words plus participant addresses."""
+    text = f"{normalize_subject(thread.get('subject', ''))} {thread.get('latest_snippet', '')}".lower()
+    features = {word for word in _WORD.findall(text) if len(word) > 2 and word not in _STOPWORDS}
+    features.update('@' + address.lower() for address in thread.get('participants') or ())
+    return features
+
+
+class RelatedThreadIndex:
+    """
+    MinHash/LSH index over thread features for related-thread lookups.
+
+    Each thread's features (see thread_features) are hashed to 64 bits and
+    summarized by a MinHash signature of num_bands * band_size rows; each group of
+    band_size rows is a band key in its own hash table. Threads that share band keys
+    with the query are candidates. The number of shared bands estimates Jaccard
+    similarity, so only the limit * rerank_factor candidates with the most
+    collisions are scored exactly on their feature hashes. Band buckets larger than
+    max_bucket (e.g. the mailbox owner's own address) are skipped as uninformative.
+
+    Threads are added, replaced and removed incrementally. Only feature hashes are
+    kept per thread; band keys are recomputed from them on removal.
+    """
+
+    def __init__(self, num_bands: int = 24, band_size: int = 1, max_bucket: int = 1000,
+                 rerank_factor: int = 10, seed: int = 1):
+        self.num_bands = num_bands
+        self.band_size = band_size
+        self.max_bucket = max_bucket
+        self.rerank_factor = rerank_factor
+        rng = random.Random(seed)
+        # Multiply-add hash functions over 64-bit feature hashes, one per signature row
+        self._permutations = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(num_bands * band_size)]
+        self._bands: List[Dict[int, List[int]]] = [{} for _ in range(num_bands)]
+        self._slots: Dict[str, int] = {}
+        self._thread_ids: List[Optional[str]] = []
+        self._threads: List[Optional[Dict[str, Any]]] = []
+        self._features: List[Optional[array]] = []
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, thread_id: str) -> bool:
+        return thread_id in self._slots
+
+    def _feature_hashes(self, thread: Dict[str, Any]) -> array:
+        return array('Q', sorted({(zlib.crc32(f.encode('utf-8')) * _MIX) & _MASK for f in thread_features(thread)}))
+
+    def _band_keys(self, hashes: array) -> List[int]:
+        """MinHash signature of the hashes, folded into one key per band."""
+        if not hashes:
+            return []
+        signature = [min([(a * value + b) & _MASK for value in hashes]) for a, b in self._permutations]
+        size = self.band_size
+        return [hash(tuple(signature[band * size:(band + 1) * size])) for band in range(self.num_bands)]
+
+    def add(self, thread: Dict[str, Any]) -> None:
+        """Add a thread, replacing an indexed thread with the same ID."""
+        thread_id = thread['thread_id']
+        if thread_id in self._slots:
+            self.remove(thread_id)
+        hashes = self._feature_hashes(thread)
+        if self._free:
+            slot = self._free.pop()
+            self._thread_ids[slot], self._threads[slot], self._features[slot] = thread_id, thread, hashes
+        else:
+            slot = len(self._thread_ids)
+            self._thread_ids.append(thread_id)
+            self._threads.append(thread)
+            self._features.append(hashes)
+        self._slots[thread_id] = slot
+        for band, key in zip(self._bands, self._band_keys(hashes)):
+            band.setdefault(key, []).append(slot)
+
+    def add_many(self, threads: Iterable[Dict[str, Any]]) -> None:
+        for thread in threads:
+            self.add(thread)
+
+    def remove(self, thread_id: str) -> None:
+        """Remove a thread from the index, if present."""
+        slot = self._slots.pop(thread_id, None)
+        if slot is None:
+            return
+        for band, key in zip(self._bands, self._band_keys(self._features[slot])):
+            members = band.get(key)
+            if members is not None:
+                members.remove(slot)
+                if not members:
+                    del band[key]
+        self._thread_ids[slot] = self._threads[slot] = self._features[slot] = None
+        self._free.append(slot)
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        slot = self._slots.get(thread_id)
+        return self._threads[slot] if slot is not None else None
+
+    def _candidates(self, band_keys: List[int]) -> Counter:
+        """Count, for every candidate, the bands in which it collides with the query."""
+        collisions = Counter()
+        for band, key in zip(self._bands, band_keys):
+            members = band.get(key)
+            if members and len(members) <= self.max_bucket:
+                collisions.update(members)
+        return collisions
+
+    def similar(self, thread: Dict[str, Any], limit: int = 5,
+                min_similarity: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Return up to `limit` (similarity, thread) pairs most similar to `thread`.
+
+        The thread itself (same thread_id) is never returned.
+        """
+        slot = self._slots.get(thread.get('thread_id'))
+        hashes = self._features[slot] if slot is not None else self._feature_hashes(thread)
+        query = set(hashes)
+        if not query:
+            return []
+        collisions = self._candidates(self._band_keys(hashes))
+        collisions.pop(slot, None)
+        # The share of colliding bands estimates similarity; only the best few are scored exactly
+        needed = limit * self.rerank_factor
+        if len(collisions) <= needed:
+            shortlist = list(collisions.items())
+        else:
+            # Most candidates collide once by chance; rank the repeated ones when there are enough
+            repeated = [item for item in collisions.items() if item[1] > 1]
+            if len(repeated) >= needed:
+                shortlist = heapq.nlargest(needed, repeated, key=itemgetter(1))
+            else:
+                shortlist = collisions.most_common(needed)
+        scored = []
+        for candidate, _ in shortlist:
+            features = self._features[candidate]
+            common = len(query.intersection(features))
+            similarity = common / (len(query) + len(features) - common)
+            if similarity > min_similarity:
+                scored.append((-similarity, candidate))
+        scored.sort()
+        return [(-negative, self._threads[candidate]) for negative, candidate in scored[:limit]]
+
+
+class UserRelatedIndexes:
+    """
+    One RelatedThreadIndex per user for threads supplied by requests.
+
+    A user's threads are only ever matched against that user's own queries. At
+    most `max_threads` threads are kept per user and `max_users` users in all;
+    the least recently added thread or least recently used user is evicted first.
+    Threads without a thread_id cannot be told apart and are not indexed.
+    """
+
+    def __init__(self, max_users: int = 256, max_threads: int = 1000, **index_options: Any):
+        self.max_users = max_users
+        self.max_threads = max_threads
+        self.index_options = index_options
+        self.evictions = 0
+        self._users: 'OrderedDict[str, Tuple[RelatedThreadIndex, OrderedDict]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def add(self, user_id: str, threads: Iterable[Dict[str, Any]]) -> None:
+        """Add or replace a user's threads."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = (RelatedThreadIndex(**self.index_options), OrderedDict())
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        self._users.move_to_end(user_id)
+        index, order = entry
+        for thread in threads:
+            thread_id = thread.get('thread_id')
+            if not thread_id:
+                continue
+            index.add(thread)
+            order[thread_id] = None
+            order.move_to_end(thread_id)
+            while len(order) > self.max_threads:
+                oldest, _ = order.popitem(last=False)
+                index.remove(oldest)
+                self.evictions += 1
+
+    def get(self, user_id: str, thread_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._users.get(user_id)
+        return entry[0].get(thread_id) if entry is not None else None
+
+    def similar(self, user_id: str, thread: Dict[str, Any], limit: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to `limit` (similarity, thread) pairs among the user's own threads."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return []
+        self._users.move_to_end(user_id)
+        return entry[0].similar(thread, limit)
@@ -0,0 +1,106 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class FlightAbandoned(Exception):
+    """The caller that claimed a flight went away before finishing it."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key starts the work; callers that arrive while it is
+    in flight await the same result, or the same exception. Nothing is kept once
+    the work is done, so a failure is never reused: the next call starts afresh.
+    The work runs as its own task, so a caller that is cancelled, e.g. by a
+    client disconnect, does not cancel it for the others. A claimed flight
+    whose claimant goes away is abandoned: callers waiting in do() start the
+    work again.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.abandoned = 0
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of `compute()`, shared with concurrent calls for the same key."""
+        while True:
+            call = self._calls.get(key)
+            if call is None:
+                call = asyncio.ensure_future(compute())
+                self._register(key, call)
+            else:
+                self.coalesced += 1
+            try:
+                return await asyncio.shield(call)
+            except FlightAbandoned:
+                continue
+
+    def join(self, key: Hashable) -> Optional[Awaitable[Any]]:
+        """
+        Return an awaitable for the call in flight for `key`, or None if there is
+        none. It raises FlightAbandoned if the claimant of the flight goes away.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            return None
+        self.coalesced += 1
+        return asyncio.shield(call)
+
+    def claim(self, key: Hashable) -> asyncio.Future:
+        """
+        Take the lead for `key` when the caller computes the result itself, e.g.
+        while streaming it. The caller must resolve the returned future with
+        set_result or set_exception, or abandon() it; concurrent callers await it.
+        """
+        if key in self._calls:
+            raise KeyError(f"A call for {key!r} is already in flight")
+        call = asyncio.get_running_loop().create_future()
+        self._register(key, call)
+        return call
+
+    def abandon(self, key: Hashable, call: asyncio.Future) -> None:
+        """Give up a claimed flight unfinished; its waiters are released to start the work again."""
+        if call.done():
+            return
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        self.abandoned += 1
+        call.set_exception(FlightAbandoned(f"The call for {key!r} was abandoned"))
+
+    def _register(self, key: Hashable, call: asyncio.Future) -> None:
+        self._calls[key] = call
+        self.leaders += 1
+        call.add_done_callback(functools.partial(self._done, key))
+
+    def _done(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Reading the exception also keeps asyncio from reporting it as never retrieved
+        if call.cancelled():
+            self.failures += 1
+        elif call.exception() is not None and not isinstance(call.exception(), FlightAbandoned):
+            self.failures += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return the calls in flight and the leader/coalesced/failure/abandoned counters."""
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "abandoned": self.abandoned
+        }
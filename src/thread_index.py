@@ -0,0 +1,132 @@
+import json
+import os
+import sqlite3
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+SCHEMA_VERSION = 1
+
+
+class ThreadIndex:
+    """
+    Persistent SQLite index of normalized threads keyed by thread ID.
+
+    Each row stores a hash of the raw thread JSON alongside the normalized fields,
+    so the Ingestion Agent can skip re-normalizing threads that did not change and
+    skip reading the source file entirely when it is untouched since the last run.
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        directory = os.path.dirname(index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(index_path)
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        """Create the tables, discarding an index written with another schema version."""
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            if self.get_meta('schema_version') != str(SCHEMA_VERSION):
+                self.connection.execute("DROP TABLE IF EXISTS threads")
+                self.connection.execute("DELETE FROM meta")
+                self._set_meta('schema_version', str(SCHEMA_VERSION))
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS threads (
+                    thread_id TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    tz INTEGER,
+                    subject TEXT NOT NULL,
+                    latest_snippet TEXT NOT NULL,
+                    participants TEXT NOT NULL,
+                    messages TEXT NOT NULL
+                )
+            """)
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS threads_by_date ON threads (ts DESC, position ASC)"
+            )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a metadata value."""
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def get_source_signature(self) -> Optional[str]:
+        """Return the signature of the source file the index was last synchronized with."""
+        return self.get_meta('source_signature')
+
+    def get_hashes(self) -> Dict[str, Tuple[str, int]]:
+        """Return a mapping of thread ID to (content hash, position)."""
+        rows = self.connection.execute("SELECT thread_id, content_hash, position FROM threads")
+        return {thread_id: (content_hash, position) for thread_id, content_hash, position in rows}
+
+    def apply_changes(self,
+                      upserts: Iterable[Dict[str, Any]],
+                      moves: Iterable[Tuple[int, str]],
+                      deletions: Iterable[str],
+                      source_signature: str) -> None:
+        """
+        Apply one synchronization pass in a single transaction.
+
+        Args:
+            upserts: Records (see fields in the threads table) for new or changed threads
+            moves: (position, thread_id) pairs for unchanged threads that moved in the file
+            deletions: IDs of threads no longer present in the source
+            source_signature: Signature of the source file after this pass
+        """
+        with self.connection:
+            self.connection.executemany(
+                """
+                INSERT OR REPLACE INTO threads
+                    (thread_id, content_hash, position, ts, tz, subject, latest_snippet, participants, messages)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (
+                        record['thread_id'], record['content_hash'], record['position'],
+                        record['ts'], record['tz'], record['subject'], record['latest_snippet'],
+                        json.dumps(record['participants']), json.dumps(record['messages'])
+                    )
+                    for record in upserts
+                )
+            )
+            self.connection.executemany("UPDATE threads SET position = ? WHERE thread_id = ?", moves)
+            self.connection.executemany(
+                "DELETE FROM threads WHERE thread_id = ?", ((thread_id,) for thread_id in deletions)
+            )
+            self._set_meta('source_signature', source_signature)
+
+    def iter_records(self) -> Iterable[Dict[str, Any]]:
+        """Yield stored records, most recent first (file order breaks ties)."""
+        rows = self.connection.execute("""
+            SELECT thread_id, content_hash, position, ts, tz, subject, latest_snippet, participants, messages
+            FROM threads ORDER BY ts DESC, position ASC
+        """)
+        for row in rows:
+            yield {
+                'thread_id': row[0],
+                'content_hash': row[1],
+                'position': row[2],
+                'ts': row[3],
+                'tz': row[4],
+                'subject': row[5],
+                'latest_snippet': row[6],
+                'participants': json.loads(row[7]),
+                'messages': json.loads(row[8])
+            }
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.connection.close()
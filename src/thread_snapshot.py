@@ -0,0 +1,319 @@
+import mmap
+import os
+import sys
+import struct
+from typing import Dict, List, Any, Optional, Tuple
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestionAgent import EmailMessage, IngestedThread, _from_timestamp
+
+SNAPSHOT_MAGIC = b'EMLSNAP\0'
+SNAPSHOT_VERSION = 1
+
+# magic, version, reserved, thread count, message count, reference count, string count, signature length
+_HEADER = struct.Struct('<8sHHIIIII')
+_NO_OFFSET = -2 ** 31  # Stored in tz columns for naive datetimes
+
+# Column layout: (name, array typecode). Columns are written in this order, each
+# padded to 8 bytes so they can be viewed in place with memoryview.cast().
+THREAD_COLUMNS = [
+    ('thread_id', 'I'), ('subject', 'I'), ('latest_snippet', 'I'),
+    ('ts', 'q'), ('tz', 'i'),
+    ('participants_start', 'I'), ('participants_count', 'I'),
+    ('messages_start', 'I'), ('messages_count', 'I'),
+]
+MESSAGE_COLUMNS = [
+    ('id', 'I'), ('from_address', 'I'),
+    ('to_start', 'I'), ('to_count', 'I'), ('cc_start', 'I'), ('cc_count', 'I'),
+    ('ts', 'q'), ('tz', 'i'),
+    ('subject', 'I'), ('snippet', 'I'), ('body', 'I'),
+]
+
+
+def _pad(length: int) -> int:
+    return -length % 8
+
+
+class _StringTable:
+    """Deduplicating string table used while writing a snapshot."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.encoded: List[bytes] = []
+
+    def add(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.encoded)
+            self.encoded.append(value.encode('utf-8'))
+        return string_id
+
+
+def write_snapshot(path: str, records: List[Dict[str, Any]], source_signature: str) -> None:
+    """
+    Write normalized thread records to a columnar binary snapshot.
+
+    Args:
+        path: Destination file, replaced atomically
+        records: Thread records in the format produced for the ThreadIndex, already
+            in the order they should be returned when loaded
+        source_signature: Signature of the source file the records were built from
+    """
+    strings = _StringTable()
+    threads = {name: [] for name, _ in THREAD_COLUMNS}
+    messages = {name: [] for name, _ in MESSAGE_COLUMNS}
+    references: List[int] = []
+
+    def add_references(addresses: List[str]) -> Tuple[int, int]:
+        start = len(references)
+        references.extend(strings.add(address) for address in addresses)
+        return start, len(addresses)
+
+    for record in records:
+        threads['thread_id'].append(strings.add(record['thread_id']))
+        threads['subject'].append(strings.add(record['subject']))
+        threads['latest_snippet'].append(strings.add(record['latest_snippet']))
+        threads['ts'].append(record['ts'])
+        threads['tz'].append(_NO_OFFSET if record['tz'] is None else record['tz'])
+        start, count = add_references(record['participants'])
+        threads['participants_start'].append(start)
+        threads['participants_count'].append(count)
+        threads['messages_start'].append(len(messages['id']))
+        threads['messages_count'].append(len(record['messages']))
+
+        for msg_id, from_address, to_addresses, cc_addresses, ts, tz, subject, snippet, body in record['messages']:
+            messages['id'].append(strings.add(msg_id))
+            messages['from_address'].append(strings.add(from_address))
+            start, count = add_references(to_addresses)
+            messages['to_start'].append(start)
+            messages['to_count'].append(count)
+            start, count = add_references(cc_addresses)
+            messages['cc_start'].append(start)
+            messages['cc_count'].append(count)
+            messages['ts'].append(ts)
+            messages['tz'].append(_NO_OFFSET if tz is None else tz)
+            messages['subject'].append(strings.add(subject))
+            messages['snippet'].append(strings.add(snippet))
+            messages['body'].append(strings.add(body))
+
+    offsets = [0]
+    for encoded in strings.encoded:
+        offsets.append(offsets[-1] + len(encoded))
+
+    signature = source_signature.encode('utf-8')
+    chunks = [
+        _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(records), len(messages['id']),
+                     len(references), len(strings.encoded), len(signature)),
+        signature,
+    ]
+    chunks.append(b'\0' * _pad(sum(len(chunk) for chunk in chunks)))
+
+    columns = [(threads[name], typecode) for name, typecode in THREAD_COLUMNS]
+    columns += [(messages[name], typecode) for name, typecode in MESSAGE_COLUMNS]
+    columns += [(references, 'I'), (offsets, 'Q')]
+    for values, typecode in columns:
+        packed = struct.pack(f'<{len(values)}{typecode}', *values)
+        chunks.append(packed)
+        chunks.append(b'\0' * _pad(len(packed)))
+    chunks.extend(strings.encoded)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.writelines(chunks)
+    os.replace(temp_path, path)
+
+
+class ThreadSnapshot:
+    """
+    Read-only view over a snapshot file mapped into memory.
+
+    Column values are read in place from the mapping; strings are decoded only when
+    a field is accessed, so loading a snapshot costs no parsing up front. Section
+    sizes are checked against the file when it is opened and references when they
+    are decoded, so a truncated or corrupt snapshot raises ValueError. Threads
+    loaded from a snapshot read from its mapping: close() it, or use it as a
+    context manager, once they are no longer needed.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != 'little':
+            # Columns are written little-endian and viewed in place with native casts
+            raise ValueError("Snapshots can only be mapped on little-endian platforms")
+        with open(path, 'rb') as file:
+            # An empty file cannot be mapped and raises ValueError
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            self._map()
+        except BaseException:
+            self.close()
+            raise
+
+    def _map(self) -> None:
+        view = self._view(memoryview(self._mmap))
+
+        if len(view) < _HEADER.size:
+            raise ValueError("Snapshot file is truncated")
+        (magic, version, _, self.thread_count, self.message_count,
+         reference_count, string_count, signature_length) = _HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a thread snapshot file")
+        self.version = version
+        if version != SNAPSHOT_VERSION:
+            return
+
+        position = _HEADER.size
+
+        def section(size: int) -> memoryview:
+            nonlocal position
+            if position + size > len(view):
+                raise ValueError("Snapshot file is truncated")
+            values = view[position:position + size]
+            position += size + _pad(size)
+            return values
+
+        def column(typecode: str, count: int) -> memoryview:
+            return self._view(section(struct.calcsize(typecode) * count).cast(typecode))
+
+        self.source_signature = str(section(signature_length), 'utf-8')
+        self.threads = {name: column(typecode, self.thread_count) for name, typecode in THREAD_COLUMNS}
+        self.messages = {name: column(typecode, self.message_count) for name, typecode in MESSAGE_COLUMNS}
+        self.references = column('I', reference_count)
+        self.offsets = column('Q', string_count + 1)
+        self.strings = self._view(view[min(position, len(view)):])
+        if self.offsets[-1] > len(self.strings):
+            raise ValueError("Snapshot string table is truncated")
+
+    def _view(self, view: memoryview) -> memoryview:
+        # Every view into the mapping must be released before it can be closed
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        """Unmap the file; threads loaded from the snapshot can no longer be read."""
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> 'ThreadSnapshot':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def string(self, string_id: int) -> str:
+        """Decode one string straight out of the mapped string table."""
+        if string_id + 1 >= len(self.offsets):
+            raise ValueError(f"Snapshot string {string_id} is out of range")
+        start, end = self.offsets[string_id], self.offsets[string_id + 1]
+        if not start <= end <= len(self.strings):
+            raise ValueError(f"Snapshot string {string_id} is out of range")
+        return str(self.strings[start:end], 'utf-8')
+
+    def addresses(self, start: int, count: int) -> List[str]:
+        """Decode a run of address references."""
+        if start + count > len(self.references):
+            raise ValueError("Snapshot address references are out of range")
+        return [self.string(self.references[i]) for i in range(start, start + count)]
+
+    @staticmethod
+    def offset(value: int) -> Optional[int]:
+        """Translate a stored tz column value back to a UTC offset (None when naive)."""
+        return None if value == _NO_OFFSET else value
+
+    def load_threads(self) -> List['SnapshotThread']:
+        """Return lazy thread views in stored order."""
+        return [SnapshotThread(self, index) for index in range(self.thread_count)]
+
+
+class SnapshotMessage(EmailMessage):
+    """EmailMessage whose fields, including the body, are decoded from a snapshot on access."""
+    __slots__ = ('_snapshot', '_index')
+
+    def __init__(self, snapshot: ThreadSnapshot, index: int):
+        self._snapshot = snapshot
+        self._index = index
+
+    def _string(self, column: str) -> str:
+        return self._snapshot.string(self._snapshot.messages[column][self._index])
+
+    id = property(lambda self: self._string('id'))
+    from_address = property(lambda self: self._string('from_address'))
+    subject = property(lambda self: self._string('subject'))
+    snippet = property(lambda self: self._string('snippet'))
+    body = property(lambda self: self._string('body'))
+    _ts = property(lambda self: self._snapshot.messages['ts'][self._index])
+    _tz = property(lambda self: self._snapshot.offset(self._snapshot.messages['tz'][self._index]))
+
+    @property
+    def to_addresses(self) -> List[str]:
+        columns = self._snapshot.messages
+        return self._snapshot.addresses(columns['to_start'][self._index], columns['to_count'][self._index])
+
+    @property
+    def cc_addresses(self) -> List[str]:
+        columns = self._snapshot.messages
+        return self._snapshot.addresses(columns['cc_start'][self._index], columns['cc_count'][self._index])
+
+    @property
+    def date(self):
+        return _from_timestamp(self._ts, self._tz)
+
+
+class SnapshotThread(IngestedThread):
+    """IngestedThread backed by a snapshot; messages are only materialized when accessed."""
+    __slots__ = ('_snapshot', '_index')
+
+    def __init__(self, snapshot: ThreadSnapshot, index: int):
+        self._snapshot = snapshot
+        self._index = index
+
+    def _string(self, column: str) -> str:
+        return self._snapshot.string(self._snapshot.threads[column][self._index])
+
+    thread_id = property(lambda self: self._string('thread_id'))
+    subject = property(lambda self: self._string('subject'))
+    latest_snippet = property(lambda self: self._string('latest_snippet'))
+    _ts = property(lambda self: self._snapshot.threads['ts'][self._index])
+    _tz = property(lambda self: self._snapshot.offset(self._snapshot.threads['tz'][self._index]))
+
+    @property
+    def participants(self) -> List[str]:
+        columns = self._snapshot.threads
+        return self._snapshot.addresses(columns['participants_start'][self._index],
+                                        columns['participants_count'][self._index])
+
+    @property
+    def received_at(self):
+        return _from_timestamp(self._ts, self._tz)
+
+    @property
+    def full_messages(self) -> List[SnapshotMessage]:
+        columns = self._snapshot.threads
+        start = columns['messages_start'][self._index]
+        end = start + columns['messages_count'][self._index]
+        if end > self._snapshot.message_count:
+            raise ValueError("Snapshot thread messages are out of range")
+        return [SnapshotMessage(self._snapshot, i) for i in range(start, end)]
+
+
+def load_snapshot(path: str, source_signature: Optional[str]) -> Optional[List[SnapshotThread]]:
+    """
+    Load threads from a snapshot if it exists, has the current version and was built
+    from the given source. Returns None otherwise so the caller can fall back to JSON.
+    """
+    try:
+        snapshot = ThreadSnapshot(path)
+    except (FileNotFoundError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+    if snapshot.version != SNAPSHOT_VERSION or snapshot.source_signature != source_signature:
+        snapshot.close()
+        return None
+    return snapshot.load_threads()
@@ -0,0 +1,117 @@
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ThreadStore:
+    """
+    In-memory index over session threads for the Observer Agent.
+
+    Threads are loaded once through `loader` and kept in a dict by thread_id. For
+    every bucket a list of (received_at, -order, thread_id) entries is kept sorted,
+    so the most recent threads of a bucket are read from the end of the list
+    without touching the rest. `order` is the position at which a thread was first
+    assigned, so threads with equal timestamps keep the order of the assignments.
+
+    If `signature` is given it is called on every lookup; when its value changes
+    (e.g. the session data file was rewritten) the threads are reloaded. invalidate()
+    forces a reload explicitly. `version` increases whenever the loaded threads
+    are replaced.
+    """
+
+    def __init__(self, loader: Callable[[], List[Dict[str, Any]]],
+                 signature: Optional[Callable[[], Any]] = None):
+        self._loader = loader
+        self._signature = signature
+        self._loaded_signature = None
+        self._threads: Optional[Dict[str, Dict[str, Any]]] = None
+        self.version = 0
+        self._assignments: Dict[str, str] = {}
+        self._order: Dict[str, int] = {}
+        self._bucket_index: Dict[str, List[Tuple[str, int, str]]] = {}
+
+    def invalidate(self) -> None:
+        """Drop the loaded threads; they are reloaded on the next lookup."""
+        self._threads = None
+
+    def _ensure_loaded(self) -> Dict[str, Dict[str, Any]]:
+        signature = self._signature() if self._signature is not None else None
+        if self._threads is None or signature != self._loaded_signature:
+            # The first thread with a given ID wins, as in a linear scan
+            self._threads = {thread['thread_id']: thread for thread in reversed(self._loader())}
+            self._loaded_signature = signature
+            self.version += 1
+            self._rebuild_bucket_index()
+        return self._threads
+
+    def _entry(self, thread_id: str) -> Optional[Tuple[str, int, str]]:
+        thread = self._threads.get(thread_id)
+        if thread is None:
+            return None
+        return (thread.get('received_at') or '', -self._order[thread_id], thread_id)
+
+    def _rebuild_bucket_index(self) -> None:
+        self._bucket_index = {}
+        for thread_id, bucket in self._assignments.items():
+            entry = self._entry(thread_id)
+            if entry is not None:
+                self._bucket_index.setdefault(bucket, []).append(entry)
+        for entries in self._bucket_index.values():
+            entries.sort()
+
+    def __len__(self) -> int:
+        return len(self._ensure_loaded())
+
+    def __contains__(self, thread_id: str) -> bool:
+        return thread_id in self._ensure_loaded()
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Return the thread with the given ID, or None."""
+        return self._ensure_loaded().get(thread_id)
+
+    def threads(self) -> List[Dict[str, Any]]:
+        """Return every thread in the store."""
+        return list(self._ensure_loaded().values())
+
+    def set_assignments(self, thread_to_bucket: Dict[str, str]) -> None:
+        """Replace all bucket assignments and rebuild the bucket index."""
+        self._assignments = {}
+        self._order = {}
+        for thread_id, bucket in thread_to_bucket.items():
+            self._order[thread_id] = len(self._order)
+            self._assignments[thread_id] = bucket
+        if self._threads is not None:
+            self._rebuild_bucket_index()
+
+    def assign(self, thread_id: str, bucket: str) -> None:
+        """Assign or reassign a single thread, updating the bucket index in O(log n)."""
+        self.remove(thread_id)
+        self._order.setdefault(thread_id, len(self._order))
+        self._assignments[thread_id] = bucket
+        if self._threads is not None:
+            entry = self._entry(thread_id)
+            if entry is not None:
+                insort(self._bucket_index.setdefault(bucket, []), entry)
+
+    def remove(self, thread_id: str) -> None:
+        """Remove a thread's bucket assignment, if any."""
+        bucket = self._assignments.pop(thread_id, None)
+        if bucket is None or self._threads is None:
+            return
+        entry = self._entry(thread_id)
+        entries = self._bucket_index.get(bucket, [])
+        if entry is not None:
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+
+    def recent_in_bucket(self, bucket: str, limit: int,
+                         exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return up to `limit` threads of `bucket`, most recent first, skipping `exclude`."""
+        threads = self._ensure_loaded()
+        result = []
+        for _, _, thread_id in reversed(self._bucket_index.get(bucket, ())):
+            if len(result) == limit:
+                break
+            if thread_id != exclude:
+                result.append(threads[thread_id])
+        return result
@@ -0,0 +1,91 @@
+import math
+import re
+from typing import List, Sequence
+
+# Letter runs, digit runs and single other non-space characters
+_PIECE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+# Start of quoted history in a reply: "On <date>, <name> wrote:" or an Outlook separator
+_QUOTE_HEADER = re.compile(r"^(On .{1,200} wrote:|-{2,} ?Original Message ?-{2,}|From: .+)\s*$",
+                           re.MULTILINE | re.IGNORECASE)
+
+TRUNCATION_MARKER = "[... truncated]"
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece.isdigit():
+        return math.ceil(len(piece) / 3)
+    if piece.isalpha():
+        return math.ceil(len(piece) / 4)
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the LLM tokens in a text without a tokenizer.
+
+    Words count one token per four letters, numbers one per three digits and
+    every other non-space character one token. This overestimates typical
+    English prose slightly, which is the safe side for budgets.
+    """
+    return sum(_piece_tokens(piece) for piece in _PIECE.findall(text))
+
+
+def token_prefix(text: str, max_tokens: int) -> str:
+    """Return the longest prefix of a text within `max_tokens` estimated tokens."""
+    used = 0
+    for match in _PIECE.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > max_tokens:
+            return text[:match.start()]
+    return text
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text to about `max_tokens` estimated tokens, marking the cut."""
+    prefix = token_prefix(text, max_tokens)
+    if len(prefix) == len(text):
+        return text
+    return prefix.rstrip() + " " + TRUNCATION_MARKER
+
+
+def condense_body(body: str, max_tokens: int) -> str:
+    """
+    Shorten an email body for a prompt: drop quoted reply history and quoted
+    lines, then truncate to `max_tokens`. Bodies within the budget are returned
+    unchanged.
+    """
+    if estimate_tokens(body) <= max_tokens:
+        return body
+    header = _QUOTE_HEADER.search(body)
+    if header and header.start() > 0:
+        body = body[:header.start()]
+    body = "\n".join(line for line in body.splitlines() if not line.lstrip().startswith(">"))
+    body = re.sub(r"\n{3,}", "\n\n", body).strip()
+    return truncate_to_tokens(body, max_tokens)
+
+
+def pack_batches(costs: Sequence[int], budget: int, max_items: int = 0) -> List[List[int]]:
+    """
+    Pack items into as few batches as possible whose total cost stays within `budget`.
+
+    First-fit decreasing over the item costs; an item costlier than the budget gets
+    a batch of its own. With `max_items`, no batch holds more items than that.
+    Returns lists of item indexes, each in ascending order; the batch holding
+    item 0 comes first.
+    """
+    batches: List[List[int]] = []
+    totals: List[int] = []
+    for index in sorted(range(len(costs)), key=lambda i: (-costs[i], i)):
+        cost = costs[index]
+        for slot, total in enumerate(totals):
+            if total + cost <= budget and (not max_items or len(batches[slot]) < max_items):
+                batches[slot].append(index)
+                totals[slot] += cost
+                break
+        else:
+            batches.append([index])
+            totals.append(cost)
+    for batch in batches:
+        batch.sort()
+    batches.sort(key=lambda batch: batch[0])
+    return batches
@@ -0,0 +1,121 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+from typing import Any, Optional
+
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+# Read once: os.umask can only be read by setting it, which is not thread-safe
+_UMASK = _current_umask()
+
+
+def _file_mode(path: str) -> int:
+    """Permission bits for a rewrite of `path`: those of the existing file, or 0666 less the umask."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+class WriteBehindJSONFile:
+    """
+    Write-behind persistence of a JSON document.
+
+    mark_dirty() only records that the document changed; a background thread
+    writes it out at most once per `flush_interval` seconds, or as soon as
+    `max_pending` updates have been coalesced. Every write goes to a temporary file
+    in the same directory that then replaces the target with os.replace, so
+    readers never see a torn file; it gets the target's permissions first. Call flush() (or close()) on shutdown.
+
+    Callers that mutate the document while it may be serialized must hold `lock`.
+    With flush_interval=0 every mark_dirty() writes through synchronously.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_pending: int = 100, indent: Optional[int] = 2):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.indent = indent
+        self.lock = threading.RLock()
+        self.writes = 0
+        self._write_lock = threading.Lock()
+        self._document: Any = None
+        self._pending = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def dirty(self) -> bool:
+        return self._pending > 0
+
+    def mark_dirty(self, document: Any) -> None:
+        """Schedule `document` to be written."""
+        with self.lock:
+            self._document = document
+            self._pending += 1
+            pending = self._pending
+        if self.flush_interval <= 0 or self._closed:
+            self.flush()
+            return
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self.lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self.dirty:
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"Error writing {self.path}: {e}")
+
+    def flush(self) -> None:
+        """Write the pending document now, if there is one."""
+        # The write lock keeps writes in order; the document lock is only held to serialize
+        with self._write_lock:
+            with self.lock:
+                if not self._pending:
+                    return
+                data = json.dumps(self._document, indent=self.indent)
+                self._pending = 0
+            directory = os.path.dirname(os.path.abspath(self.path))
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.path), suffix='.tmp')
+                with os.fdopen(fd, 'w') as file:
+                    file.write(data)
+                # mkstemp creates the file owner-only; keep the permissions of the file it replaces
+                os.chmod(temp_path, _file_mode(self.path))
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                with self.lock:
+                    self._pending += 1  # Keep the document dirty so the write is retried
+                raise
+            self.writes += 1
+
+    def close(self) -> None:
+        """Stop the background thread and write any pending document."""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -0,0 +1,42 @@
+import sys
+import os
+import unittest
+
+import httpx
+from fastapi import Depends, FastAPI
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.admin_auth import ADMIN_TOKEN_HEADER, admin_guard
+
+
+def make_app(token):
+    app = FastAPI()
+    
+    @app.delete("/admin/cache", dependencies=[Depends(admin_guard(token))])
+    async def clear_cache():
+        return {"cleared": 1}
+    return app
+
+
+class AdminGuardTest(unittest.IsolatedAsyncioTestCase):
+    async def call(self, token, client_host, headers=None):
+        transport = httpx.ASGITransport(app=make_app(token), client=(client_host, 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return (await client.delete("/admin/cache", headers=headers or {})).status_code
+
+    async def test_remote_call_without_token_is_rejected(self):
+        """Test that without a configured token only loopback clients reach admin endpoints."""
+        self.assertEqual(await self.call("", "203.0.113.5"), 403)
+        self.assertEqual(await self.call("", "127.0.0.1"), 200)
+        self.assertEqual(await self.call("", "::1"), 200)
+
+    async def test_token_is_required(self):
+        """Test that with a token, calls without it or with a wrong one are rejected, even locally."""
+        self.assertEqual(await self.call("s3cret", "127.0.0.1"), 401)
+        self.assertEqual(await self.call("s3cret", "203.0.113.5", {ADMIN_TOKEN_HEADER: "guess"}), 401)
+        self.assertEqual(await self.call("s3cret", "203.0.113.5", {ADMIN_TOKEN_HEADER: "s3cret"}), 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+import os
+import unittest
+import random
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batch_scoring import numpy_available
+from src.observerAgent import ObserverAgent, BUCKET_PATTERNS
+
+
+def random_threads(count):
+    rng = random.Random(3)
+    words = [k for keywords in BUCKET_PATTERNS.values() for k in keywords]
+    words += "the a your for meeting app update health urgent thanks issue zzz".split()
+    return [
+        {
+            "thread_id": f"t{i}",
+            "subject": " ".join(rng.choice(words) for _ in range(rng.randint(0, 4))).title(),
+            "latest_snippet": " ".join(rng.choice(words) for _ in range(rng.randint(0, 12))),
+            "received_at": f"2025-05-{1 + i % 28:02d}T10:00:00Z"
+        }
+        for i in range(count)
+    ]
+
+
+@unittest.skipUnless(numpy_available(), "numpy is not installed")
+class BatchScoringTest(unittest.TestCase):
+    def setUp(self):
+        self.observer = ObserverAgent(session_data_path=os.devnull, long_term_data_path=os.devnull)
+
+    def test_matches_per_thread_scoring(self):
+        """Test that vectorized results equal the per-thread assignment and trait analysis."""
+        threads = random_threads(500)
+        scores = self.observer.score_batch(threads)
+        self.assertEqual(scores.suggested_buckets(), self.observer._analyze_buckets(threads))
+        for buckets in (scores.suggested_buckets(), ["Travel", "Unknown", "Work", "Travel"], []):
+            expected = {t["thread_id"]: self.observer._assign_thread_to_bucket(t, buckets) for t in threads}
+            self.assertEqual(scores.assignments(buckets), expected)
+        self.assertEqual(scores.user_traits(), self.observer._analyze_user_traits(threads))
+
+    def test_empty_batch(self):
+        """Test that an empty mailbox scores to nothing."""
+        scores = self.observer.score_batch([])
+        self.assertEqual(scores.suggested_buckets(), [])
+        self.assertEqual(scores.assignments(["Work"]), {})
+        self.assertEqual(scores.user_traits(), self.observer._analyze_user_traits([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.bounded_cache import BoundedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BoundedCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_lru_eviction_by_entries(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = BoundedCache(max_entries=2, clock=self.clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # "b" is now the least recently used
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (3, 1, 1))
+
+    def test_byte_bound(self):
+        """Test that entries are evicted to stay within max_bytes and oversized values are refused."""
+        cache = BoundedCache(max_entries=100, max_bytes=10, sizeof=len, clock=self.clock)
+        cache.set("a", "xxxx")
+        cache.set("b", "yyyy")
+        cache.set("c", "zzzz")
+        self.assertEqual(cache.stats()["bytes"], 8)
+        self.assertNotIn("a", cache)
+        self.assertFalse(cache.set("big", "x" * 11))
+        self.assertNotIn("big", cache)
+
+        # Replacing an entry frees its old size
+        cache.set("b", "y")
+        self.assertEqual(cache.stats()["bytes"], 5)
+
+    def test_ttl(self):
+        """Test that entries expire after their TTL and per-entry TTLs override the default."""
+        cache = BoundedCache(ttl=10, clock=self.clock)
+        cache.set("short", 1)
+        cache.set("long", 2, ttl=100)
+        self.clock.now = 10
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("long"), 2)
+        self.clock.now = 100
+        self.assertEqual(cache.purge_expired(), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["bytes"], stats["expirations"]), (0, 0, 2))
+
+    def test_entries_and_clear(self):
+        """Test inspecting entries, most recent first, and clearing the cache."""
+        cache = BoundedCache(ttl=60, sizeof=lambda value: 1, clock=self.clock)
+        cache.set("a", 1)
+        self.clock.now = 5
+        cache.set("b", 2)
+        entries = cache.entries()
+        self.assertEqual([entry["key"] for entry in entries], ["b", "a"])
+        self.assertEqual((entries[1]["age"], entries[1]["expires_in"]), (5, 55))
+        self.assertEqual(len(cache.entries(limit=1)), 1)
+        self.assertEqual(cache.clear(), 2)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,391 @@
+import sys
+import os
+import unittest
+import asyncio
+import datetime
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import langchain_anthropic  # noqa: F401
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    LANGCHAIN_AVAILABLE = False
+
+if LANGCHAIN_AVAILABLE:
+    # The adapter builds its default model at import; the tests never call it
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'test-key')
+    from src.cognitive_email_adapter import (
+        ANALYSIS_FIELDS, ANALYSIS_OUTPUT_TOKENS, CognitiveEmailAdapter, Email, STREAM_FIELD_ORDER
+    )
+
+from src.mock_llm_server import mock_answer
+from src.llm_cache import LLMResponseCache
+
+LATENCY = 0.2
+
+
+class FakeResponse:
+    def __init__(self, content, response_metadata=None):
+        self.content = content
+        self.response_metadata = response_metadata or {}
+
+
+def fake_content(subject):
+    return "```json\n" + json.dumps({
+        "primary_intent": f"Reply to {subject}",
+        "priority": "high",
+        "social_context": "Colleague",
+        "suggested_actions": ["Reply"],
+        "related_emails": [],
+        "sentiment": "neutral",
+        "urgency": "normal",
+        "follow_up_needed": False,
+        "suggested_response": "Thanks",
+        "bucket": "Work",
+        "user_traits": {},
+        "thread_summary": None,
+        "participants_analysis": None
+    }) + "\n```"
+
+
+class FakeAsyncLLM:
+    """Slow model with an async interface; records how many calls overlap."""
+    def __init__(self, latency=LATENCY):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, messages):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return FakeResponse(fake_content("fake"))
+
+
+class FakeSyncLLM:
+    """Slow model that only offers a blocking invoke."""
+    def __init__(self, latency=LATENCY):
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return FakeResponse(fake_content("fake"))
+
+
+class RecordingLLM:
+    """Instant model that answers like the mock LLM server and records its prompts."""
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        text = messages[0].content
+        self.prompts.append(text)
+        return FakeResponse("```json\n" + json.dumps(mock_answer(text)) + "\n```")
+
+
+class StreamingLLM(RecordingLLM):
+    """Model that streams its answer in small chunks, recording when each chunk was sent."""
+    def __init__(self, chunk_chars=8, fail=False):
+        super().__init__()
+        self.chunk_chars = chunk_chars
+        self.fail = fail
+        self.chunks_sent = 0
+
+    async def astream(self, messages):
+        text = (await self.ainvoke(messages)).content
+        for offset in range(0, len(text), self.chunk_chars):
+            if self.fail and offset > len(text) // 2:
+                raise ConnectionError("stream interrupted")
+            self.chunks_sent += 1
+            yield FakeResponse(text[offset:offset + self.chunk_chars])
+            await asyncio.sleep(0)
+
+
+def make_email(i):
+    return Email(
+        sender=f"sender{i}@example.com",
+        recipients=["user@example.com"],
+        subject=f"Question {i}",
+        body=f"Could you review item {i}?",
+        timestamp=datetime.datetime(2025, 5, 1, 10, 0),
+        thread_id=f"thread{i}"
+    )
+
+
+@unittest.skipUnless(LANGCHAIN_AVAILABLE, "langchain is not installed")
+class CognitiveEmailAdapterConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+    async def process_concurrently(self, adapter, count):
+        start = time.perf_counter()
+        results = await asyncio.gather(*(adapter.process_email(make_email(i)) for i in range(count)))
+        return results, time.perf_counter() - start
+
+    async def test_concurrent_requests_take_one_latency(self):
+        """Test that N concurrent requests finish in about one LLM latency, not N."""
+        llm = FakeAsyncLLM()
+        adapter = CognitiveEmailAdapter(llm=llm, max_concurrency=8)
+        results, elapsed = await self.process_concurrently(adapter, 8)
+        self.assertLess(elapsed, 2 * LATENCY)
+        self.assertEqual(llm.max_in_flight, 8)
+        self.assertEqual(results[0]["primary_intent"], "Reply to fake")
+        self.assertEqual(results[0]["social_context"], ["Colleague"])
+
+    async def test_concurrency_limit(self):
+        """Test that no more than max_concurrency calls are in flight."""
+        llm = FakeAsyncLLM()
+        adapter = CognitiveEmailAdapter(llm=llm, max_concurrency=2)
+        _, elapsed = await self.process_concurrently(adapter, 6)
+        self.assertEqual(llm.max_in_flight, 2)
+        self.assertGreaterEqual(elapsed, 3 * LATENCY * 0.9)
+
+    async def test_blocking_llm_is_offloaded(self):
+        """Test that a model without ainvoke runs off the event loop."""
+        adapter = CognitiveEmailAdapter(llm=FakeSyncLLM(), max_concurrency=4)
+        _, elapsed = await self.process_concurrently(adapter, 4)
+        self.assertLess(elapsed, 2 * LATENCY)
+
+
+@unittest.skipUnless(LANGCHAIN_AVAILABLE, "langchain is not installed")
+class CognitiveEmailAdapterBatchTest(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_results_fan_out(self):
+        """Test that every email of a batch is served from its result without another LLM call."""
+        llm = RecordingLLM()
+        adapter = CognitiveEmailAdapter(llm=llm)
+        current, recent = make_email(0), [make_email(1), make_email(2)]
+        result = await adapter.process_email(current, recent)
+        self.assertEqual(len(llm.prompts), 1)
+        self.assertEqual(llm.prompts[0].count("Email ID: "), 3)
+        self.assertEqual(result["primary_intent"], "Respond to Question 0")
+        
+        for email in [current] + recent:
+            self.assertEqual((await adapter.process_email(email))["primary_intent"], f"Respond to {email.subject}")
+        self.assertEqual((await adapter.process_email(make_email(2), [make_email(0)]))["thread_summary"], "Question 2")
+        self.assertEqual(len(llm.prompts), 1)
+        
+        # Only emails without an analysis are sent again
+        await adapter.process_email(make_email(3), recent + [make_email(4)])
+        self.assertEqual(len(llm.prompts), 2)
+        self.assertEqual(llm.prompts[1].count("Email ID: "), 2)
+        self.assertIn("Question 4", llm.prompts[1])
+        self.assertNotIn("Question 1", llm.prompts[1])
+
+    async def test_resent_emails_are_duplicates(self):
+        """Test that the processed-email index recognizes copies of analyzed emails."""
+        adapter = CognitiveEmailAdapter(llm=RecordingLLM())
+        await adapter.process_email(make_email(0), [make_email(1)])
+        self.assertEqual(adapter.processed_emails.stats()["added"], 2)
+        await adapter.process_email(make_email(1))
+        await adapter.process_email(make_email(0))
+        stats = adapter.processed_emails.stats()
+        self.assertEqual((stats["entries"], stats["duplicates"]), (2, 2))
+        self.assertEqual(adapter.processed_emails.seen_count(make_email(0)), 2)
+
+    async def test_resent_copy_without_timestamp_is_recognized(self):
+        """Test that a re-sent email whose timestamp defaulted to now is already processed."""
+        llm = RecordingLLM()
+        adapter = CognitiveEmailAdapter(llm=llm)
+        await adapter.process_email(make_email(0), [make_email(1)])
+        
+        # The API defaults a missing timestamp to the current time
+        copy = make_email(1)
+        copy.timestamp = datetime.datetime.now()
+        self.assertIn(copy, adapter.processed_emails)
+        
+        # Processed recent emails are skipped by the index alone, without a cache lookup
+        lookups = []
+        lookup = adapter._lookup_analysis
+        adapter._lookup_analysis = lambda email: lookups.append(email.subject) or lookup(email)
+        await adapter.process_email(make_email(2), [copy, make_email(3)])
+        self.assertEqual(len(llm.prompts), 2)
+        self.assertNotIn("Question 1", llm.prompts[1])
+        self.assertEqual(lookups, ["Question 2", "Question 3"])
+        self.assertEqual(adapter.processed_emails.stats()["entries"], 4)
+
+    async def test_email_missing_from_batch_is_analyzed_alone(self):
+        """Test that the current email falls back to a single prompt if the batch result lacks it."""
+        llm = RecordingLLM()
+        adapter = CognitiveEmailAdapter(llm=llm)
+        current = make_email(0)
+        current_id = current.email_id
+        original = llm.ainvoke
+        
+        async def drop_current(messages):
+            response = await original(messages)
+            answer = json.loads(response.content.strip("`").lstrip("json"))
+            answer.pop(current_id, None)
+            return FakeResponse("```json\n" + json.dumps(answer) + "\n```")
+        llm.ainvoke = drop_current
+        
+        result = await adapter.process_email(current, [make_email(1)])
+        self.assertEqual(len(llm.prompts), 2)
+        self.assertEqual(result["primary_intent"], "Respond to the email")
+        self.assertIn(make_email(1).email_id, adapter.results)
+
+    async def test_truncated_batch_answers_are_not_cached(self):
+        """Test that incomplete batch entries and answers cut off at max_tokens are never cached."""
+        llm = RecordingLLM()
+        original = llm.ainvoke
+        
+        async def cut_off(messages):
+            response = await original(messages)
+            if messages[0].content.count("Email ID: ") < 2:
+                return response
+            # Cut in the middle of the third analysis, as an answer stopped at the output cap is
+            return FakeResponse(response.content[:len(response.content) * 5 // 12])
+        llm.ainvoke = cut_off
+        adapter = CognitiveEmailAdapter(llm=llm)
+        recent = [make_email(i) for i in range(1, 6)]
+        result = await adapter.process_email(make_email(0), recent)
+        self.assertLessEqual(set(ANALYSIS_FIELDS), set(result))
+        self.assertIn(make_email(1).email_id, adapter.results)
+        for email in recent[1:]:
+            self.assertNotIn(email.email_id, adapter.results)
+        
+        # With stop_reason max_tokens, the batch fails as a whole and the current email is analyzed alone
+        llm = RecordingLLM()
+        original = llm.ainvoke
+        
+        async def stopped(messages):
+            response = await original(messages)
+            if messages[0].content.count("Email ID: ") < 2:
+                return response
+            return FakeResponse(response.content, {"stop_reason": "max_tokens"})
+        llm.ainvoke = stopped
+        adapter = CognitiveEmailAdapter(llm=llm)
+        await adapter.process_email(make_email(0), recent)
+        self.assertEqual(len(llm.prompts), 2)
+        self.assertEqual(len(adapter.results), 1)
+        self.assertIn(make_email(0).email_id, adapter.results)
+
+    async def test_batches_packed_within_token_budget(self):
+        """Test that emails past the budget or email limit are split into concurrent prompts."""
+        llm = RecordingLLM()
+        adapter = CognitiveEmailAdapter(llm=llm, batch_max_emails=2)
+        recent = [make_email(i) for i in range(1, 5)]
+        result = await adapter.process_email(make_email(0), recent)
+        self.assertEqual([text.count("Email ID: ") for text in llm.prompts], [2, 2, 1])
+        self.assertIn("Question 0", llm.prompts[0])
+        self.assertEqual(result["thread_summary"], "Question 0")
+        for email in recent:
+            self.assertIn(email.email_id, adapter.results)
+        
+        # The model's output cap limits the analyses asked for per prompt
+        llm = RecordingLLM()
+        llm.max_tokens = 2 * ANALYSIS_OUTPUT_TOKENS + 100
+        adapter = CognitiveEmailAdapter(llm=llm)
+        await adapter.process_email(make_email(0), recent)
+        self.assertEqual([text.count("Email ID: ") for text in llm.prompts], [2, 2, 1])
+        
+        # A long body is condensed, and the budget leaves it a prompt of its own
+        llm = RecordingLLM()
+        adapter = CognitiveEmailAdapter(llm=llm, batch_token_budget=2400, max_body_tokens=500)
+        long_email = make_email(5)
+        long_email.body = "Please read the attached report carefully. " * 400
+        await adapter.process_email(make_email(6), [long_email, make_email(7)])
+        self.assertEqual(len(llm.prompts), 2)
+        self.assertIn("[... truncated]", llm.prompts[1])
+        self.assertLess(len(llm.prompts[1]), len(long_email.body))
+
+
+@unittest.skipUnless(LANGCHAIN_AVAILABLE, "langchain is not installed")
+class CognitiveEmailAdapterStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def test_fields_stream_before_answer_completes(self):
+        """Test that primary_intent, priority and urgency are yielded first, before the answer is complete."""
+        llm = StreamingLLM()
+        adapter = CognitiveEmailAdapter(llm=llm)
+        fields = []
+        async for field, value in adapter.stream_email_analysis(make_email(0)):
+            fields.append((field, value, llm.chunks_sent))
+        total_chunks = llm.chunks_sent
+        
+        self.assertEqual([field for field, _, _ in fields], list(STREAM_FIELD_ORDER))
+        self.assertEqual(fields[0][1], "Respond to the email")
+        self.assertLess(fields[2][2], total_chunks / 2)
+        self.assertEqual(adapter.results.get(make_email(0).email_id),
+                         {field: value for field, value, _ in fields})
+        
+        # The cached analysis is replayed without another call
+        replay = [field async for field, _ in adapter.stream_email_analysis(make_email(0))]
+        self.assertEqual(replay, list(STREAM_FIELD_ORDER))
+        self.assertEqual(len(llm.prompts), 1)
+
+    async def test_interrupted_stream_completes_with_defaults(self):
+        """Test that a failed stream still yields every field once, without caching."""
+        adapter = CognitiveEmailAdapter(llm=StreamingLLM(fail=True))
+        fields = dict([pair async for pair in adapter.stream_email_analysis(make_email(0))])
+        self.assertEqual(sorted(fields), sorted(STREAM_FIELD_ORDER))
+        self.assertEqual(fields["primary_intent"], "Respond to the email")
+        self.assertEqual(fields["bucket"], "Uncategorized")
+        self.assertNotIn(make_email(0).email_id, adapter.results)
+
+
+@unittest.skipUnless(LANGCHAIN_AVAILABLE, "langchain is not installed")
+class CognitiveEmailAdapterResponseCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'responses.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    async def test_warm_restart_reuses_analyses(self):
+        """Test that a restarted adapter serves analyses from disk without LLM calls."""
+        first_cache = LLMResponseCache(self.path)
+        first = CognitiveEmailAdapter(llm=RecordingLLM(), response_cache=first_cache)
+        analysis = await first.process_email(make_email(0), [make_email(1)])
+        first_cache.close()
+        
+        llm = RecordingLLM()
+        cache = LLMResponseCache(self.path)
+        restarted = CognitiveEmailAdapter(llm=llm, response_cache=cache)
+        self.assertEqual(await restarted.process_email(make_email(0), [make_email(1)]), analysis)
+        self.assertEqual((await restarted.process_email(make_email(1)))["thread_summary"], "Question 1")
+        self.assertEqual(llm.prompts, [])
+        self.assertEqual(cache.stats()["hits"], 2)
+        cache.close()
+
+    async def test_normalized_content_and_model_in_key(self):
+        """Test that whitespace and address case do not matter, but the model does."""
+        cache = LLMResponseCache(self.path)
+        llm = RecordingLLM()
+        adapter = CognitiveEmailAdapter(llm=llm, response_cache=cache)
+        await adapter.process_email(make_email(0))
+        
+        variant = make_email(0)
+        variant.sender = variant.sender.upper()
+        variant.body = "  Could you   review item 0?\n"
+        self.assertEqual(variant.email_id, make_email(0).email_id)
+        await CognitiveEmailAdapter(llm=llm, response_cache=cache).process_email(variant)
+        self.assertEqual(len(llm.prompts), 1)
+        
+        other_model = CognitiveEmailAdapter(llm=llm, response_cache=cache)
+        other_model.model_name = "another-model"
+        await other_model.process_email(make_email(0))
+        self.assertEqual(len(llm.prompts), 2)
+        cache.close()
+
+    async def test_disk_cache_runs_off_the_event_loop(self):
+        """Test that the SQLite reads and writes happen in worker threads, not the loop's thread."""
+        cache = LLMResponseCache(self.path)
+        threads = []
+        get, set_ = cache.get, cache.set
+        cache.get = lambda *args: threads.append(threading.get_ident()) or get(*args)
+        cache.set = lambda *args: threads.append(threading.get_ident()) or set_(*args)
+        adapter = CognitiveEmailAdapter(llm=RecordingLLM(), response_cache=cache)
+        await adapter.process_email(make_email(0), [make_email(1)])
+        await CognitiveEmailAdapter(llm=RecordingLLM(), response_cache=cache).process_email(make_email(1))
+        self.assertEqual(len(threads), 5)
+        self.assertNotIn(threading.get_ident(), threads)
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import sys
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.date_parsing import parse_date, parse_datetime
+
+
+class DateParsingTest(unittest.TestCase):
+    def test_iso_and_rfc2822_formats(self):
+        """Test the ISO-8601 fast path and RFC 2822 email Date: headers."""
+        expected = datetime(2025, 4, 30, 18, 30, tzinfo=timezone.utc)
+        self.assertEqual(parse_datetime("2025-04-30T18:30:00Z"), expected)
+        self.assertEqual(parse_datetime("2025-04-30T18:30:00+00:00"), expected)
+        self.assertEqual(parse_datetime("Wed, 30 Apr 2025 18:30:00 +0000"), expected)
+        self.assertEqual(parse_datetime("Wed, 30 Apr 2025 11:30:00 -0700 (PDT)"), expected)
+        self.assertEqual(parse_datetime("30 Apr 2025 18:30:00 GMT"), expected)
+        self.assertEqual(parse_datetime("Wed, 30 Apr 2025 11:30:00 -0700").utcoffset(), timedelta(hours=-7))
+    
+    def test_results_are_memoized(self):
+        """Test that repeated strings are served from the memo."""
+        first = parse_datetime("2025-05-01T09:00:00Z")
+        hits = parse_datetime.cache_info().hits
+        self.assertIs(parse_datetime("2025-05-01T09:00:00Z"), first)
+        self.assertEqual(parse_datetime.cache_info().hits, hits + 1)
+    
+    def test_lenient_parse_date(self):
+        """Test that parse_date passes datetimes through and falls back on bad input."""
+        default = datetime(2000, 1, 1)
+        now = datetime(2025, 1, 1, 12, 0)
+        self.assertIs(parse_date(now), now)
+        self.assertIs(parse_date(None, default=default), default)
+        self.assertIs(parse_date("not a date at all", default=default), default)
+        with self.assertRaises(ValueError):
+            parse_datetime("not a date at all")
+
+if __name__ == '__main__':
+    unittest.main()
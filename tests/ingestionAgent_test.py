@@ -1,12 +1,16 @@
 import sys
 import os
 import unittest
-from datetime import datetime
+import io
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
 
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.ingestionAgent import IngestionAgent, IngestedThread, EmailMessage
+from src.ingestionAgent import IngestionAgent, IngestedThread, EmailMessage, _iter_json_array
 
 class IngestionAgentTest(unittest.TestCase):
     def setUp(self):
@@ -100,5 +104,124 @@ class IngestionAgentTest(unittest.TestCase):
             # Verify that the thread's latest_snippet matches
             self.assertEqual(multi_message_thread.latest_snippet, most_recent_message.snippet)
 
+    def test_iter_threads_matches_ingest(self):
+        """Test that streaming ingestion yields the same threads as ingest()."""
+        expected = {t.thread_id for t in self.agent.ingest()}
+        streamed = [t.thread_id for t in self.agent.iter_threads()]
+        self.assertEqual(len(streamed), len(expected))
+        self.assertEqual(set(streamed), expected)
+    
+    def test_iter_threads_top_k(self):
+        """Test that the bounded top-K mode returns the most recent threads in order."""
+        expected = [t.thread_id for t in self.agent.ingest()]
+        for k in (1, 3, len(expected) + 5):
+            top = [t.thread_id for t in self.agent.iter_threads(top_k=k)]
+            self.assertEqual(top, expected[:k])
+    
+    def test_streaming_parser_handles_chunk_boundaries(self):
+        """Test that array elements split across read chunks are decoded correctly."""
+        document = {"meta": {"count": 12345, "tags": ["a", "b"]},
+                    "threads": [{"threadId": f"t{i}", "value": i * 1.5, "text": "x" * i} for i in range(20)],
+                    "trailer": 7}
+        text = json.dumps(document, indent=2)
+        for chunk_size in (1, 3, 17):
+            items = list(_iter_json_array(io.StringIO(text), 'threads', chunk_size=chunk_size))
+            self.assertEqual(items, document["threads"])
+
+    def test_parallel_normalization_matches_serial(self):
+        """Test that workers=N produces exactly the serial ordering, ties included."""
+        raw_threads = self.agent.load_synthetic_emails()
+        # Duplicate threads under new IDs so that equal received_at values must tie-break
+        raw_threads = raw_threads + [dict(t, threadId=t['threadId'] + '-copy') for t in raw_threads]
+        serial = [t.thread_id for t in self.agent.normalize_threads(raw_threads)]
+        parallel_threads = self.agent.normalize_threads(raw_threads, workers=2)
+        self.assertEqual([t.thread_id for t in parallel_threads], serial)
+        
+        # Addresses unpickled from different workers are interned again in this process
+        original, copy = parallel_threads[0], next(t for t in parallel_threads
+                                                   if t.thread_id == parallel_threads[0].thread_id + '-copy')
+        self.assertIs(original.full_messages[0].from_address, copy.full_messages[0].from_address)
+        self.assertIs(original.participants[0], copy.participants[0])
+
+    def test_compact_model_round_trips_dates_and_interns_addresses(self):
+        """Test that lazily rebuilt dates equal the originals and addresses are shared."""
+        aware = datetime(2025, 4, 30, 18, 30, 0, 123456, tzinfo=timezone(timedelta(hours=-7)))
+        naive = datetime(2025, 4, 30, 18, 30)
+        first = EmailMessage('m1', ''.join('a@x.com'), ['b@x.com'], aware, 's', 'snip', 'body')
+        second = EmailMessage('m2', ''.join('a@x.com'), [], naive, 's', 'snip', 'body')
+        
+        self.assertEqual(first.date, aware)
+        self.assertEqual(first.date.utcoffset(), aware.utcoffset())
+        self.assertEqual(second.date, naive)
+        self.assertIsNone(second.date.tzinfo)
+        self.assertIs(first.from_address, second.from_address)
+        self.assertFalse(hasattr(first, '__dict__'))
+
+
+class IncrementalIngestionTest(unittest.TestCase):
+    def setUp(self):
+        """Copy the synthetic data into a temporary directory next to a fresh index."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.temp_dir, 'emails.json')
+        shutil.copy('data/syntheticEmails.json', self.data_path)
+        self.index_path = os.path.join(self.temp_dir, 'index.sqlite')
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def _summaries(self, threads):
+        return [(t.thread_id, t.received_at, t.subject, sorted(t.participants), len(t.full_messages))
+                for t in threads]
+    
+    def test_indexed_ingest_matches_plain_ingest(self):
+        """Test that cold and warm indexed ingests return the same view as a plain ingest."""
+        expected = self._summaries(IngestionAgent(self.data_path).ingest())
+        agent = IngestionAgent(self.data_path, index_path=self.index_path)
+        self.assertEqual(self._summaries(agent.ingest()), expected)
+        self.assertEqual(self._summaries(agent.ingest()), expected)
+        # A new agent reuses the index written by the first one
+        self.assertEqual(self._summaries(IngestionAgent(self.data_path, index_path=self.index_path).ingest()), expected)
+    
+    def test_only_changed_threads_are_normalized(self):
+        """Test that a re-ingest normalizes new and changed threads only, and drops removed ones."""
+        agent = IngestionAgent(self.data_path, index_path=self.index_path)
+        agent.ingest()
+        
+        with open(self.data_path) as f:
+            data = json.load(f)
+        removed = data['threads'].pop()
+        data['threads'][0]['messages'][0]['subject'] = 'Changed subject'
+        with open(self.data_path, 'w') as f:
+            json.dump(data, f)
+        
+        normalized_ids = []
+        original = agent.normalize_thread
+        agent.normalize_thread = lambda raw: normalized_ids.append(raw['threadId']) or original(raw)
+        threads = agent.ingest()
+        
+        self.assertEqual(normalized_ids, [data['threads'][0]['threadId']])
+        self.assertNotIn(removed['threadId'], {t.thread_id for t in threads})
+        self.assertEqual(self._summaries(threads), self._summaries(IngestionAgent(self.data_path).ingest()))
+
+    def test_snapshot_round_trip_and_staleness(self):
+        """Test that a snapshot reproduces the ingested threads and is ignored once stale."""
+        snapshot_path = os.path.join(self.temp_dir, 'threads.snapshot')
+        expected = IngestionAgent(self.data_path).ingest()
+        
+        agent = IngestionAgent(self.data_path, snapshot_path=snapshot_path)
+        self.assertIsNone(agent.load_snapshot())
+        agent.ingest()  # Falls back to JSON and writes the snapshot
+        loaded = agent.load_snapshot()
+        self.assertIsNotNone(loaded)
+        self.assertEqual(self._summaries(loaded), self._summaries(expected))
+        self.assertEqual([t.to_dict() for t in loaded], [t.to_dict() for t in expected])
+        self.assertEqual(loaded[0].full_messages[-1].body, expected[0].full_messages[-1].body)
+        
+        # Touching the source makes the snapshot stale
+        with open(self.data_path, 'a') as f:
+            f.write('\n')
+        self.assertIsNone(agent.load_snapshot())
+        self.assertEqual(self._summaries(agent.ingest()), self._summaries(expected))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,51 @@
+import sys
+import os
+import unittest
+import io
+import json
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.json_stream import JSONFieldStream, JSONStreamReader
+
+
+class JSONFieldStreamTest(unittest.TestCase):
+    def test_fields_complete_incrementally(self):
+        """Test that each field is reported once it is complete, from a markdown code block."""
+        answer = {"primary_intent": "Reply", "priority": "high", "actions": ["a", "b"],
+                  "nested": {"x": [1, {"y": "}"}]}, "done": False}
+        text = "```json\n" + json.dumps(answer, indent=2) + "\n```"
+        stream = JSONFieldStream()
+        fields = []
+        for end, char in enumerate(text, 1):
+            fields.extend((key, value, end) for key, value in stream.feed(char))
+        self.assertEqual([(key, value) for key, value, _ in fields], list(answer.items()))
+        # The first field is known long before the answer is complete
+        self.assertLess(fields[0][2], len(text) / 4)
+        self.assertTrue(stream.done)
+
+    def test_values_cut_mid_token_wait(self):
+        """Test that numbers and literals are only reported once something follows them."""
+        stream = JSONFieldStream()
+        self.assertEqual(stream.feed('Here you go: {"count": 12'), [])
+        self.assertEqual(stream.feed('3, "flag": tr'), [("count", 123)])
+        self.assertEqual(stream.feed('ue}'), [("flag", True)])
+        self.assertEqual(stream.feed(', "late": 1}'), [])
+
+
+class JSONStreamReaderTest(unittest.TestCase):
+    def test_reads_values_across_file_chunks(self):
+        """Test that values split across small file chunks decode, including a number at the end."""
+        reader = JSONStreamReader(io.StringIO('[ "a b", {"c": [1, 2]} ,\n 12345'), chunk_size=3)
+        reader.expect("[")
+        self.assertEqual(reader.value(), "a b")
+        reader.expect(",")
+        self.assertEqual(reader.value(), {"c": [1, 2]})
+        reader.expect(",")
+        self.assertEqual(reader.value(), 12345)
+        self.assertEqual(reader.peek(), "")
+        self.assertTrue(reader.eof)
+
+if __name__ == '__main__':
+    unittest.main()
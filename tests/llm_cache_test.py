@@ -0,0 +1,138 @@
+import sys
+import os
+import unittest
+import tempfile
+import shutil
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm_cache import LLMResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LLMResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'cache', 'responses.db')
+        self.clock = FakeClock()
+        self.caches = []
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def open(self, **kwargs):
+        cache = LLMResponseCache(self.path, clock=self.clock, **kwargs)
+        self.caches.append(cache)
+        return cache
+
+    def test_get_set_and_key_parts(self):
+        """Test that entries are keyed by model, prompt version and content hash."""
+        cache = self.open()
+        cache.set("model-a", "v1", "email1", {"priority": "high"})
+        self.assertEqual(cache.get("model-a", "v1", "email1"), {"priority": "high"})
+        self.assertIsNone(cache.get("model-b", "v1", "email1"))
+        self.assertIsNone(cache.get("model-a", "v2", "email1"))
+        self.assertIsNone(cache.get("model-a", "v1", "email2"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 3, 1))
+        self.assertEqual(stats["hit_rate"], 0.25)
+
+    def test_survives_reopen(self):
+        """Test that a new cache on the same file serves earlier entries."""
+        cache = self.open()
+        cache.set("model", "v1", "email1", {"bucket": "Work"})
+        cache.close()
+        reopened = self.open()
+        self.assertEqual(reopened.get("model", "v1", "email1"), {"bucket": "Work"})
+        self.assertEqual(reopened.stats()["entries"], 1)
+        self.assertEqual(reopened.stats()["bytes"], len('{"bucket": "Work"}'))
+
+    def test_ttl(self):
+        """Test that entries expire after their TTL."""
+        cache = self.open(ttl=60)
+        cache.set("model", "v1", "email1", {"a": 1})
+        cache.set("model", "v1", "email2", {"a": 2}, ttl=600)
+        self.clock.now += 60
+        self.assertIsNone(cache.get("model", "v1", "email1"))
+        self.assertEqual(cache.get("model", "v1", "email2"), {"a": 2})
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["expirations"]), (1, 1))
+
+    def test_evicts_least_recently_read(self):
+        """Test eviction by entry count and by bytes, least recently read first."""
+        cache = self.open(max_entries=2)
+        cache.set("model", "v1", "email1", {"a": 1})
+        self.clock.now += 1
+        cache.set("model", "v1", "email2", {"a": 2})
+        self.clock.now += 1
+        cache.get("model", "v1", "email1")
+        self.clock.now += 1
+        cache.set("model", "v1", "email3", {"a": 3})
+        self.assertIsNone(cache.get("model", "v1", "email2"))
+        self.assertIsNotNone(cache.get("model", "v1", "email1"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        entry_size = len('{"a": 1}')
+        small = LLMResponseCache(os.path.join(self.temp_dir, 'small.db'), max_bytes=2 * entry_size,
+                                 clock=self.clock)
+        self.caches.append(small)
+        for i in range(3):
+            self.clock.now += 1
+            small.set("model", "v1", f"email{i}", {"a": i})
+        stats = small.stats()
+        self.assertEqual((stats["entries"], stats["bytes"], stats["evictions"]), (2, 2 * entry_size, 1))
+        self.assertIsNone(small.get("model", "v1", "email0"))
+
+    def test_replace_and_clear(self):
+        """Test that replacing an entry keeps the totals right and clear empties the cache."""
+        cache = self.open()
+        cache.set("model", "v1", "email1", {"a": 1})
+        cache.set("model", "v1", "email1", {"a": 100})
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["bytes"], len('{"a": 100}'))
+        self.assertEqual(cache.clear(), 1)
+        self.assertEqual((cache.stats()["entries"], cache.stats()["bytes"]), (0, 0))
+
+    def test_reads_are_written_in_batches(self):
+        """Test that hits only write their read time with the next set, a full batch or close."""
+        cache = self.open(touch_batch_size=2)
+        cache.set("model", "v1", "email1", {"a": 1})
+        cache.set("model", "v1", "email2", {"a": 2})
+
+        def accessed(email):
+            key = LLMResponseCache.make_key("model", "v1", email)
+            with cache._connection() as connection:
+                return connection.execute("SELECT accessed_at FROM responses WHERE key = ?", (key,)).fetchone()[0]
+
+        self.clock.now += 1
+        cache.get("model", "v1", "email1")
+        self.assertEqual(accessed("email1"), 1000.0)
+        cache.set("model", "v1", "email3", {"a": 3})
+        self.assertEqual(accessed("email1"), 1001.0)
+
+        self.clock.now += 1
+        cache.get("model", "v1", "email1")
+        cache.get("model", "v1", "email2")
+        self.assertEqual((accessed("email1"), accessed("email2")), (1002.0, 1002.0))
+
+        self.clock.now += 1
+        cache.get("model", "v1", "email3")
+        cache.close()
+        reopened = self.open()
+        with reopened._connection() as connection:
+            row = connection.execute("SELECT accessed_at FROM responses WHERE key = ?",
+                                     (LLMResponseCache.make_key("model", "v1", "email3"),)).fetchone()
+        self.assertEqual(row[0], 1003.0)
+
+if __name__ == '__main__':
+    unittest.main()
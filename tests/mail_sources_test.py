@@ -0,0 +1,140 @@
+import sys
+import os
+import unittest
+import shutil
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestionAgent import IngestionAgent, IngestedThread
+from src.mail_sources import EmlSource, MailSource, MaildirSource, MboxSource, MimeEmailMessage
+
+MESSAGES = [
+    (
+        "From: Team Alpha <team1@company.com>\n"
+        "To: user_email@example.com\n"
+        "Subject: Project Alpha budget approval needed\n"
+        "Date: Wed, 30 Apr 2025 18:30:00 +0000\n"
+        "Message-ID: <msg1@company.com>\n"
+        "\n"
+        "We need your approval on the revised budget.\n"
+        "From the design team, with thanks.\n"
+    ),
+    (
+        "From: user_email@example.com\n"
+        "To: team1@company.com\n"
+        "Cc: manager@company.com\n"
+        "Subject: Re: Project Alpha budget approval needed\n"
+        "Date: Wed, 30 Apr 2025 19:15:00 +0000\n"
+        "Message-ID: <msg2@example.com>\n"
+        "In-Reply-To: <msg1@company.com>\n"
+        "References: <msg1@company.com>\n"
+        "\n"
+        "Can you provide a breakdown?\n"
+    ),
+    (
+        "From: newsletter@tech.com\n"
+        "To: user_email@example.com\n"
+        "Subject: Tech Weekly Newsletter\n"
+        "Date: Thu, 01 May 2025 09:00:00 +0000\n"
+        "Message-ID: <news1@tech.com>\n"
+        "Content-Type: text/plain; charset=utf-8\n"
+        "Content-Transfer-Encoding: quoted-printable\n"
+        "\n"
+        "This week=E2=80=99s top stories.\n"
+    ),
+]
+
+
+class MailSourcesTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def _write_mbox(self):
+        path = os.path.join(self.temp_dir, 'inbox.mbox')
+        with open(path, 'w') as f:
+            for message in MESSAGES:
+                f.write("From sender@example.com Wed Apr 30 18:30:00 2025\n")
+                # Body lines starting with "From " are quoted, as mbox writers do
+                f.write(message.replace("\nFrom the", "\n>From the"))
+                f.write("\n")
+        return path
+    
+    def _assert_expected_threads(self, threads):
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(isinstance(t, IngestedThread) for t in threads))
+        newsletter, budget = threads  # Most recent first
+        self.assertEqual(newsletter.subject, "Tech Weekly Newsletter")
+        self.assertEqual(newsletter.latest_snippet, "This week’s top stories.")
+        self.assertEqual(budget.thread_id, "msg1@company.com")
+        self.assertEqual(budget.subject, "Project Alpha budget approval needed")
+        self.assertEqual(len(budget.full_messages), 2)
+        self.assertEqual(sorted(budget.participants),
+                         ["manager@company.com", "team1@company.com", "user_email@example.com"])
+        self.assertEqual(budget.latest_snippet, "Can you provide a breakdown?")
+    
+    def test_mbox_source(self):
+        """Test that an mbox is split at From lines and threaded by reply headers."""
+        source = MboxSource(self._write_mbox())
+        self._assert_expected_threads(IngestionAgent(source=source).ingest())
+    
+    def test_mbox_source_closes_mapping(self):
+        """Test that closing an mbox source unmaps it; bodies read before stay available."""
+        with MboxSource(self._write_mbox()) as source:
+            first, second, _ = source.iter_messages()
+            body = first.body
+        self.assertEqual(source._mappings, [])
+        self.assertEqual(first.body, body)
+        self.assertEqual(second.subject, "Re: Project Alpha budget approval needed")
+        with self.assertRaises(ValueError):
+            second.body
+    
+    def test_mbox_parallel_matches_serial(self):
+        """Test that parallel header parsing yields the same messages as the serial path."""
+        path = self._write_mbox()
+        serial = [(m.id, m.subject, m.date, m.body) for m in MboxSource(path).iter_messages()]
+        parallel = [(m.id, m.subject, m.date, m.body) for m in MboxSource(path, workers=2).iter_messages()]
+        self.assertEqual(parallel, serial)
+        self.assertEqual(len(serial), 3)
+        self.assertIn("From the design team", serial[0][3])
+    
+    def test_maildir_and_eml_sources(self):
+        """Test that Maildir trees and .eml files produce the same threads."""
+        maildir = os.path.join(self.temp_dir, 'Maildir')
+        for folder in ('cur', 'new', 'tmp'):
+            os.makedirs(os.path.join(maildir, folder))
+        eml_dir = os.path.join(self.temp_dir, 'eml')
+        os.makedirs(eml_dir)
+        for i, message in enumerate(MESSAGES):
+            with open(os.path.join(maildir, 'cur' if i else 'new', f"{i}.host:2,S"), 'w') as f:
+                f.write(message)
+            with open(os.path.join(eml_dir, f"{i}.eml"), 'w') as f:
+                f.write(message)
+        
+        self._assert_expected_threads(IngestionAgent(source=MaildirSource(maildir)).ingest())
+        self._assert_expected_threads(IngestionAgent(source=EmlSource(eml_dir)).ingest())
+    
+    def test_sources_must_implement_iter_messages(self):
+        """Test that a source without iter_messages cannot be instantiated."""
+        class ThreadsOnlySource(MailSource):
+            pass
+
+        with self.assertRaises(TypeError):
+            MailSource()
+        with self.assertRaises(TypeError):
+            ThreadsOnlySource()
+    
+    def test_body_is_decoded_lazily(self):
+        """Test that headers are available before the body has been decoded."""
+        message = MimeEmailMessage.from_bytes(MESSAGES[1].encode(), fallback_id='x')
+        self.assertEqual(message.in_reply_to, "msg1@company.com")
+        self.assertIsNotNone(message._raw)
+        self.assertEqual(message.body.strip(), "Can you provide a breakdown?")
+        self.assertIsNone(message._raw)
+
+if __name__ == '__main__':
+    unittest.main()
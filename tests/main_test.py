@@ -0,0 +1,139 @@
+import sys
+import os
+import unittest
+import asyncio
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.mock_llm_server import mock_answer
+
+try:
+    import langchain_anthropic  # noqa: F401
+    import fastapi  # noqa: F401
+    APP_AVAILABLE = True
+except ImportError:
+    APP_AVAILABLE = False
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LATENCY = 0.2
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class SlowStreamingLLM:
+    """Model that streams its answer over LATENCY seconds; counts its calls."""
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(LATENCY)
+        return FakeResponse("```json\n" + json.dumps(mock_answer(messages[0].content)) + "\n```")
+
+    async def astream(self, messages):
+        self.calls += 1
+        text = "```json\n" + json.dumps(mock_answer(messages[0].content)) + "\n```"
+        for offset in range(0, len(text), 32):
+            await asyncio.sleep(LATENCY * 32 / len(text))
+            yield FakeResponse(text[offset:offset + 32])
+
+
+def make_request():
+    return {
+        "current_email": {
+            "subject": "Budget review",
+            "sender": "boss@example.com",
+            "recipients": ["user@example.com"],
+            "body": "Could you review the budget before Friday?",
+            "timestamp": "2025-05-01T10:00:00Z",
+            "thread_id": "thread1"
+        },
+        "user_id": "user1"
+    }
+
+
+@unittest.skipUnless(APP_AVAILABLE, "langchain or fastapi is not installed")
+class AnalyzeSingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The app keeps its caches and memory under data/; use a scratch copy
+        cls.cwd = os.getcwd()
+        cls.temp_dir = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(REPO_ROOT, 'data'), os.path.join(cls.temp_dir, 'data'))
+        os.chdir(cls.temp_dir)
+        os.environ.setdefault('ANTHROPIC_API_KEY', 'test-key')
+        from src import main
+        cls.main = main
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.main.observer_agent.flush()
+        if cls.main.email_adapter.response_cache:
+            cls.main.email_adapter.response_cache.close()
+        os.chdir(cls.cwd)
+        shutil.rmtree(cls.temp_dir)
+
+    def setUp(self):
+        self.llm = SlowStreamingLLM()
+        self.main.email_adapter.llm = self.llm
+        self.main.analysis_cache.clear()
+        self.main.email_adapter.results.clear()
+        if self.main.email_adapter.response_cache:
+            self.main.email_adapter.response_cache.clear()
+
+    async def test_waiter_reruns_when_streaming_leader_disconnects(self):
+        """Test that /analyze waiting on a stream whose client disconnects gets a real analysis."""
+        main = self.main
+        with contextlib.redirect_stdout(io.StringIO()):
+            stream = main.stream_analysis(main.EmailRequest(**make_request()))
+            self.assertTrue((await stream.__anext__()).startswith("event: observer"))
+            waiter = asyncio.ensure_future(main.analyze_email(main.EmailRequest(**make_request())))
+            self.assertTrue((await stream.__anext__()).startswith("event: field"))
+            self.assertFalse(waiter.done())
+            
+            # The streaming client goes away mid-answer
+            await stream.aclose()
+            response = await asyncio.wait_for(waiter, 5 * LATENCY)
+        
+        self.assertEqual(response.primary_intent, "Respond to the email")
+        self.assertEqual(self.llm.calls, 2)
+        self.assertEqual(main.analysis_flights.stats()["abandoned"], 1)
+        self.assertEqual(len(main.analysis_flights), 0)
+        self.assertIs(main.analysis_cache.get(main.get_cache_key({**make_request()["current_email"]}, "user1")),
+                      response)
+
+    async def test_concurrent_requests_share_one_call(self):
+        """Test that identical concurrent /analyze requests make one LLM call."""
+        main = self.main
+        with contextlib.redirect_stdout(io.StringIO()):
+            responses = await asyncio.gather(*(main.analyze_email(main.EmailRequest(**make_request()))
+                                               for _ in range(3)))
+        self.assertEqual(self.llm.calls, 1)
+        self.assertTrue(all(response is responses[0] for response in responses))
+
+    async def test_anonymous_requests_are_not_indexed(self):
+        """Test that threads of requests without a user_id are not kept for related-thread lookups."""
+        main = self.main
+        users = main.observer_agent._user_threads
+        anonymous = make_request()
+        del anonymous["user_id"]
+        anonymous["current_email"]["thread_id"] = "anonymous-thread"
+        indexed_users = len(users)
+        with contextlib.redirect_stdout(io.StringIO()):
+            await main.analyze_email(main.EmailRequest(**anonymous))
+            self.assertEqual(len(users), indexed_users)
+            self.assertIsNone(users.get(main.DEFAULT_USER, "anonymous-thread"))
+            await main.analyze_email(main.EmailRequest(**make_request()))
+        self.assertIsNotNone(users.get("user1", "thread1"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+import os
+import unittest
+import json
+import tempfile
+import shutil
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.memory_storage import JSONMemoryStorage, MemoryStorage, SQLiteMemoryStorage
+
+
+class MemoryStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def apply_updates(self, storage):
+        storage.update("alice", {"traveler": True, "billPayer": False}, {"traveler": "2025-04-30T10:00:00Z"})
+        return storage.update("alice", {"traveler": False, "techSavvy": True},
+                              {"techSavvy": "2025-05-01T10:00:00Z", "billPayer": None})
+
+    def test_backends_apply_updates_alike(self):
+        """Test that both backends merge traits and keep timestamps the same way."""
+        json_storage = JSONMemoryStorage(os.path.join(self.temp_dir, 'memory.json'), flush_interval=0)
+        sqlite_storage = SQLiteMemoryStorage(os.path.join(self.temp_dir, 'memory.db'))
+        expected = {
+            "userTraits": {"traveler": False, "billPayer": False, "techSavvy": True},
+            "timestamps": {"traveler": "2025-04-30T10:00:00Z", "techSavvy": "2025-05-01T10:00:00Z"}
+        }
+        self.assertEqual(self.apply_updates(json_storage), expected)
+        self.assertEqual(self.apply_updates(sqlite_storage), expected)
+        with open(json_storage.path) as f:
+            self.assertEqual(json.load(f), expected)
+        sqlite_storage.close()
+
+    def test_backends_must_implement_load_and_update_many(self):
+        """Test that the storage interface and incomplete backends cannot be instantiated."""
+        class LoadOnlyStorage(MemoryStorage):
+            def load(self, user_id="default"):
+                return {"userTraits": {}, "timestamps": {}}
+
+        with self.assertRaises(TypeError):
+            MemoryStorage()
+        with self.assertRaises(TypeError):
+            LoadOnlyStorage()
+
+    def test_sqlite_keeps_users_apart(self):
+        """Test per-user keys, batched updates and persistence across connections."""
+        path = os.path.join(self.temp_dir, 'memory.db')
+        storage = SQLiteMemoryStorage(path)
+        storage.update_many([
+            ("alice", {"traveler": True}, {"traveler": "2025-04-30T10:00:00Z"}),
+            ("bob", {"frequentShopper": True}, {}),
+        ])
+        storage.close()
+
+        storage = SQLiteMemoryStorage(path)
+        self.assertEqual(storage.load("alice"), {"userTraits": {"traveler": True},
+                                                 "timestamps": {"traveler": "2025-04-30T10:00:00Z"}})
+        self.assertEqual(storage.load("bob")["userTraits"], {"frequentShopper": True})
+        self.assertEqual(storage.load("carol"), {"userTraits": {}, "timestamps": {}})
+        self.assertEqual(storage._connection().execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        storage.close()
+
+    def test_sqlite_concurrent_writers(self):
+        """Test that updates from several threads are all applied."""
+        storage = SQLiteMemoryStorage(os.path.join(self.temp_dir, 'memory.db'))
+
+        def write(worker):
+            for n in range(50):
+                storage.update(f"user{worker}", {f"trait{n}": True}, {})
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for worker in range(4):
+            self.assertEqual(len(storage.load(f"user{worker}")["userTraits"]), 50)
+        storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import os
+import unittest
+import random
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestionAgent import EmailMessage, IngestionAgent
+from src.message_threader import MessageThreader, normalize_subject
+
+START = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+
+class HeaderMessage(EmailMessage):
+    """EmailMessage carrying threading headers, as produced by the mail sources."""
+    __slots__ = ('message_id', 'in_reply_to', 'references')
+    
+    def __init__(self, message_id, subject, minutes, in_reply_to=None, references=None):
+        super().__init__(id=message_id or subject, from_address='a@example.com', to_addresses=['b@example.com'],
+                         date=START + timedelta(minutes=minutes), subject=subject, snippet='', body='')
+        self.message_id = message_id
+        self.in_reply_to = in_reply_to
+        self.references = references or []
+
+
+def grouped(threads):
+    return sorted(sorted(m.id for m in thread.messages) for thread in threads)
+
+
+class MessageThreaderTest(unittest.TestCase):
+    def test_groups_by_references_in_any_order(self):
+        """Test that replies are threaded even when they arrive before their parents."""
+        messages = [
+            HeaderMessage('c', 'Re: Budget', 3, in_reply_to='b', references=['a', 'b']),
+            HeaderMessage('x', 'Lunch?', 5),
+            HeaderMessage('b', 'Re: Budget', 2, in_reply_to='a'),
+            HeaderMessage('a', 'Budget', 1),
+        ]
+        threads = MessageThreader().thread(messages)
+        self.assertEqual(grouped(threads), [['a', 'b', 'c'], ['x']])
+        budget = next(t for t in threads if len(t.messages) == 3)
+        self.assertEqual(budget.thread_id, 'a')
+        self.assertEqual([m.id for m in budget.messages], ['a', 'b', 'c'])
+    
+    def test_missing_parent_still_joins_siblings(self):
+        """Test that replies to a message absent from the mailbox share a thread."""
+        messages = [
+            HeaderMessage('r1', 'Re: Offsite', 1, in_reply_to='missing'),
+            HeaderMessage('r2', 'Re: Offsite', 2, references=['missing']),
+        ]
+        self.assertEqual(grouped(MessageThreader().thread(messages)), [['r1', 'r2']])
+    
+    def test_subject_fallback_for_headerless_replies(self):
+        """Test that replies without headers join the thread with the same base subject."""
+        messages = [
+            HeaderMessage('a', 'Quarterly report', 1),
+            HeaderMessage('b', 'RE: Fwd: quarterly   report', 2),
+            HeaderMessage('c', 'Quarterly report', 3),  # A new thread, not a reply
+        ]
+        self.assertEqual(grouped(MessageThreader().thread(messages)), [['a', 'b'], ['c']])
+        self.assertEqual(grouped(MessageThreader(subject_fallback=False).thread(messages)), [['a'], ['b'], ['c']])
+        self.assertEqual(normalize_subject('Re[2]: AW: Quarterly Report'), 'quarterly report')
+    
+    def test_deep_shuffled_chain(self):
+        """Test that a long reply chain delivered in random order forms one thread."""
+        messages = [HeaderMessage(f'm{i}', 'Re: Chain', i, in_reply_to=f'm{i - 1}' if i else None)
+                    for i in range(5000)]
+        random.Random(3).shuffle(messages)
+        threads = MessageThreader().thread(messages)
+        self.assertEqual(len(threads), 1)
+        self.assertEqual(threads[0].thread_id, 'm0')
+    
+    def test_ingest_messages_normalizes_threads(self):
+        """Test that the ingestion stage returns normalized threads, most recent first."""
+        messages = [
+            HeaderMessage('a', 'Budget', 1),
+            HeaderMessage('x', 'Lunch?', 2),
+            HeaderMessage('b', 'Re: Budget', 3, in_reply_to='a'),
+        ]
+        threads = IngestionAgent().ingest_messages(messages)
+        self.assertEqual([t.thread_id for t in threads], ['a', 'x'])
+        self.assertEqual(threads[0].subject, 'Budget')
+        self.assertEqual(len(threads[0].full_messages), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import sys
+import os
+import unittest
+import json
+import random
+import urllib.error
+import urllib.request
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.mock_llm_server import (
+    ANALYSIS_FIELDS, LatencyProfile, MockLLMServer, mock_analysis, mock_answer, stream_events
+)
+
+try:
+    import langchain_anthropic  # noqa: F401
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    LANGCHAIN_AVAILABLE = False
+
+
+def post(url, body):
+    request = urllib.request.Request(url + "/v1/messages", data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.load(response)
+
+
+MESSAGES = {"model": "test", "max_tokens": 1024,
+            "messages": [{"role": "user", "content": "Subject: Budget deadline\nFrom: cfo@example.com\nBody: ..."}]}
+
+
+class MockLLMServerTest(unittest.TestCase):
+    def test_mock_analysis_is_deterministic(self):
+        """Test that the same prompt always gets the same complete analysis."""
+        prompt = MESSAGES["messages"][0]["content"]
+        analysis = mock_analysis(prompt)
+        self.assertEqual(analysis, mock_analysis(prompt))
+        self.assertEqual(tuple(analysis), ANALYSIS_FIELDS)
+        self.assertEqual(analysis["primary_intent"], "Respond to Budget deadline")
+        self.assertEqual(analysis["urgency"], "high")
+        self.assertEqual(analysis["participants_analysis"], {"sender": "cfo@example.com"})
+
+    def test_batch_answer_keyed_by_email_id(self):
+        """Test that batch prompts get one analysis per Email ID."""
+        prompt = ("Emails to Analyze:\n\nEmail 1:\nEmail ID: a1\nSubject: Lunch\n---\n"
+                  "\nEmail 2:\nEmail ID: b2\nSubject: Urgent invoice\n---\n\nDeadlines matter.")
+        answer = mock_answer(prompt)
+        self.assertEqual(list(answer), ["a1", "b2"])
+        self.assertEqual(answer["a1"]["thread_summary"], "Lunch")
+        self.assertEqual((answer["a1"]["urgency"], answer["b2"]["urgency"]), ("normal", "high"))
+        self.assertEqual(mock_answer("Subject: Lunch"), mock_analysis("Subject: Lunch"))
+
+    @unittest.skipUnless(LANGCHAIN_AVAILABLE, "langchain is not installed")
+    def test_fields_match_adapter_schema(self):
+        """Test that the mock answers every field the adapter's output parser expects."""
+        os.environ.setdefault('ANTHROPIC_API_KEY', 'test-key')
+        from src.cognitive_email_adapter import output_parser, response_schemas
+        self.assertEqual(ANALYSIS_FIELDS, tuple(schema.name for schema in response_schemas))
+        text = "```json\n" + json.dumps(mock_analysis("Subject: Hi")) + "\n```"
+        self.assertEqual(output_parser.parse(text)["thread_summary"], "Hi")
+
+    def test_messages_endpoint(self):
+        """Test a Messages API round-trip and the request counters."""
+        with MockLLMServer(port=0, profile='instant') as server:
+            status, body = post(server.url, MESSAGES)
+            self.assertEqual(status, 200)
+            self.assertEqual(body["type"], "message")
+            text = body["content"][0]["text"]
+            self.assertTrue(text.startswith("```json"))
+            self.assertEqual(json.loads(text.strip("`").lstrip("json"))["bucket"],
+                             mock_analysis(MESSAGES["messages"][0]["content"])["bucket"])
+            stats = server.stats()
+            self.assertEqual((stats["requests"], stats["errors"]), (1, 0))
+            self.assertEqual(stats["output_tokens"], body["usage"]["output_tokens"])
+
+    def test_streaming(self):
+        """Test that stream requests get Messages API events carrying the same answer."""
+        with MockLLMServer(port=0, profile='instant') as server:
+            _, body = post(server.url, MESSAGES)
+            request = urllib.request.Request(server.url + "/v1/messages",
+                                             data=json.dumps(dict(MESSAGES, stream=True)).encode(),
+                                             headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+                events = [line.decode()[len("event: "):].strip() for line in response if line.startswith(b"event: ")]
+            self.assertEqual(events[0], "message_start")
+            self.assertEqual(events[-1], "message_stop")
+        text = "".join(data["delta"]["text"] for event, data in stream_events(body) if event == "content_block_delta")
+        self.assertEqual(text, body["content"][0]["text"])
+        self.assertEqual(events.count("content_block_delta"), len(range(0, len(text), 16)))
+
+    def test_answers_stop_at_max_tokens(self):
+        """Test that answers past the request's max_tokens are cut off, plain and streamed."""
+        batch_prompt = "\n".join(f"Email {i}:\nEmail ID: id{i}\nSubject: Question {i}\n---" for i in range(1, 9))
+        request = dict(MESSAGES, max_tokens=1024, messages=[{"role": "user", "content": batch_prompt}])
+        with MockLLMServer(port=0, profile='instant') as server:
+            _, full = post(server.url, dict(request, max_tokens=100000))
+            _, body = post(server.url, request)
+            stream_request = urllib.request.Request(server.url + "/v1/messages",
+                                                    data=json.dumps(dict(request, stream=True)).encode(),
+                                                    headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(stream_request, timeout=5) as response:
+                data = [json.loads(line.decode()[len("data: "):]) for line in response if line.startswith(b"data: ")]
+        self.assertEqual(full["stop_reason"], "end_turn")
+        self.assertEqual(body["stop_reason"], "max_tokens")
+        self.assertLessEqual(body["usage"]["output_tokens"], 1024)
+        self.assertTrue(full["content"][0]["text"].startswith(body["content"][0]["text"]))
+        self.assertLess(len(body["content"][0]["text"]), len(full["content"][0]["text"]))
+        self.assertEqual([event["delta"]["stop_reason"] for event in data if event["type"] == "message_delta"],
+                         ["max_tokens"])
+        self.assertEqual("".join(event["delta"]["text"] for event in data if event["type"] == "content_block_delta"),
+                         body["content"][0]["text"])
+
+    def test_fields_follow_prompt_schema(self):
+        """Test that fields come in the order the prompt's schema lists them."""
+        analysis = mock_analysis('Schema: "urgency": string, "primary_intent": string')
+        self.assertEqual(list(analysis)[:3], ["urgency", "primary_intent", "priority"])
+
+    def test_error_injection(self):
+        """Test that injected failures return the configured status and an Anthropic error body."""
+        with MockLLMServer(port=0, profile='instant', error_rate=1.0, error_status=429) as server:
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                post(server.url, MESSAGES)
+            self.assertEqual(raised.exception.code, 429)
+            self.assertEqual(json.load(raised.exception)["error"]["type"], "rate_limit_error")
+            self.assertEqual(server.stats()["errors"], 1)
+
+    def test_latency_profile(self):
+        """Test that delays add time to first token and generation time."""
+        profile = LatencyProfile(0.5, 100)
+        self.assertAlmostEqual(profile.delay(200, random.Random(0)), 2.5)
+        jittered = LatencyProfile(1.0, 0, jitter=0.3)
+        self.assertEqual(jittered.delay(10, random.Random(1)), jittered.delay(10, random.Random(1)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,9 @@ from datetime import datetime
 # Add the parent directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.observerAgent import ObserverAgent
+from src.observerAgent import ObserverAgent, SessionMemory, BUCKET_PATTERNS
+from src.keyword_matcher import KeywordMatcher
+from src.memory_storage import DEFAULT_USER
 
 class ObserverAgentTest(unittest.TestCase):
     def setUp(self):
@@ -99,6 +101,7 @@ class ObserverAgentTest(unittest.TestCase):
     
     def tearDown(self):
         """Clean up temporary test files."""
+        self.observer.flush()
         shutil.rmtree(self.temp_dir)
     
     def test_bucket_suggestion(self):
@@ -173,5 +176,173 @@ class ObserverAgentTest(unittest.TestCase):
             self.assertTrue(updated_memory["userTraits"].get(trait, False), 
                            f"Expected trait '{trait}' to be active but it wasn't")
 
+    def test_keyword_matcher_matches_substring_scoring(self):
+        """Test that compiled scoring equals counting `keyword in text` over every list."""
+        matcher = KeywordMatcher(BUCKET_PATTERNS)
+        texts = [
+            "dinner plans this weekend? let's meet up for coffee",
+            "your account statement: payment due, see receipt #42",
+            "updates:newsletter-digest\tunsubscribe here",
+            "boarding pass and check-in for your flight to the airport",
+            "how are you? hope you're well",
+            "nothing relevant at all",
+        ]
+        for text in texts:
+            expected = {}
+            for bucket, keywords in BUCKET_PATTERNS.items():
+                score = sum(1 for keyword in keywords if keyword in text)
+                if score:
+                    expected[bucket] = score
+            self.assertEqual(matcher.score(text), expected, text)
+
+    def test_analyze_batch_matches_individual_methods(self):
+        """Test that one batch analysis yields the same buckets, assignments, traits and sentiment."""
+        threads = self.session_data["threads"] + [{
+            "thread_id": "urgent1",
+            "subject": "URGENT: problem with the client deadline",
+            "latest_snippet": "Unfortunately the app update broke the build. Thanks for looking asap.",
+            "received_at": "2025-04-30T19:00:00Z"
+        }]
+        analysis = self.observer.analyze_batch(threads)
+        
+        buckets = self.observer.suggest_buckets(analysis=analysis)
+        self.assertEqual(buckets, self.observer.suggest_buckets(threads))
+        self.assertEqual(self.observer.assign_threads_to_buckets(buckets=buckets, analysis=analysis),
+                         {t["thread_id"]: self.observer._assign_thread_to_bucket(t, buckets) for t in threads})
+        
+        traits = analysis.user_traits()
+        self.assertTrue(traits["userTraits"]["techSavvy"])
+        self.assertFalse(traits["userTraits"]["healthConscious"])
+        # Every active trait carries the time of the last thread analyzed
+        self.assertEqual(set(traits["timestamps"].values()), {"2025-04-30T19:00:00Z"})
+        
+        urgent = analysis.threads[-1]
+        self.assertEqual((urgent.sentiment, urgent.urgency), ("positive", "high"))
+        self.assertEqual(self.observer._analyze_sentiment_and_urgency(threads[2]),
+                         {"sentiment": "neutral", "urgency": "normal"})
+
+    def test_recent_bucket_threads(self):
+        """Test that bucket neighbours come from the same bucket, most recent first."""
+        threads = self.session_data["threads"]
+        self.observer.assign_threads_to_buckets(buckets=["Work", "Newsletters", "Bills", "Social", "Shopping"])
+        self.assertEqual(self.observer.get_recent_bucket_threads(threads[0]), [])
+        
+        # Put every thread in one bucket
+        self.observer.session_memory.thread_to_bucket = {t["thread_id"]: "Work" for t in threads}
+        self.observer.thread_store.set_assignments(self.observer.session_memory.thread_to_bucket)
+        related = [t["thread_id"] for t in self.observer.get_recent_bucket_threads(threads[0])]
+        self.assertEqual(related, ["social1", "shopping1", "bill1", "newsletter1"])
+        
+        # Rewriting the session data is picked up on the next lookup
+        self.session_data["threads"][1]["received_at"] = "2025-05-01T00:00:00Z"
+        with open(self.session_data_path, 'w') as f:
+            json.dump(self.session_data, f, indent=2)
+        related = [t["thread_id"] for t in self.observer.get_recent_bucket_threads(threads[0])]
+        self.assertEqual(related[0], "newsletter1")
+
+    def test_session_memory_index(self):
+        """Test that bucket membership and counts follow assign, reassign and remove."""
+        memory = SessionMemory()
+        memory.thread_to_bucket = {"t1": "Work", "t2": "Work", "t3": "Bills"}
+        self.assertEqual(memory.bucket_count("Work"), 2)
+        memory.assign("t2", "Bills")
+        memory.assign("t4", "Social")
+        memory.remove("t1")
+        memory.remove("missing")
+        self.assertEqual(memory.bucket_count("Work"), 0)
+        self.assertEqual(memory.threads_in_bucket("Bills"), {"t2", "t3"})
+        self.assertEqual(memory.bucket_of("t4"), "Social")
+        self.assertEqual(memory.thread_to_bucket, {"t2": "Bills", "t3": "Bills", "t4": "Social"})
+        
+        assignments = self.observer.assign_threads_to_buckets(buckets=["Work", "Newsletters", "Bills"])
+        for bucket in ["Work", "Newsletters", "Bills", "Uncategorized"]:
+            self.assertEqual(self.observer.get_bucket_count(bucket), list(assignments.values()).count(bucket))
+        self.observer.assign_thread("social1", "Work")
+        self.assertEqual(sorted(self.observer.get_bucket_threads("Work")), ["social1", "work1"])
+        self.assertEqual([t["thread_id"] for t in self.observer.get_recent_bucket_threads({"thread_id": "work1"})],
+                         ["social1"])
+
+    def test_long_term_memory_written_behind(self):
+        """Test that memory updates are coalesced in memory and written atomically on flush."""
+        self.observer = ObserverAgent(
+            session_data_path=self.session_data_path,
+            long_term_data_path=self.long_term_data_path,
+            memory_flush_interval=60
+        )
+        for _ in range(3):
+            self.observer.update_user_memory()
+        with open(self.long_term_data_path) as f:
+            self.assertEqual(json.load(f), self.long_term_data)
+        
+        self.observer.flush()
+        with open(self.long_term_data_path) as f:
+            saved = json.load(f)
+        self.assertTrue(saved["userTraits"]["workEmailUser"])
+        self.assertEqual(self.observer.memory_storage._file.writes, 1)
+        self.assertEqual([name for name in os.listdir(self.temp_dir) if name.endswith('.tmp')], [])
+
+    def test_related_threads_by_similarity(self):
+        """Test that related threads are ranked by shared words and participants."""
+        followup = {
+            "thread_id": "work2",
+            "subject": "Re: Project Alpha Status Update",
+            "latest_snippet": "Thanks for the weekly status update on Project Alpha, the deadline works.",
+            "participants": ["manager@company.com", "user_email@example.com"],
+            "received_at": "2025-05-01T09:00:00Z"
+        }
+        self.observer.index_threads([followup], user_id="alice")
+        related = self.observer.get_related_threads(followup, user_id="alice")
+        self.assertEqual(related[0]["thread_id"], "work1")
+        self.assertNotIn("work2", [t["thread_id"] for t in related])
+        self.assertEqual(self.observer.get_related_threads(self.session_data["threads"][0], user_id="alice")[0]["thread_id"],
+                         "work2")
+        
+        # Indexed threads survive a reload of the session data, but stay out of the shared thread store
+        with open(self.session_data_path, 'w') as f:
+            json.dump(self.session_data, f, indent=2)
+        self.assertEqual(self.observer.get_related_threads(followup, user_id="alice")[0]["thread_id"], "work1")
+        self.assertIsNone(self.observer._load_thread_data("work2"))
+
+    def test_related_threads_scoped_to_user(self):
+        """Test that threads indexed for user A are never returned for user B."""
+        private = {
+            "thread_id": "alice-offer",
+            "subject": "Project Alpha salary offer",
+            "latest_snippet": "Confidential: your offer for Project Alpha status lead, deadline Friday.",
+            "participants": ["manager@company.com", "alice@example.com"],
+            "received_at": "2025-05-01T09:00:00Z"
+        }
+        self.observer.index_threads([private], user_id="alice")
+        query = dict(private, thread_id="bob-query", participants=["manager@company.com", "bob@example.com"])
+        self.assertIn("alice-offer", [t["thread_id"] for t in self.observer.get_related_threads(query, user_id="alice")])
+        for user_id in ("bob", DEFAULT_USER, None):
+            related = self.observer.get_related_threads(query, user_id=user_id)
+            self.assertNotIn("alice-offer", [t["thread_id"] for t in related])
+
+    def test_result_cache_scores_only_new_threads(self):
+        """Test that repeated thread content is served from the result cache."""
+        threads = self.session_data["threads"]
+        first = self.observer.analyze_batch(threads)
+        self.assertEqual(self.observer.result_cache_stats()["misses"], len(threads))
+        self.assertEqual(self.observer.result_cache_stats()["hits"], 0)
+        
+        # Same content under a new ID and time is a hit, but keeps its own identity
+        renamed = dict(threads[0], thread_id="work9", received_at="2025-05-02T09:00:00Z")
+        second = self.observer.analyze_batch(threads + [renamed])
+        stats = self.observer.result_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (len(threads) + 1, len(threads), len(threads)))
+        self.assertEqual(second.threads[-1].thread_id, "work9")
+        self.assertEqual(second.threads[-1].received_at, "2025-05-02T09:00:00Z")
+        self.assertEqual(second.threads[-1].bucket_scores, first.threads[0].bucket_scores)
+        self.assertEqual(second.user_traits()["timestamps"]["workEmailUser"], "2025-05-02T09:00:00Z")
+        
+        # The cache is bounded
+        small = ObserverAgent(self.session_data_path, self.long_term_data_path, result_cache_size=2)
+        small.analyze_batch(threads)
+        self.assertEqual(small.result_cache_stats()["size"], 2)
+        small.clear_result_cache()
+        self.assertEqual(small.result_cache_stats(), {"hits": 0, "misses": 0, "size": 0, "maxsize": 2})
+        small.flush()
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,43 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.processed_index import ProcessedEmailIndex
+
+
+class FakeEmail:
+    def __init__(self, i):
+        self.email_id = f"id{i}"
+
+
+class ProcessedEmailIndexTest(unittest.TestCase):
+    def test_duplicates_across_objects(self):
+        """Test that a re-sent copy of an email is recognized as a duplicate."""
+        index = ProcessedEmailIndex()
+        self.assertTrue(index.add(FakeEmail(1)))
+        self.assertIn(FakeEmail(1), index)
+        self.assertNotIn(FakeEmail(2), index)
+        self.assertFalse(index.add(FakeEmail(1)))
+        self.assertEqual(index.seen_count(FakeEmail(1)), 2)
+        self.assertEqual(index.stats(), {"entries": 1, "max_entries": 10000, "added": 1,
+                                         "duplicates": 1, "evictions": 0})
+
+    def test_lru_eviction(self):
+        """Test that the least recently seen email is evicted past max_entries."""
+        index = ProcessedEmailIndex(max_entries=2)
+        index.add(FakeEmail(1))
+        index.add(FakeEmail(2))
+        index.add(FakeEmail(1))
+        index.add(FakeEmail(3))
+        self.assertEqual(len(index), 2)
+        self.assertIn(FakeEmail(1), index)
+        self.assertNotIn(FakeEmail(2), index)
+        self.assertEqual(index.stats()["evictions"], 1)
+        self.assertEqual(index.clear(), 2)
+        self.assertEqual(len(index), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.related_index import RelatedThreadIndex, UserRelatedIndexes, thread_features
+
+
+def thread(thread_id, subject, snippet, participants=()):
+    return {"thread_id": thread_id, "subject": subject, "latest_snippet": snippet,
+            "participants": list(participants)}
+
+
+class RelatedThreadIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = RelatedThreadIndex()
+        self.index.add_many([
+            thread("flight1", "Your flight to Lisbon", "Boarding pass for flight TP1353 to Lisbon on Friday",
+                   ["travel@airline.com"]),
+            thread("flight2", "Re: Your flight to Lisbon", "Seat change for flight TP1353 to Lisbon",
+                   ["travel@airline.com"]),
+            thread("invoice1", "Invoice March", "Your invoice for March is attached", ["billing@acme.com"]),
+            thread("invoice2", "Invoice April", "Your invoice for April is attached", ["billing@acme.com"]),
+        ])
+
+    def test_features(self):
+        """Test that reply prefixes, stopwords and short words are dropped and participants kept."""
+        features = thread_features(thread("t", "Re: The flight", "to Lisbon, please", ["A@X.com"]))
+        self.assertEqual(features, {"flight", "lisbon", "@a@x.com"})
+
+    def test_similar_threads(self):
+        """Test that the nearest neighbours share words and participants."""
+        results = self.index.similar(self.index.get("flight1"), limit=2)
+        self.assertEqual(results[0][1]["thread_id"], "flight2")
+        self.assertAlmostEqual(results[0][0], 4 / 9)
+        self.assertNotIn("flight1", [t["thread_id"] for _, t in results])
+        query = thread("new", "Invoice May", "Your invoice for May is attached", ["billing@acme.com"])
+        self.assertEqual({t["thread_id"] for _, t in self.index.similar(query, limit=2)}, {"invoice1", "invoice2"})
+        self.assertEqual(self.index.similar(thread("empty", "", "")), [])
+
+    def test_incremental_updates(self):
+        """Test that replaced and removed threads leave no stale entries."""
+        self.index.add(thread("flight2", "Dinner", "Dinner on Saturday at eight", ["friend@mail.com"]))
+        self.index.remove("invoice2")
+        self.index.remove("missing")
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.similar(self.index.get("flight1")), [])
+        self.assertEqual([t["thread_id"] for _, t in self.index.similar(self.index.get("invoice1"))], [])
+        self.index.add(thread("invoice3", "Invoice June", "Your invoice for June is attached", ["billing@acme.com"]))
+        self.assertEqual([t["thread_id"] for _, t in self.index.similar(self.index.get("invoice1"))], ["invoice3"])
+
+
+class UserRelatedIndexesTest(unittest.TestCase):
+    def test_users_never_see_each_others_threads(self):
+        """Test that a user's threads are only related to that user's queries."""
+        indexes = UserRelatedIndexes()
+        flight = thread("a1", "Your flight to Lisbon", "Boarding pass for flight TP1353", ["travel@airline.com"])
+        indexes.add("alice", [flight])
+        query = thread("b1", "Re: Your flight to Lisbon", "Seat change for flight TP1353", ["travel@airline.com"])
+        indexes.add("bob", [query])
+        self.assertEqual([t["thread_id"] for _, t in indexes.similar("alice", query)], ["a1"])
+        self.assertEqual(indexes.similar("bob", query), [])
+        self.assertEqual(indexes.similar("carol", query), [])
+        self.assertIsNone(indexes.get("bob", "a1"))
+
+    def test_bounds_and_missing_ids(self):
+        """Test that old threads and users are evicted and threads without an ID are skipped."""
+        indexes = UserRelatedIndexes(max_users=2, max_threads=2)
+        indexes.add("alice", [thread(f"t{i}", f"Invoice {i}", "Your invoice is attached") for i in range(3)])
+        indexes.add("alice", [thread("", "Invoice", "Your invoice is attached")])
+        self.assertIsNone(indexes.get("alice", "t0"))
+        self.assertEqual(len(indexes.similar("alice", thread("q", "Invoice", "Your invoice is attached"))), 2)
+        indexes.add("bob", [])
+        indexes.add("carol", [])
+        self.assertEqual(len(indexes), 2)
+        self.assertIsNone(indexes.get("alice", "t1"))
+        self.assertEqual(indexes.evictions, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
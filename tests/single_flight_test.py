@@ -0,0 +1,166 @@
+import sys
+import os
+import unittest
+import asyncio
+import functools
+import datetime
+import json
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.single_flight import FlightAbandoned, SingleFlight
+from src.mock_llm_server import mock_answer
+
+try:
+    import langchain_anthropic  # noqa: F401
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    LANGCHAIN_AVAILABLE = False
+
+if LANGCHAIN_AVAILABLE:
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'test-key')
+    from src.cognitive_email_adapter import CognitiveEmailAdapter, Email
+
+LATENCY = 0.2
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class SlowLLM:
+    """Model that answers like the mock LLM server after LATENCY seconds, or fails; counts its calls."""
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(LATENCY)
+        if self.fail:
+            raise ConnectionError("overloaded")
+        return FakeResponse("```json\n" + json.dumps(mock_answer(messages[0].content)) + "\n```")
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test that concurrent calls for a key run the work once and get the same result."""
+        flights = SingleFlight()
+        runs = []
+        
+        async def compute():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return {"value": len(runs)}
+        results = await asyncio.gather(*(flights.do("key", compute) for _ in range(5)), flights.do("other", compute))
+        self.assertEqual(len(runs), 2)
+        self.assertTrue(all(result is results[0] for result in results[:5]))
+        self.assertEqual(flights.stats(), {"in_flight": 0, "leaders": 2, "coalesced": 4, "failures": 0,
+                                         "abandoned": 0})
+
+    async def test_failures_are_shared_but_not_kept(self):
+        """Test that waiters get the leader's exception and the next call runs again."""
+        flights = SingleFlight()
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            if len(calls) == 1:
+                raise ValueError("boom")
+            return "ok"
+        results = await asyncio.gather(*(flights.do("key", compute) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(await flights.do("key", compute), "ok")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flights.stats()["failures"], 1)
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that the work continues for waiters when the first caller is cancelled."""
+        flights = SingleFlight()
+        
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+        first = asyncio.ensure_future(flights.do("key", compute))
+        second = asyncio.ensure_future(flights.do("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, "done")
+
+    async def test_claim_and_join(self):
+        """Test that a claimed key is awaited by joiners until the claimant resolves it."""
+        flights = SingleFlight()
+        self.assertIsNone(flights.join("key"))
+        flight = flights.claim("key")
+        with self.assertRaises(KeyError):
+            flights.claim("key")
+        joined = flights.join("key")
+        flight.set_result("streamed")
+        self.assertEqual(await joined, "streamed")
+        self.assertNotIn("key", flights)
+
+    async def test_abandoned_claim_releases_waiters(self):
+        """Test that waiters on an abandoned claim run the work themselves, and joiners are told."""
+        flights = SingleFlight()
+        flight = flights.claim("key")
+        joined = flights.join("key")
+        
+        async def compute():
+            return "recomputed"
+        waiter = asyncio.ensure_future(flights.do("key", compute))
+        await asyncio.sleep(0)
+        flights.abandon("key", flight)
+        self.assertEqual(await waiter, "recomputed")
+        with self.assertRaises(FlightAbandoned):
+            await joined
+        self.assertEqual((flights.stats()["abandoned"], flights.stats()["failures"]), (1, 0))
+
+
+def make_email():
+    return Email(
+        sender="boss@example.com",
+        recipients=["user@example.com"],
+        subject="Budget review",
+        body="Could you review the budget?",
+        timestamp=datetime.datetime(2025, 5, 1, 10, 0),
+        thread_id="thread1"
+    )
+
+
+@unittest.skipUnless(LANGCHAIN_AVAILABLE, "langchain is not installed")
+class SingleFlightAdapterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_identical_requests_make_one_llm_call(self):
+        """Test that concurrent analyses of one email cost one slow LLM call and one latency."""
+        llm = SlowLLM()
+        adapter = CognitiveEmailAdapter(llm=llm)
+        flights = SingleFlight()
+        analyze = functools.partial(adapter.process_email, make_email(), raise_errors=True)
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(flights.do("cache-key", analyze) for _ in range(4)))
+        self.assertLess(time.perf_counter() - start, 2 * LATENCY)
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(results[0]["thread_summary"], "the email")
+        self.assertTrue(all(result == results[0] for result in results))
+
+    async def test_failed_llm_call_is_retried(self):
+        """Test that a failed LLM call fails every waiter and is not reused by the next request."""
+        llm = SlowLLM(fail=True)
+        adapter = CognitiveEmailAdapter(llm=llm)
+        flights = SingleFlight()
+        analyze = functools.partial(adapter.process_email, make_email(), raise_errors=True)
+        
+        results = await asyncio.gather(*(flights.do("cache-key", analyze) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+        self.assertEqual(llm.calls, 1)
+        
+        llm.fail = False
+        self.assertEqual((await flights.do("cache-key", analyze))["thread_summary"], "the email")
+        self.assertEqual(llm.calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
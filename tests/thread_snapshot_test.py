@@ -0,0 +1,62 @@
+import sys
+import os
+import unittest
+import shutil
+import struct
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestionAgent import IngestionAgent, _thread_to_record
+from src.thread_snapshot import ThreadSnapshot, load_snapshot, write_snapshot, _HEADER
+
+
+class ThreadSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'threads.snapshot')
+        self.threads = IngestionAgent('data/syntheticEmails.json').ingest()
+        records = [_thread_to_record(thread, '', position) for position, thread in enumerate(self.threads)]
+        write_snapshot(self.path, records, 'signature')
+        with open(self.path, 'rb') as f:
+            self.data = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, data: bytes) -> None:
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_context_manager_closes_mapping(self):
+        """Test that closing the snapshot unmaps it, after which its threads cannot be read."""
+        with ThreadSnapshot(self.path) as snapshot:
+            thread = snapshot.load_threads()[0]
+            self.assertEqual(thread.subject, self.threads[0].subject)
+        self.assertIsNone(snapshot._mmap)
+        with self.assertRaises(ValueError):
+            thread.subject
+        snapshot.close()
+
+    def test_truncated_snapshots_fall_back(self):
+        """Test that a snapshot cut off anywhere raises ValueError and is ignored by load_snapshot."""
+        for length in range(0, len(self.data), max(1, len(self.data) // 200)):
+            self.write(self.data[:length])
+            with self.assertRaises(ValueError, msg=f"length {length}"):
+                ThreadSnapshot(self.path)
+            self.assertIsNone(load_snapshot(self.path, 'signature'))
+
+    def test_corrupt_references_raise_value_error(self):
+        """Test that string and message references past the end of the snapshot raise ValueError."""
+        # The first thread's thread_id column entry comes right after the padded signature
+        position = _HEADER.size + len('signature') + (-len('signature') % 8)
+        self.write(self.data[:position] + struct.pack('<I', 2 ** 31) + self.data[position + 4:])
+        with ThreadSnapshot(self.path) as snapshot:
+            with self.assertRaises(ValueError):
+                snapshot.load_threads()[0].thread_id
+            with self.assertRaises(ValueError):
+                snapshot.addresses(len(snapshot.references), 1)
+
+if __name__ == '__main__':
+    unittest.main()
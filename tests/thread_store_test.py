@@ -0,0 +1,68 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.thread_store import ThreadStore
+
+
+def make_threads():
+    return [
+        {"thread_id": "a", "received_at": "2025-04-30T09:00:00Z"},
+        {"thread_id": "b", "received_at": "2025-04-30T12:00:00Z"},
+        {"thread_id": "c", "received_at": "2025-04-30T12:00:00Z"},
+        {"thread_id": "d", "received_at": "2025-04-30T15:00:00Z"},
+        {"thread_id": "e", "received_at": "2025-04-30T08:00:00Z"},
+    ]
+
+
+class ThreadStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.loads = 0
+        self.threads = make_threads()
+        self.version = 1
+
+        def loader():
+            self.loads += 1
+            return self.threads
+
+        self.store = ThreadStore(loader, signature=lambda: self.version)
+        self.store.set_assignments({"a": "Work", "b": "Work", "c": "Work", "d": "Bills", "e": "Work"})
+
+    def test_lookup_and_recent_in_bucket(self):
+        """Test lookups by ID and most-recent-first bucket queries with stable ties."""
+        self.assertEqual(self.store.get("d")["received_at"], "2025-04-30T15:00:00Z")
+        self.assertIsNone(self.store.get("missing"))
+        recent = [t["thread_id"] for t in self.store.recent_in_bucket("Work", 3)]
+        self.assertEqual(recent, ["b", "c", "a"])
+        recent = [t["thread_id"] for t in self.store.recent_in_bucket("Work", 5, exclude="c")]
+        self.assertEqual(recent, ["b", "a", "e"])
+        self.assertEqual(self.store.recent_in_bucket("Travel", 5), [])
+        self.assertEqual(self.loads, 1)
+
+    def test_assign_and_remove_update_index(self):
+        """Test that single reassignments keep the bucket index sorted."""
+        self.store.get("a")
+        self.store.assign("d", "Work")
+        self.store.remove("b")
+        recent = [t["thread_id"] for t in self.store.recent_in_bucket("Work", 5)]
+        self.assertEqual(recent, ["d", "c", "a", "e"])
+        self.assertEqual(self.store.recent_in_bucket("Bills", 5), [])
+
+    def test_reload_when_signature_changes(self):
+        """Test that changed source data is reloaded and reindexed."""
+        self.store.get("a")
+        self.threads = make_threads()
+        self.threads[0]["received_at"] = "2025-05-01T00:00:00Z"
+        self.assertEqual(self.store.recent_in_bucket("Work", 1)[0]["thread_id"], "b")
+        self.version = 2
+        self.assertEqual(self.store.recent_in_bucket("Work", 1)[0]["thread_id"], "a")
+        self.store.invalidate()
+        self.store.get("a")
+        self.assertEqual(self.loads, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import sys
+import os
+import unittest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.token_budget import TRUNCATION_MARKER, condense_body, estimate_tokens, pack_batches, truncate_to_tokens
+
+
+class TokenBudgetTest(unittest.TestCase):
+    def test_estimate_tokens(self):
+        """Test the heuristic token counts of words, numbers and punctuation."""
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("the budget"), 1 + 2)
+        self.assertEqual(estimate_tokens("Invoice #12345, due!"), 2 + 1 + 2 + 1 + 1 + 1)
+        self.assertGreater(estimate_tokens("word " * 1000), 999)
+
+    def test_truncate_to_tokens(self):
+        """Test that truncation keeps the head of the text within the budget."""
+        text = " ".join(f"w{i}" for i in range(100))  # two tokens per word
+        truncated = truncate_to_tokens(text, 20)
+        self.assertTrue(truncated.startswith("w0 w1 "))
+        self.assertTrue(truncated.endswith(TRUNCATION_MARKER))
+        self.assertLessEqual(estimate_tokens(truncated[:-len(TRUNCATION_MARKER)]), 20)
+        self.assertEqual(truncate_to_tokens("short text", 20), "short text")
+
+    def test_condense_body_drops_quoted_history(self):
+        """Test that oversized replies lose quoted history before being truncated."""
+        reply = "Sounds good, see you Friday.\n\n> earlier line\nMore text\n\nOn Mon, May 5, 2025, Ann wrote:\n" + "old " * 500
+        condensed = condense_body(reply, 50)
+        self.assertEqual(condensed, "Sounds good, see you Friday.\n\nMore text")
+        self.assertEqual(condense_body("Short body", 50), "Short body")
+        self.assertTrue(condense_body("long " * 500, 50).endswith(TRUNCATION_MARKER))
+
+    def test_pack_batches(self):
+        """Test first-fit decreasing packing under a budget and an item limit."""
+        batches = pack_batches([30, 60, 40, 70, 20], 100)
+        self.assertEqual(batches, [[0, 3], [1, 2], [4]])
+        self.assertEqual(sorted(i for batch in batches for i in batch), [0, 1, 2, 3, 4])
+        self.assertEqual(pack_batches([150, 10], 100), [[0], [1]])
+        self.assertEqual(pack_batches([1] * 5, 100, max_items=2), [[0, 1], [2, 3], [4]])
+        self.assertEqual(pack_batches([], 100), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import sys
+import os
+import unittest
+import json
+import tempfile
+import shutil
+import stat
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.write_behind import WriteBehindJSONFile, _UMASK
+
+
+class WriteBehindJSONFileTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'memory.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def wait_for_writes(self, writer, count):
+        deadline = time.monotonic() + 5
+        while writer.writes < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_flush_on_interval(self):
+        """Test that the background thread writes the latest document after the interval."""
+        writer = WriteBehindJSONFile(self.path, flush_interval=0.05)
+        writer.mark_dirty({"n": 1})
+        writer.mark_dirty({"n": 2})
+        self.wait_for_writes(writer, 1)
+        writer.close()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"n": 2})
+
+    def test_flush_on_pending_threshold(self):
+        """Test that reaching max_pending wakes the writer before the interval."""
+        writer = WriteBehindJSONFile(self.path, flush_interval=60, max_pending=3)
+        for n in range(3):
+            writer.mark_dirty({"n": n})
+        self.wait_for_writes(writer, 1)
+        self.assertEqual(writer.writes, 1)
+        writer.close()
+
+    def test_close_flushes_and_write_through(self):
+        """Test that close() persists pending state and interval 0 writes synchronously."""
+        writer = WriteBehindJSONFile(self.path, flush_interval=60)
+        writer.mark_dirty({"n": 1})
+        self.assertFalse(os.path.exists(self.path))
+        writer.close()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"n": 1})
+
+        writer = WriteBehindJSONFile(self.path, flush_interval=0)
+        writer.mark_dirty({"n": 2})
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"n": 2})
+        self.assertEqual(os.listdir(self.temp_dir), ['memory.json'])
+
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permissions")
+    def test_writes_keep_file_permissions(self):
+        """Test that rewrites keep the target's mode and new files get the umask default, not 0600."""
+        writer = WriteBehindJSONFile(self.path, flush_interval=0)
+        writer.mark_dirty({"n": 1})
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o666 & ~_UMASK)
+        os.chmod(self.path, 0o644)
+        writer.mark_dirty({"n": 2})
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o644)
+        writer.close()
+
+if __name__ == '__main__':
+    unittest.main()